@@ -0,0 +1,303 @@
+"""API HTTP locale pour réveiller des périphériques depuis d'autres outils.
+
+Points d'accès (réponses JSON) :
+    GET  /devices           liste des périphériques
+    GET  /devices/<id>      un périphérique
+    POST /wake              {"targets": ["Serveur NAS", "00:11:22:33:44:55", "rack-b-*", 12]}
+    GET  /wake?target=...   même chose, une ou plusieurs cibles dans l'adresse
+    GET  /results/<id>      résultat d'un réveil déjà demandé
+
+Le serveur utilise asyncio sans dépendance supplémentaire. Les connexions restent
+ouvertes entre deux requêtes (HTTP/1.1) et les réveils demandés pendant un même tour
+de boucle sont envoyés en un seul lot par les sockets partagées du MagicPacketSender.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlsplit
+from history import events_from_results
+from metrics import metrics
+from targets import resolve_targets
+from wol import MagicPacketSender
+
+log = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8760
+MAX_RESULTS = 10000  # Résultats gardés pour GET /results/<id>
+MAX_BODY_SIZE = 1 << 20
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class HttpError(Exception):
+    """Erreur renvoyée au client avec un code HTTP."""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class WakeApiServer:
+    """Serveur HTTP asyncio partageant le magasin de périphériques et l'émetteur.
+
+    `routing`, s'il est donné, retourne la destination de chaque adresse MAC
+    ({adresse MAC: WakeTarget}, voir `DeviceStore.targets`) ; sinon tous les paquets
+    partent vers l'adresse de l'émetteur. Il est appelé une fois par lot depuis la boucle
+    d'événements et ne doit donc pas attendre la base de données. `history`, s'il est donné (`history.HistoryWriter`),
+    reçoit chaque réveil avec l'adresse du client qui l'a demandé.
+    """
+    def __init__(self, store, sender=None, host=DEFAULT_HOST, port=DEFAULT_PORT, routing=None, history=None):
+        self.store = store
+        self.sender = sender or MagicPacketSender()
+        self._own_sender = sender is None
+        self.routing = routing
+        self.history = history
+        self.host = host
+        self.port = port
+        self.results = OrderedDict()  # Identifiant de réveil -> réponse
+        self.batch_count = 0  # Nombre de lots envoyés
+        self._next_result_id = 1
+        self._pending = []  # (adresses MAC, future) en attente du prochain lot
+        self._server = None
+        self._loop = None
+        self._thread = None
+        self._started = threading.Event()
+
+    # Réveils groupés
+
+    def _queue_wake(self, macs):
+        """Ajouter des adresses MAC au prochain lot ; retourne une future de leurs résultats."""
+        future = self._loop.create_future()
+        if not self._pending:
+            self._loop.call_soon(self._flush)  # Un seul envoi pour toutes les requêtes du tour de boucle
+        self._pending.append((macs, future))
+        return future
+
+    def _flush(self):
+        pending, self._pending = self._pending, []
+        macs = [mac for batch, _ in pending for mac in batch]
+        try:
+            # Paquets et destinations lus en mémoire, une seule fois pour tout le lot
+            packets = self.store.packets(macs)
+            targets = (self.routing(macs) if self.routing is not None else None) or {}
+            results = self.sender.send(macs, packets=packets, targets=targets)
+        except Exception as e:
+            # Toute erreur est transmise aux requêtes en attente, qui sinon ne recevraient jamais de réponse
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batch_count += 1
+        for batch, future in pending:
+            future.set_result({mac: results[mac] for mac in batch})
+
+    async def wake(self, targets, client=None):
+        """Réveiller des cibles (identifiant, nom, adresse MAC ou motif glob) et enregistrer le résultat."""
+        found = []
+        unmatched = []
+        names = []
+        for target in targets:
+            if isinstance(target, int) and not isinstance(target, bool):
+                device = self.store.get(target)
+                if device is None:
+                    unmatched.append(target)
+                else:
+                    found.append((device.name, device.mac))
+            elif isinstance(target, str):
+                names.append(target)
+            else:
+                raise HttpError(400, f"Cible invalide : {target!r}")
+        if any(name.startswith(('@', 'tag:')) for name in names):
+            # Groupes et étiquettes sont lus dans la base : hors de la boucle, qu'un verrou d'écriture bloquerait
+            matches, unmatched_names = await self._loop.run_in_executor(None, resolve_targets, self.store, names)
+        else:
+            matches, unmatched_names = resolve_targets(self.store, names)
+        found.extend(matches)
+        unmatched.extend(unmatched_names)
+        started = time.perf_counter()
+        results = await self._queue_wake([mac for _, mac in found]) if found else {}
+        metrics.observe('api_wake_seconds', time.perf_counter() - started)
+        if self.history is not None:
+            self.history.record(events_from_results(self.store, results, 'api', client))
+        result_id = self._next_result_id
+        self._next_result_id += 1
+        response = {
+            'id': result_id,
+            'results': [{'name': name, 'mac': mac, 'sent': results[mac].sent, 'ok': results[mac].ok,
+                         'error': results[mac].error} for name, mac in found],
+            'unmatched': unmatched,
+        }
+        self.results[result_id] = response
+        if len(self.results) > MAX_RESULTS:
+            self.results.popitem(last=False)
+        return response
+
+    # Routage
+
+    async def handle(self, method, path, body, client=None):
+        """Traiter une requête de `client` (adresse du pair) ; retourne le code HTTP et l'objet JSON de la réponse."""
+        url = urlsplit(path)
+        parts = [part for part in url.path.split('/') if part]
+        if parts == ['devices']:
+            self._require(method, 'GET')
+            return 200, [device.as_dict() for device in self.store]
+        if len(parts) == 2 and parts[0] == 'devices':
+            self._require(method, 'GET')
+            device = self.store.get(self._int(parts[1]))
+            if device is None:
+                raise HttpError(404, "Périphérique introuvable.")
+            return 200, device.as_dict()
+        if parts == ['wake']:
+            if method == 'GET':
+                targets = parse_qs(url.query).get('target', [])
+            elif method == 'POST':
+                try:
+                    payload = json.loads(body or b'{}')
+                except ValueError:
+                    raise HttpError(400, "Corps JSON invalide.") from None
+                targets = payload.get('targets') if isinstance(payload, dict) else None
+                if not isinstance(targets, list):
+                    raise HttpError(400, "Le champ 'targets' doit être une liste.")
+            else:
+                raise HttpError(405, "Méthode non autorisée.")
+            return 200, await self.wake(targets, client)
+        if len(parts) == 2 and parts[0] == 'results':
+            self._require(method, 'GET')
+            result = self.results.get(self._int(parts[1]))
+            if result is None:
+                raise HttpError(404, "Résultat introuvable.")
+            return 200, result
+        raise HttpError(404, "Ressource introuvable.")
+
+    @staticmethod
+    def _require(method, expected):
+        if method != expected:
+            raise HttpError(405, "Méthode non autorisée.")
+
+    @staticmethod
+    def _int(text):
+        try:
+            return int(text)
+        except ValueError:
+            raise HttpError(404, "Identifiant invalide.") from None
+
+    # Protocole HTTP
+
+    async def _serve_client(self, reader, writer):
+        """Lire les requêtes d'une connexion l'une après l'autre (keep-alive)."""
+        peer = writer.get_extra_info('peername')
+        client = peer[0] if peer else None
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, path, version = lines[0].split(' ', 2)
+                except ValueError:
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                # HTTP/1.1 garde la connexion ouverte par défaut, HTTP/1.0 seulement sur demande
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    break
+                try:
+                    if not 0 <= length <= MAX_BODY_SIZE:
+                        raise HttpError(413, "Corps de requête trop volumineux.")
+                    body = await reader.readexactly(length) if length else b''
+                    status, payload = await self.handle(method, path, body, client)
+                except HttpError as e:
+                    status, payload = e.status, {'error': str(e)}
+                    keep_alive = keep_alive and e.status != 413
+                except OSError as e:
+                    status, payload = 500, {'error': str(e)}
+                except Exception as e:
+                    log.exception("Erreur de l'API HTTP sur %s %s", method, path)
+                    status, payload = 500, {'error': str(e)}
+                data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json; charset=utf-8\r\n"
+                             f"Content-Length: {len(data)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}"
+                             f"\r\n\r\n".encode('latin-1') + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        """Ouvrir la socket d'écoute (port 0 : port choisi par le système)."""
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._serve_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """Fermer la socket d'écoute et, s'il a été créé ici, l'émetteur."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._own_sender:
+            self.sender.close()
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    # Exécution dans un thread, à côté de la boucle d'événements Qt
+
+    def start_in_thread(self, timeout=5.0):
+        """Démarrer le serveur dans un thread dédié ; retourne le port d'écoute."""
+        error = []
+
+        def run():
+            loop = asyncio.new_event_loop()
+            try:
+                loop.run_until_complete(self.start())
+            except Exception as e:
+                # Port occupé ou toute autre erreur : transmise à l'appelant au lieu d'attendre `timeout`
+                error.append(e)
+                self._started.set()
+                loop.close()
+                return
+            self._started.set()
+            try:
+                loop.run_forever()
+            finally:
+                loop.run_until_complete(self.close())
+                loop.close()
+
+        self._started.clear()
+        self._thread = threading.Thread(target=run, name='wake-api', daemon=True)
+        self._thread.start()
+        ready = self._started.wait(timeout)
+        if error:
+            raise error[0]
+        if not ready:
+            raise TimeoutError(f"Le serveur n'a pas démarré en {timeout} s.")
+        return self.port
+
+    def stop(self, timeout=5.0):
+        """Arrêter le serveur démarré par `start_in_thread`."""
+        if self._thread is None:
+            return
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
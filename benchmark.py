@@ -0,0 +1,296 @@
+"""Mesures de performance de SC-PYWOL, sans réseau et sur une base de données temporaire.
+
+Les paquets magiques sont envoyés à un récepteur UDP local (127.0.0.1) qui remplace le
+réseau. Les résultats peuvent être enregistrés comme référence puis comparés pour
+signaler les régressions en intégration continue :
+
+    python -m benchmark --save benchmark_baseline.json
+    python -m benchmark --compare benchmark_baseline.json --tolerance 0.5
+
+Les durées d'import de chaque module s'affichent avec `python -m benchmark --imports gui`.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(ROOT_DIR, 'benchmark_baseline.json')
+DEVICE_COUNTS = (1000, 10000, 100000)
+QUICK_DEVICE_COUNTS = (1000,)
+
+
+class PacketSink:
+    """Récepteur UDP local qui compte les paquets reçus dans un thread."""
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 22)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.settimeout(0.2)
+        self.port = self.sock.getsockname()[1]
+        self.received = 0
+        self._running = True
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def _drain(self):
+        while self._running:
+            try:
+                self.sock.recv(2048)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.received += 1
+
+    def close(self):
+        self._running = False
+        self._thread.join()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def measure(func, repeat=5):
+    """Durée médiane (en secondes) de `repeat` appels à `func`."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def make_database(path, count):
+    """Créer une base de `count` périphériques avec leurs paquets précalculés."""
+    from storage import migrate
+    from wol import build_magic_packet, normalize_mac
+
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    rows = []
+    for i in range(count):
+        raw = (0x020000000000 + i).to_bytes(6, 'big')  # Adresses administrées localement
+        rows.append((f"host-{i:06d}", normalize_mac(raw.hex()), f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}",
+                     raw, build_magic_packet(raw)))
+    with conn:
+        conn.executemany('INSERT INTO devices (name, mac, ip, mac_bytes, packet) VALUES (?, ?, ?, ?, ?)', rows)
+    conn.close()
+
+
+def bench_send(sink, results, quick):
+    """Débit d'envoi : un paquet par appel (wake_device) puis par lots sur une socket réutilisée."""
+    from wol import MagicPacketSender, build_magic_packet, wake_device
+
+    macs = [(0x020000000000 + i).to_bytes(6, 'big').hex(':') for i in range(1000 if quick else 10000)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        results['wake_device_per_packet'] = measure(
+            lambda: [wake_device(mac, ip_address='127.0.0.1', port=sink.port) for mac in macs[:200]], 3) / 200
+    with MagicPacketSender('127.0.0.1', sink.port) as sender:
+        results['send_batch_per_packet'] = measure(lambda: MagicPacketSender('127.0.0.1', sink.port).send(macs)) \
+            / len(macs)
+        packets = {mac: build_magic_packet(mac) for mac in macs}
+        results['send_precomputed_per_packet'] = measure(lambda: sender.send(macs, packets=packets)) / len(macs)
+
+
+def bench_api(sink, results, workdir, quick):
+    """Réveils par l'API HTTP locale : 16 clients sur des connexions persistantes, durée par requête."""
+    import asyncio
+    from api import WakeApiServer
+    from devices import DeviceStore
+    from storage import connect
+    from wol import MagicPacketSender
+
+    path = os.path.join(workdir, 'api.db')
+    make_database(path, 100)
+    conn = connect(path)
+    store = DeviceStore(conn)
+    connections, per_connection = 16, (50 if quick else 250)
+    body = b'{"targets": ["host-000001"]}'
+    request = (f"POST /wake HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode('latin-1')
+               + body)
+
+    async def client(port):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        try:
+            for _ in range(per_connection):
+                writer.write(request)
+                head = await reader.readuntil(b'\r\n\r\n')
+                length = int(head.lower().split(b'content-length: ')[1].split(b'\r\n')[0])
+                await reader.readexactly(length)
+        finally:
+            writer.close()
+
+    async def load(port):
+        await asyncio.gather(*(client(port) for _ in range(connections)))
+
+    with MagicPacketSender('127.0.0.1', sink.port) as sender:
+        server = WakeApiServer(store, sender, port=0)
+        port = server.start_in_thread()
+        try:
+            results['api_wake_per_request'] = measure(lambda: asyncio.run(load(port)), 3) \
+                / (connections * per_connection)
+        finally:
+            server.stop()
+    conn.close()
+
+
+def bench_devices(results, workdir, counts):
+    """Chargement des périphériques et reconstruction de la liste (modèle et filtre)."""
+    from devices import DeviceStore
+    from models import DeviceFilterProxyModel, DeviceListModel
+
+    for count in counts:
+        path = os.path.join(workdir, f'devices_{count}.db')
+        make_database(path, count)
+        conn = sqlite3.connect(path)
+        results[f'load_devices_{count}'] = measure(lambda: DeviceStore(conn), 3)
+        store = DeviceStore(conn)
+        model = DeviceListModel(store)
+        proxy = DeviceFilterProxyModel()
+        proxy.setSourceModel(model)
+        results[f'list_rebuild_{count}'] = measure(model.reset, 3)
+        results[f'search_keystroke_{count}'] = measure(lambda: (proxy.set_filter_text("host-0"),
+                                                               proxy.set_filter_text("")), 3) / 2
+        conn.close()
+
+
+def bench_theme(results, workdir):
+    """Changement de couleur d'accentuation de la fenêtre et teinte des icônes SVG."""
+    from PyQt5.QtCore import QSize
+    from gui import WOLApp, get_resource_path
+    from icons import IconService
+
+    app = WOLApp(db_file=os.path.join(workdir, 'theme.db'))
+    app.show()
+    colors = iter(f"#{value:06x}" for value in range(0x100000, 0x1000000, 0x10101))
+    results['apply_accent_color'] = measure(lambda: app.update_accent_color(next(colors)), 5)
+    app.close()
+
+    path = get_resource_path("assets/interface/parameters.svg")
+    results['icon_tint_cold'] = measure(lambda: IconService().tinted_icon(path, "#4CAF50", QSize(32, 32), 2.0), 5)
+    service = IconService()
+    service.tinted_icon(path, "#4CAF50", QSize(32, 32), 2.0)
+    results['icon_tint_cached'] = measure(lambda: service.tinted_icon(path, "#4CAF50", QSize(32, 32), 2.0), 5)
+
+
+def bench_cold_start(results, workdir):
+    """Démarrage à froid de WOLApp dans un interpréteur neuf, jusqu'à la fenêtre construite."""
+    db_file = os.path.join(workdir, 'cold_start.db')
+    code = ("import sys; from PyQt5.QtWidgets import QApplication; app = QApplication(sys.argv); "
+            "from gui import WOLApp; window = WOLApp(db_file=sys.argv[1]); window.close()")
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen'))
+    results['cold_start'] = measure(lambda: subprocess.run([sys.executable, '-c', code, db_file], cwd=ROOT_DIR,
+                                                           env=env, check=True, stdout=subprocess.DEVNULL), 3)
+
+
+def bench_first_paint(results, workdir):
+    """Délai jusqu'au premier affichage avec 10 000 périphériques (hors lancement de l'interpréteur)."""
+    db_file = os.path.join(workdir, 'first_paint.db')
+    make_database(db_file, 10000)
+    code = ("import time; start = time.perf_counter(); import sys; from PyQt5.QtWidgets import QApplication; "
+            "app = QApplication(sys.argv); from gui import WOLApp; window = WOLApp(db_file=sys.argv[1]); "
+            "window.show(); app.processEvents(); print(time.perf_counter() - start); window.close()")
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen'))
+    durations = [float(subprocess.run([sys.executable, '-c', code, db_file], cwd=ROOT_DIR, env=env, check=True,
+                                      capture_output=True, text=True).stdout.split()[-1]) for _ in range(3)]
+    results['first_paint_10000'] = statistics.median(durations)
+
+
+def import_times(module):
+    """Durées d'import cumulées (secondes) de `module` et de ses dépendances, selon `python -X importtime`."""
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=ROOT_DIR,
+                            check=True, capture_output=True, text=True).stderr
+    times = {}
+    for line in output.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+def bench_imports(results):
+    """Durée d'import du module de l'interface et de la ligne de commande."""
+    results['import_gui'] = statistics.median(import_times('gui')['gui'] for _ in range(3))
+    results['import_cli'] = statistics.median(import_times('cli')['cli'] for _ in range(3))
+
+
+def run(quick=False):
+    """Exécuter toutes les mesures ; retourne {nom: secondes}."""
+    from PyQt5.QtWidgets import QApplication
+
+    app = QApplication.instance() or QApplication([])
+    results = {}
+    workdir = tempfile.mkdtemp(prefix='sc_pywol_bench_')
+    try:
+        with PacketSink() as sink:
+            bench_send(sink, results, quick)
+            bench_api(sink, results, workdir, quick)
+        bench_devices(results, workdir, QUICK_DEVICE_COUNTS if quick else DEVICE_COUNTS)
+        with contextlib.redirect_stdout(io.StringIO()):
+            bench_theme(results, workdir)
+        if not quick:
+            bench_imports(results)
+            bench_first_paint(results, workdir)
+            bench_cold_start(results, workdir)
+    finally:
+        app.processEvents()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Mesures plus lentes que la référence de plus de `tolerance` (0.5 : 50 %) : [(nom, mesure, référence)]."""
+    return [(name, value, baseline[name]) for name, value in results.items()
+            if name in baseline and value > baseline[name] * (1 + tolerance)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='benchmark', description="Mesures de performance de SC-PYWOL.")
+    parser.add_argument('--quick', action='store_true', help="Tailles réduites, sans démarrage à froid.")
+    parser.add_argument('--save', metavar='FICHIER', help="Enregistrer les mesures comme référence.")
+    parser.add_argument('--compare', metavar='FICHIER', help="Comparer à une référence enregistrée.")
+    parser.add_argument('--tolerance', type=float, default=0.5, help="Ralentissement toléré (0.5 : 50 %%).")
+    parser.add_argument('--imports', metavar='MODULE', help="Afficher les modules les plus longs à importer.")
+    args = parser.parse_args(argv)
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+    if args.imports:
+        times = import_times(args.imports)
+        for name, value in sorted(times.items(), key=lambda item: item[1], reverse=True)[:25]:
+            print(f"{name:32} {value * 1000:12.4f} ms")
+        return 0
+
+    results = run(args.quick)
+    for name, value in results.items():
+        print(f"{name:32} {value * 1000:12.4f} ms")
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for name, value, reference in regressions:
+            print(f"Régression : {name} {value * 1000:.4f} ms (référence {reference * 1000:.4f} ms)", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,549 @@
+"""Interface en ligne de commande de SC-PYWOL (sans PyQt5).
+
+Exemples :
+    python -m cli list
+    python -m cli wake "Serveur NAS" 00:11:22:33:44:55 "rack-b-*" --json
+    python -m cli group add rack-b "rack-b-*"
+    python -m cli wake @rack-b --wave-size 8 --wave-delay 2
+    python -m cli schedule add "rack-b-*" --cron "30 6 * * 1-5"
+    python -m cli scheduler
+    python -m cli serve --port 8760
+    python -m cli discover --subnet 192.168.0.0/22 --add
+    python -m cli relay add 10.20.0.0/16 relais-b:9009 --key secret
+    python -m cli history --device "Serveur NAS" --limit 20
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime
+from devices import DeviceStore, connect
+from groups import GroupStore
+from history import PAGE_SIZE, HistoryStore, HistoryWriter, current_user, events_from_results, retention_settings
+from inventory import EXPORT_FORMATS, FORMATS, export_devices, import_devices
+from metrics import metrics
+from relay import KEY_ENV, RELAY_PORT, RelayRoutes, parse_relay_address
+from scheduler import Scheduler
+from storage import default_db_path
+from targets import resolve_targets, schedule_targets
+from wol import BROADCAST_IP, wake_in_waves, wake_many
+
+
+def wake_routes(store, macs, args):
+    """Destinations par périphérique (diffusion dirigée, relais), sauf si --broadcast impose une adresse unique."""
+    if args.broadcast is not None:
+        return None
+    return store.targets(macs, interface=args.interface, port=args.port)
+
+
+def open_store(db_file):
+    """Ouvrir la base de données et son magasin de périphériques."""
+    return DeviceStore(connect(db_file))
+
+
+def load_devices(db_file):
+    """Lire les périphériques puis fermer la base de données."""
+    conn = connect(db_file)
+    try:
+        return DeviceStore(conn)
+    finally:
+        conn.close()
+
+
+def record_history(conn, store, results, source):
+    """Noter des réveils dans l'historique puis appliquer une passe de rétention."""
+    history = HistoryStore(conn)
+    history.append(events_from_results(store, results, source, current_user()))
+    history.compact(*retention_settings(conn))
+
+
+def cmd_list(args):
+    """Afficher les périphériques enregistrés."""
+    store = load_devices(args.db)
+    if args.json:
+        print(json.dumps([device.as_dict() for device in store], ensure_ascii=False))
+    else:
+        for device in store:
+            ip = f" {device.ip}" if device.ip else ""
+            print(f"{device.name} ({device.mac}){ip}")
+    return 0
+
+
+def cmd_wake(args):
+    """Réveiller les périphériques désignés par nom, adresse MAC ou motif glob."""
+    store = open_store(args.db)
+    try:
+        targets, unmatched = resolve_targets(store, args.targets)
+        macs = [mac for _, mac in targets]
+        routes = wake_routes(store, macs, args)
+    finally:
+        store.conn.close()
+    options = dict(repeat=args.repeat, interval=args.interval, ip_address=args.broadcast or BROADCAST_IP,
+                   port=args.port, interface=args.interface, packets=store.packets(macs), targets=routes)
+    if args.wave_size:
+        results = wake_in_waves(macs, args.wave_size, args.wave_delay, **options)
+    else:
+        results = wake_many(macs, **options)
+    # Base rouverte seulement après l'envoi : les paquets partent sans attendre d'éventuels verrous
+    conn = connect(args.db)
+    try:
+        record_history(conn, store, results, 'cli')
+    finally:
+        conn.close()
+
+    report = [{'name': name, 'mac': mac, 'sent': results[mac].sent, 'ok': results[mac].ok,
+               'error': results[mac].error} for name, mac in targets]
+    if args.json:
+        print(json.dumps({'results': report, 'unmatched': unmatched}, ensure_ascii=False))
+    else:
+        for entry in report:
+            label = f"{entry['name']} ({entry['mac']})" if entry['name'] else entry['mac']
+            if entry['ok']:
+                print(f"Magic packet sent to {label}")
+            else:
+                print(f"Échec de l'envoi vers {label} : {entry['error']}", file=sys.stderr)
+        for target in unmatched:
+            print(f"Aucun périphérique ne correspond à '{target}'.", file=sys.stderr)
+
+    if unmatched and not report:
+        return 2
+    return 0 if all(entry['ok'] for entry in report) and not unmatched else 1
+
+
+def cmd_import(args):
+    """Importer un inventaire de périphériques."""
+    store = open_store(args.db)
+    try:
+        summary = import_devices(store, args.file, args.format)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        # Transaction annulée : la base reste telle qu'avant l'import
+        print(f"Échec de l'import : {e}", file=sys.stderr)
+        return 2
+    finally:
+        store.conn.close()
+    if args.json:
+        print(json.dumps(summary.as_dict(), ensure_ascii=False))
+    else:
+        print(summary)
+        for line_number, message in summary.errors:
+            print(f"Ligne {line_number} : {message}", file=sys.stderr)
+    return 0
+
+
+def cmd_export(args):
+    """Exporter l'inventaire des périphériques."""
+    try:
+        count = export_devices(load_devices(args.db), args.file, args.format)
+    except (OSError, ValueError) as e:
+        print(f"Échec de l'export : {e}", file=sys.stderr)
+        return 2
+    print(f"{count} périphérique(s) exporté(s) vers {args.file}")
+    return 0
+
+
+def _format_time(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M') if timestamp else '-'
+
+
+def cmd_schedule_add(args):
+    """Planifier le réveil d'un périphérique ou d'une cible."""
+    store = open_store(args.db)
+    try:
+        scheduler = Scheduler(store.conn, wake=None)
+        kind, spec = ('once', args.at) if args.at else ('cron', args.cron) if args.cron else ('interval', args.every)
+        device = store.by_name(args.target)
+        try:
+            if device is not None:
+                schedule = scheduler.add(kind, spec, device_id=device.id, catch_up=not args.no_catch_up)
+            else:
+                schedule = scheduler.add(kind, spec, target=args.target, catch_up=not args.no_catch_up)
+        except ValueError as e:
+            print(f"Planification invalide : {e}", file=sys.stderr)
+            return 2
+    finally:
+        store.conn.close()
+    print(f"Planification {schedule.id} ajoutée, prochain réveil : {_format_time(schedule.next_run)}")
+    return 0
+
+
+def cmd_schedule_list(args):
+    """Afficher les planifications enregistrées."""
+    store = open_store(args.db)
+    try:
+        schedules = Scheduler(store.conn, wake=None).all()
+    finally:
+        store.conn.close()
+    if args.json:
+        print(json.dumps([schedule.as_dict() for schedule in schedules], ensure_ascii=False))
+        return 0
+    for schedule in schedules:
+        device = store.get(schedule.device_id) if schedule.device_id is not None else None
+        target = device.name if device else schedule.target
+        print(f"{schedule.id} {schedule.kind} '{schedule.spec}' {target} "
+              f"prochain : {_format_time(schedule.next_run)} dernier : {_format_time(schedule.last_run)}")
+    return 0
+
+
+def cmd_schedule_remove(args):
+    """Supprimer une planification."""
+    store = open_store(args.db)
+    try:
+        removed = Scheduler(store.conn, wake=None).remove(args.id)
+    finally:
+        store.conn.close()
+    if not removed:
+        print(f"Aucune planification {args.id}.", file=sys.stderr)
+        return 2
+    return 0
+
+
+def cmd_scheduler(args):
+    """Exécuter les planifications sans interface graphique, jusqu'à Ctrl+C."""
+    store = open_store(args.db)
+
+    def wake(schedule):
+        store.reload()  # Les périphériques ont pu changer depuis l'interface
+        targets = schedule_targets(store, schedule)
+        macs = [mac for _, mac in targets]
+        results = wake_many(macs, ip_address=args.broadcast or BROADCAST_IP, port=args.port, interface=args.interface,
+                            packets=store.packets(macs), targets=wake_routes(store, macs, args))
+        record_history(store.conn, store, results, 'schedule')
+        for name, mac in targets:
+            status = "ok" if results[mac].ok else results[mac].error
+            print(f"[{_format_time(schedule.last_run)}] planification {schedule.id} : {name or mac} {status}",
+                  flush=True)
+
+    scheduler = Scheduler(store.conn, wake)
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.conn.close()
+    return 0
+
+
+def cmd_group(args):
+    """Gérer les groupes de périphériques."""
+    store = open_store(args.db)
+    groups = GroupStore(store.conn)
+    try:
+        if args.group_command == 'list':
+            for _, name, count in groups.groups():
+                print(f"{name} ({count} périphérique(s))")
+            return 0
+        if args.group_command == 'delete':
+            return 0 if groups.delete_group(args.name) else 2
+        targets, unmatched = resolve_targets(store, args.targets)
+        for target in unmatched:
+            print(f"Aucun périphérique ne correspond à '{target}'.", file=sys.stderr)
+        device_ids = [store.by_mac(mac).id for _, mac in targets if store.by_mac(mac)]
+        if args.group_command == 'add':
+            groups.add_members(args.name, device_ids)
+        else:
+            groups.remove_members(args.name, device_ids)
+        print(f"{args.name} : {len(groups.members(args.name))} périphérique(s)")
+        return 1 if unmatched else 0
+    finally:
+        store.conn.close()
+
+
+def cmd_tag(args):
+    """Ajouter ou retirer une étiquette."""
+    store = open_store(args.db)
+    groups = GroupStore(store.conn)
+    try:
+        targets, unmatched = resolve_targets(store, args.targets)
+        for target in unmatched:
+            print(f"Aucun périphérique ne correspond à '{target}'.", file=sys.stderr)
+        device_ids = [store.by_mac(mac).id for _, mac in targets if store.by_mac(mac)]
+        if args.remove:
+            groups.untag(device_ids, args.tag)
+        else:
+            groups.tag(device_ids, args.tag)
+        return 1 if unmatched else 0
+    finally:
+        store.conn.close()
+
+
+def cmd_serve(args):
+    """Exposer l'API HTTP locale sans interface graphique, jusqu'à Ctrl+C."""
+    # asyncio n'est chargé que pour cette commande
+    import asyncio
+    from api import WakeApiServer
+    from wol import MagicPacketSender
+
+    store = open_store(args.db)
+    sender = MagicPacketSender(args.broadcast or BROADCAST_IP, args.port_wol, args.interface)
+    routing = None
+    if args.broadcast is None:
+        def routing(macs):
+            return store.targets(macs, interface=args.interface, port=args.port_wol)
+    history = HistoryWriter(args.db or default_db_path(), *retention_settings(store.conn))
+    history.start()
+    server = WakeApiServer(store, sender, args.host, args.port, routing=routing, history=history)
+    print(f"API HTTP à l'écoute sur http://{args.host}:{args.port}", flush=True)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.sender.close()
+        history.stop()
+        store.conn.close()
+    return 0
+
+
+def cmd_discover(args):
+    """Trouver les périphériques du réseau (table ARP, balayage) et, avec --add, les enregistrer."""
+    import asyncio
+    from discovery import add_discovered, diff_devices, discover
+
+    try:
+        hosts = asyncio.run(discover(args.subnet, resolve=not args.no_dns))
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    store = open_store(args.db)
+    try:
+        diff = diff_devices(store, hosts)
+        added = add_discovered(store, diff) if args.add else []
+    finally:
+        store.conn.close()
+
+    if args.json:
+        print(json.dumps(dict(diff.as_dict(), added=[device.as_dict() for device in added]), ensure_ascii=False))
+        return 0
+    for host in diff.new:
+        print(f"+ {host.name or '-'} ({host.mac}) {host.ip}")
+    for device, host in diff.moved:
+        print(f"~ {device.name} ({device.mac}) {device.ip or '-'} -> {host.ip}")
+    print(diff)
+    if args.add:
+        print(f"{len(added)} périphérique(s) ajouté(s), {len(diff.moved)} adresse(s) IP mise(s) à jour")
+    return 0
+
+
+def cmd_relay(args):
+    """Gérer les relais des sous-réseaux distants ou faire tourner un relais."""
+    if args.relay_command == 'serve':
+        return _serve_relay(args)
+    store = open_store(args.db)
+    routes = RelayRoutes(store.conn)
+    try:
+        if args.relay_command == 'list':
+            relays = routes.all()
+            if args.json:
+                print(json.dumps([{'network': network, 'host': host, 'port': port} for network, host, port in relays]))
+            else:
+                for network, host, port in relays:
+                    print(f"{network} -> {host}:{port}")
+            return 0
+        if args.relay_command == 'remove':
+            return 0 if routes.remove(args.network) else 2
+        key = args.key or os.environ.get(KEY_ENV)
+        if not key:
+            print(f"Clé du relais manquante (--key ou variable {KEY_ENV}).", file=sys.stderr)
+            return 2
+        try:
+            host, port = parse_relay_address(args.address)
+            network = routes.add(args.network, host, port, key)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 2
+        print(f"{network} -> {host}:{port}")
+        return 0
+    finally:
+        store.conn.close()
+
+
+def cmd_history(args):
+    """Afficher les derniers réveils, les plus récents d'abord."""
+    store = open_store(args.db)
+    try:
+        device_id = None
+        if args.device:
+            device = store.by_name(args.device) or store.by_mac(args.device)
+            if device is None:
+                print(f"Aucun périphérique ne correspond à '{args.device}'.", file=sys.stderr)
+                return 2
+            device_id = device.id
+        events = HistoryStore(store.conn).page(limit=args.limit, device_id=device_id)
+    finally:
+        store.conn.close()
+    if args.json:
+        print(json.dumps([event.as_dict() for event in events], ensure_ascii=False))
+        return 0
+    for event in events:
+        status = "ok" if event.ok else f"échec : {event.error}"
+        up = f", en ligne après {event.up_after:.0f} s" if event.up_after is not None else ""
+        label = f"{event.name} ({event.mac})" if event.name else event.mac
+        print(f"{_format_time(event.ts)} {label} [{event.source}, {event.user or '-'}] {status}{up}")
+    return 0
+
+
+def _serve_relay(args):
+    """Recevoir les demandes de réveil signées et réémettre les paquets sur le segment local, jusqu'à Ctrl+C."""
+    import asyncio
+    from relay import RelayServer
+    from wol import MagicPacketSender
+
+    key = args.key or os.environ.get(KEY_ENV)
+    if not key:
+        print(f"Clé du relais manquante (--key ou variable {KEY_ENV}).", file=sys.stderr)
+        return 2
+    server = RelayServer(key, MagicPacketSender(args.broadcast, args.wol_port, args.interface), args.host, args.port)
+    print(f"Relais WOL à l'écoute sur {args.host}:{args.port} (UDP)", flush=True)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.sender.close()
+    return 0
+
+
+def add_wol_arguments(parser, port_option='--port', port_dest='port'):
+    """Options de destination des paquets : adresse de diffusion, port UDP et carte réseau source."""
+    parser.add_argument('--broadcast', help="Adresse de diffusion pour tous les périphériques (par défaut : "
+                                            "diffusion dirigée de chaque adresse IP enregistrée, ou relais).")
+    parser.add_argument(port_option, dest=port_dest, type=int, default=9, help="Port UDP des paquets WOL.")
+    parser.add_argument('--interface', metavar='IP', help="Adresse IP de la carte réseau d'envoi.")
+
+
+def build_parser():
+    """Construire l'analyseur des arguments de la ligne de commande."""
+    parser = argparse.ArgumentParser(prog='sc-pywol', description="Réveiller des périphériques avec Wake-On-LAN.")
+    parser.add_argument('--db', help="Base de données SQLite des périphériques (par défaut : $SC_PYWOL_DB, sinon le "
+                                     "dossier de données de l'utilisateur).")
+    parser.add_argument('--metrics', metavar='FICHIER',
+                        help="Mesurer les durées et les écrire à la fin (JSON si .json, sinon Prometheus).")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    list_parser = subparsers.add_parser('list', help="Lister les périphériques enregistrés.")
+    list_parser.add_argument('--json', action='store_true', help="Sortie au format JSON.")
+    list_parser.set_defaults(func=cmd_list)
+
+    wake_parser = subparsers.add_parser('wake', help="Réveiller des périphériques.")
+    wake_parser.add_argument('targets', nargs='+',
+                             help="Nom, adresse MAC, motif glob (ex. 'rack-b-*'), '@groupe' ou 'tag:étiquette'.")
+    wake_parser.add_argument('--repeat', type=int, default=1, help="Nombre de paquets par périphérique.")
+    wake_parser.add_argument('--interval', type=float, default=0.0, help="Pause entre deux répétitions (secondes).")
+    add_wol_arguments(wake_parser)
+    wake_parser.add_argument('--wave-size', type=int, default=0,
+                             help="Réveiller par vagues de N périphériques au plus (0 : tous en même temps).")
+    wake_parser.add_argument('--wave-delay', type=float, default=1.0, help="Pause entre deux vagues (secondes).")
+    wake_parser.add_argument('--json', action='store_true', help="Sortie au format JSON.")
+    wake_parser.set_defaults(func=cmd_wake)
+
+    import_parser = subparsers.add_parser('import', help="Importer un inventaire (CSV, JSON, ethers, baux DHCP).")
+    import_parser.add_argument('file', help="Fichier à importer.")
+    import_parser.add_argument('--format', choices=FORMATS, help="Format du fichier (deviné d'après son nom).")
+    import_parser.add_argument('--json', action='store_true', help="Résumé au format JSON.")
+    import_parser.set_defaults(func=cmd_import)
+
+    export_parser = subparsers.add_parser('export', help="Exporter l'inventaire (CSV, JSON, ethers).")
+    export_parser.add_argument('file', help="Fichier de destination.")
+    export_parser.add_argument('--format', choices=EXPORT_FORMATS, help="Format du fichier (deviné d'après son nom).")
+    export_parser.set_defaults(func=cmd_export)
+
+    schedule_parser = subparsers.add_parser('schedule', help="Gérer les réveils planifiés.")
+    schedule_commands = schedule_parser.add_subparsers(dest='schedule_command', required=True)
+    add_parser = schedule_commands.add_parser('add', help="Planifier un réveil.")
+    add_parser.add_argument('target', help="Nom, adresse MAC ou motif glob (ex. 'rack-b-*').")
+    when = add_parser.add_mutually_exclusive_group(required=True)
+    when.add_argument('--at', help="Réveil unique à une date locale (ex. 2026-10-20T06:30).")
+    when.add_argument('--cron', help="Expression cron à cinq champs (ex. '30 6 * * 1-5').")
+    when.add_argument('--every', help="Réveil périodique, intervalle en secondes.")
+    add_parser.add_argument('--no-catch-up', action='store_true',
+                            help="Ne pas rattraper les réveils manqués pendant un arrêt.")
+    add_parser.set_defaults(func=cmd_schedule_add)
+    list_schedules_parser = schedule_commands.add_parser('list', help="Lister les planifications.")
+    list_schedules_parser.add_argument('--json', action='store_true', help="Sortie au format JSON.")
+    list_schedules_parser.set_defaults(func=cmd_schedule_list)
+    remove_parser = schedule_commands.add_parser('remove', help="Supprimer une planification.")
+    remove_parser.add_argument('id', type=int, help="Identifiant de la planification.")
+    remove_parser.set_defaults(func=cmd_schedule_remove)
+
+    scheduler_parser = subparsers.add_parser('scheduler', help="Exécuter les réveils planifiés sans interface.")
+    add_wol_arguments(scheduler_parser)
+    scheduler_parser.set_defaults(func=cmd_scheduler)
+
+    group_parser = subparsers.add_parser('group', help="Gérer les groupes de périphériques.")
+    group_commands = group_parser.add_subparsers(dest='group_command', required=True)
+    group_commands.add_parser('list', help="Lister les groupes.").set_defaults(func=cmd_group)
+    for command, help_text in (('add', "Ajouter des périphériques à un groupe (créé si besoin)."),
+                               ('remove', "Retirer des périphériques d'un groupe.")):
+        member_parser = group_commands.add_parser(command, help=help_text)
+        member_parser.add_argument('name', help="Nom du groupe.")
+        member_parser.add_argument('targets', nargs='+', help="Nom, adresse MAC ou motif glob.")
+        member_parser.set_defaults(func=cmd_group)
+    delete_group_parser = group_commands.add_parser('delete', help="Supprimer un groupe.")
+    delete_group_parser.add_argument('name', help="Nom du groupe.")
+    delete_group_parser.set_defaults(func=cmd_group)
+
+    tag_parser = subparsers.add_parser('tag', help="Étiqueter des périphériques.")
+    tag_parser.add_argument('tag', help="Nom de l'étiquette.")
+    tag_parser.add_argument('targets', nargs='+', help="Nom, adresse MAC ou motif glob.")
+    tag_parser.add_argument('--remove', action='store_true', help="Retirer l'étiquette.")
+    tag_parser.set_defaults(func=cmd_tag)
+
+    serve_parser = subparsers.add_parser('serve', help="Exposer l'API HTTP locale sans interface.")
+    serve_parser.add_argument('--host', default='127.0.0.1', help="Adresse d'écoute (127.0.0.1 par défaut).")
+    serve_parser.add_argument('--port', type=int, default=8760, help="Port d'écoute.")
+    add_wol_arguments(serve_parser, '--wol-port', 'port_wol')
+    serve_parser.set_defaults(func=cmd_serve)
+
+    discover_parser = subparsers.add_parser('discover', help="Trouver les périphériques du réseau.")
+    discover_parser.add_argument('--subnet', metavar='CIDR', help="Sous-réseau à balayer (ex. 192.168.0.0/22).")
+    discover_parser.add_argument('--no-dns', action='store_true', help="Ne pas chercher les noms par DNS inverse.")
+    discover_parser.add_argument('--add', action='store_true',
+                                 help="Enregistrer les nouveaux périphériques et les adresses IP changées.")
+    discover_parser.add_argument('--json', action='store_true', help="Sortie au format JSON.")
+    discover_parser.set_defaults(func=cmd_discover)
+
+    relay_parser = subparsers.add_parser('relay', help="Relais Wake On Lan vers les sous-réseaux distants.")
+    relay_commands = relay_parser.add_subparsers(dest='relay_command', required=True)
+    relay_serve_parser = relay_commands.add_parser('serve', help="Faire tourner un relais sur cette machine.")
+    relay_serve_parser.add_argument('--host', default='0.0.0.0', help="Adresse d'écoute.")
+    relay_serve_parser.add_argument('--port', type=int, default=RELAY_PORT, help="Port UDP d'écoute.")
+    relay_serve_parser.add_argument('--key', help=f"Clé partagée (par défaut : variable {KEY_ENV}).")
+    relay_serve_parser.add_argument('--broadcast', default=BROADCAST_IP, help="Adresse de diffusion locale.")
+    relay_serve_parser.add_argument('--wol-port', type=int, default=9, help="Port UDP des paquets WOL.")
+    relay_serve_parser.add_argument('--interface', metavar='IP', help="Adresse IP de la carte réseau d'envoi.")
+    relay_serve_parser.set_defaults(func=cmd_relay)
+    relay_add_parser = relay_commands.add_parser('add', help="Passer par un relais pour un sous-réseau.")
+    relay_add_parser.add_argument('network', help="Sous-réseau servi par le relais (ex. 10.20.0.0/16).")
+    relay_add_parser.add_argument('address', help=f"Hôte du relais, avec son port (ex. relais-b:{RELAY_PORT}).")
+    relay_add_parser.add_argument('--key', help=f"Clé partagée (par défaut : variable {KEY_ENV}).")
+    relay_add_parser.set_defaults(func=cmd_relay)
+    relay_list_parser = relay_commands.add_parser('list', help="Lister les relais.")
+    relay_list_parser.add_argument('--json', action='store_true', help="Sortie au format JSON.")
+    relay_list_parser.set_defaults(func=cmd_relay)
+    relay_remove_parser = relay_commands.add_parser('remove', help="Ne plus passer par un relais.")
+    relay_remove_parser.add_argument('network', help="Sous-réseau du relais.")
+    relay_remove_parser.set_defaults(func=cmd_relay)
+
+    history_parser = subparsers.add_parser('history', help="Afficher l'historique des réveils.")
+    history_parser.add_argument('--device', help="Nom ou adresse MAC d'un périphérique.")
+    history_parser.add_argument('--limit', type=int, default=PAGE_SIZE, help="Nombre d'événements affichés.")
+    history_parser.add_argument('--json', action='store_true', help="Sortie au format JSON.")
+    history_parser.set_defaults(func=cmd_history)
+    return parser
+
+
+def main(argv=None):
+    """Point d'entrée de la ligne de commande."""
+    args = build_parser().parse_args(argv)
+    if not args.metrics:
+        return args.func(args)
+    metrics.enable()
+    try:
+        return args.func(args)
+    finally:
+        metrics.export(args.metrics)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
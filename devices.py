@@ -0,0 +1,257 @@
+import threading
+from metrics import metrics
+from storage import SCHEMA_VERSION, connect, migrate
+from wol import (DEFAULT_PORT, build_magic_packet, mac_key, mac_to_bytes, normalize_mac, resolve_target,
+                 secureon_to_bytes)
+
+
+class Device:
+    """Périphérique enregistré dans la base de données."""
+    __slots__ = ('id', 'name', 'mac', 'ip', 'icon', 'secureon', 'packet')
+    FIELDS = ('id', 'name', 'mac', 'ip', 'icon')  # Champs exportés (sans le mot de passe SecureOn)
+
+    def __init__(self, id, name, mac, ip=None, icon=None, secureon=None, packet=None):
+        self.id = id
+        self.name = name
+        self.mac = mac
+        self.ip = ip
+        self.icon = icon
+        self.secureon = secureon  # Mot de passe SecureOn (6 octets) ou None
+        self.packet = packet  # Paquet magique précalculé, None si l'adresse MAC est invalide
+
+    def __getitem__(self, key):
+        """Accès par clé, comme pour les anciens dictionnaires de périphériques."""
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def as_dict(self):
+        return {key: getattr(self, key) for key in self.FIELDS}
+
+    def __repr__(self):
+        return f"Device(id={self.id!r}, name={self.name!r}, mac={self.mac!r})"
+
+
+class DeviceStore:
+    """Périphériques en mémoire indexés par id, nom et adresse MAC, synchronisés avec SQLite.
+
+    Les modifications viennent du thread de l'interface ; l'API HTTP lit depuis le sien.
+    Les index sont modifiés et parcourus sous un verrou, et `reload` les remplace d'un bloc.
+    """
+    def __init__(self, conn, load=True):
+        self.conn = conn
+        migrate(conn)
+        self._lock = threading.RLock()
+        self._by_id = {}
+        self._by_name = {}
+        self._by_mac = {}
+        self._loaded_up_to = 0  # Plus grand identifiant déjà lu par load_batch
+        self._relays = None  # (RelayRoutes.generation, routes des relais) : voir `relay_table`
+        if load:
+            self.reload()
+
+    def reload(self):
+        """Relire tous les périphériques de la base de données."""
+        by_id = {}
+        by_name = {}
+        by_mac = {}
+        with metrics.span('db_load_devices_seconds'):
+            for row in self.conn.execute('SELECT id, name, mac, ip, icon, secureon, packet FROM devices ORDER BY id'):
+                device = Device(*row)
+                by_id[device.id] = by_name[device.name] = by_mac[mac_key(device.mac)] = device
+        # Index reconstruits à part puis échangés : une lecture ne voit jamais une liste à moitié relue
+        with self._lock:
+            self._by_id, self._by_name, self._by_mac = by_id, by_name, by_mac
+            self._loaded_up_to = max(by_id, default=0)
+        self._relays = None  # Relais modifiés par un autre processus : relus avec les périphériques
+
+    def load_batch(self, size):
+        """Lire les `size` périphériques suivants (chargement progressif) ; retourne ceux qui ont été ajoutés.
+
+        Une liste vide signifie que tout est chargé. Les périphériques déjà connus (ajoutés
+        entre deux lots) sont ignorés.
+        """
+        added = []
+        while not added:
+            rows = self.conn.execute('SELECT id, name, mac, ip, icon, secureon, packet FROM devices WHERE id > ? '
+                                     'ORDER BY id LIMIT ?', (self._loaded_up_to, size)).fetchall()
+            if not rows:
+                break
+            self._loaded_up_to = rows[-1][0]
+            for row in rows:
+                if row[0] not in self._by_id:
+                    device = Device(*row)
+                    self._index(device)
+                    added.append(device)
+        return added
+
+    def _index(self, device):
+        with self._lock:
+            self._by_id[device.id] = device
+            self._by_name[device.name] = device
+            self._by_mac[mac_key(device.mac)] = device
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._by_id.values()))
+
+    def __contains__(self, device_id):
+        return device_id in self._by_id
+
+    def get(self, device_id):
+        """Retrouver un périphérique par son identifiant."""
+        return self._by_id.get(device_id)
+
+    def by_name(self, name):
+        """Retrouver un périphérique par son nom."""
+        return self._by_name.get(name)
+
+    def by_mac(self, mac):
+        """Retrouver un périphérique par son adresse MAC, quel que soit le séparateur."""
+        return self._by_mac.get(mac_key(mac))
+
+    def packets(self, macs):
+        """Paquets précalculés des adresses MAC connues : {adresse MAC: octets}."""
+        packets = {}
+        with self._lock:
+            by_mac = self._by_mac
+        for mac in macs:
+            device = by_mac.get(mac_key(mac))
+            if device is not None and device.packet is not None:
+                packets[mac] = device.packet
+        return packets
+
+    def targets(self, macs, interface=None, port=DEFAULT_PORT):
+        """Destinations des paquets d'après l'adresse IP enregistrée : {adresse MAC: WakeTarget}.
+
+        Voir `wol.resolve_target` ; les périphériques sans adresse IP sont absents du
+        résultat et reçoivent les paquets à l'adresse par défaut de l'émetteur.
+        """
+        relays = self.relay_table()
+        targets = {}
+        with self._lock:
+            by_mac = self._by_mac
+        for mac in macs:
+            device = by_mac.get(mac_key(mac))
+            if device is None or not device.ip:
+                continue
+            target = resolve_target(device.ip, interface=interface, default_port=port, relays=relays)
+            if target is not None:
+                targets[mac] = target
+        return targets
+
+    def relay_table(self):
+        """Routes des relais (`RelayRoutes.table`), gardées en mémoire.
+
+        Elles sont relues après une modification par RelayRoutes dans ce processus, ou au
+        prochain `reload` pour celles faites par un autre processus (ligne de commande) :
+        l'API HTTP résout les destinations sans attendre la base de données.
+        """
+        from relay import RelayRoutes
+
+        cached = self._relays
+        if cached is None or cached[0] != RelayRoutes.generation:
+            generation = RelayRoutes.generation
+            cached = self._relays = (generation, RelayRoutes(self.conn).table())
+        return cached[1]
+
+    def add(self, name, mac, ip=None, icon=None, secureon=None):
+        """Valider et enregistrer un nouveau périphérique, puis le retourner.
+
+        L'adresse MAC est enregistrée sous la forme AA:BB:CC:DD:EE:FF avec son paquet magique.
+        """
+        raw = mac_to_bytes(mac)
+        mac = normalize_mac(mac)
+        secureon = secureon_to_bytes(secureon)
+        if name in self._by_name:
+            raise ValueError(f"Un périphérique nommé '{name}' existe déjà.")
+        if mac_key(mac) in self._by_mac:
+            raise ValueError(f"L'adresse MAC '{mac}' est déjà utilisée par '{self.by_mac(mac).name}'.")
+        ip = ip or None
+        icon = icon or None
+        packet = build_magic_packet(raw, secureon)
+        with metrics.span('db_write_seconds'), self.conn:
+            cursor = self.conn.execute('INSERT INTO devices (name, mac, ip, icon, mac_bytes, secureon, packet) '
+                                       'VALUES (?, ?, ?, ?, ?, ?, ?)', (name, mac, ip, icon, raw, secureon, packet))
+        device = Device(cursor.lastrowid, name, mac, ip, icon, secureon, packet)
+        self._index(device)
+        return device
+
+    def add_many(self, entries, ips=None):
+        """Enregistrer plusieurs périphériques (nom, adresse MAC, adresse IP) en une seule transaction.
+
+        Tout est validé avant l'écriture : un nom ou une adresse MAC déjà utilisés lèvent
+        ValueError sans rien enregistrer. `ips` ({identifiant: adresse IP}) change aussi l'adresse
+        de périphériques existants dans la même transaction. Retourne les périphériques créés.
+        """
+        rows = []
+        names = set()
+        keys = set()
+        for name, mac, ip in entries:
+            raw = mac_to_bytes(mac)
+            mac = normalize_mac(mac)
+            if name in self._by_name or name in names:
+                raise ValueError(f"Un périphérique nommé '{name}' existe déjà.")
+            if mac_key(mac) in self._by_mac or mac_key(mac) in keys:
+                raise ValueError(f"L'adresse MAC '{mac}' est déjà utilisée.")
+            names.add(name)
+            keys.add(mac_key(mac))
+            rows.append((name, mac, ip or None, raw, build_magic_packet(raw)))
+        devices = []
+        with metrics.span('db_write_seconds'), self.conn:
+            for name, mac, ip, raw, packet in rows:
+                cursor = self.conn.execute('INSERT INTO devices (name, mac, ip, mac_bytes, packet) '
+                                           'VALUES (?, ?, ?, ?, ?)', (name, mac, ip, raw, packet))
+                devices.append(Device(cursor.lastrowid, name, mac, ip, None, None, packet))
+            ips = self._write_ips(ips or {})
+        with self._lock:
+            for device in devices:
+                self._index(device)
+            self._index_ips(ips)
+        return devices
+
+    def set_ips(self, ips):
+        """Changer l'adresse IP de plusieurs périphériques {identifiant: adresse IP} en une seule transaction."""
+        with metrics.span('db_write_seconds'), self.conn:
+            ips = self._write_ips(ips)
+        with self._lock:
+            self._index_ips(ips)
+
+    def _write_ips(self, ips):
+        """Écrire les adresses IP {identifiant: adresse IP} dans la transaction en cours.
+
+        Les identifiants inconnus sont ignorés ; retourne les adresses écrites.
+        """
+        ips = {device_id: ip or None for device_id, ip in ips.items() if device_id in self._by_id}
+        self.conn.executemany('UPDATE devices SET ip = ? WHERE id = ?',
+                              [(ip, device_id) for device_id, ip in ips.items()])
+        return ips
+
+    def _index_ips(self, ips):
+        """Reporter en mémoire les adresses écrites par `_write_ips` (appelé avec le verrou)."""
+        for device_id, ip in ips.items():
+            self._by_id[device_id].ip = ip
+
+    def remove(self, device_id):
+        """Supprimer un périphérique par son identifiant et le retourner.
+
+        Les index ne sont modifiés qu'une fois la suppression enregistrée : si elle échoue,
+        le périphérique reste dans la liste, comme dans la base.
+        """
+        device = self._by_id.get(device_id)
+        if device is None:
+            return None
+        with metrics.span('db_write_seconds'), self.conn:
+            self.conn.execute('DELETE FROM devices WHERE id = ?', (device_id,))
+            # Les clés étrangères ne sont pas activées par défaut dans SQLite
+            self.conn.execute('DELETE FROM group_members WHERE device_id = ?', (device_id,))
+            self.conn.execute('DELETE FROM device_tags WHERE device_id = ?', (device_id,))
+        with self._lock:
+            self._by_id.pop(device_id, None)
+            self._by_name.pop(device.name, None)
+            self._by_mac.pop(mac_key(device.mac), None)
+        return device
@@ -0,0 +1,217 @@
+"""Découverte des périphériques du réseau : table ARP du noyau et balayage d'un sous-réseau.
+
+Le balayage sonde en parallèle (asyncio, nombre de sondes simultanées limité) chaque
+adresse d'un sous-réseau, ce qui oblige aussi le noyau à résoudre leurs adresses MAC.
+Les adresses MAC sont ensuite lues dans la table ARP (/proc/net/arp sous Linux,
+`arp -a` ailleurs) et les noms retrouvés par DNS inverse.
+
+    hosts = asyncio.run(discover('192.168.0.0/22'))
+    diff = diff_devices(store, hosts)
+    add_discovered(store, diff)
+"""
+import ipaddress
+import os
+import re
+import socket
+import subprocess
+from wol import normalize_mac, probe_host
+
+ARP_TABLE = '/proc/net/arp'
+ATF_COM = 0x2  # Entrée ARP résolue (drapeau du noyau Linux)
+SWEEP_PORTS = (445, 22, 80)  # Moins de ports que la surveillance de présence : 3 sockets par adresse
+SWEEP_CONCURRENCY = 128
+SWEEP_TIMEOUT = 0.5
+MAX_SWEEP_ADDRESSES = 65536  # /16 au plus
+DNS_CONCURRENCY = 32
+DNS_TIMEOUT = 2.0
+
+# Ligne de `arp -a` : « ? (10.0.0.1) at 0:11:22:33:44:55 » (macOS, BSD) ou « 10.0.0.1  00-11-22-33-44-55 » (Windows)
+ARP_LINE_REGEX = re.compile(r'(\d+\.\d+\.\d+\.\d+)\)?\s+(?:at\s+)?([0-9A-Fa-f]{1,2}(?:[:-][0-9A-Fa-f]{1,2}){5})\b')
+
+
+class DiscoveredHost:
+    """Hôte trouvé sur le réseau."""
+    __slots__ = ('ip', 'mac', 'name', 'alive')
+
+    def __init__(self, ip, mac, name=None, alive=False):
+        self.ip = ip
+        self.mac = mac  # Forme AA:BB:CC:DD:EE:FF
+        self.name = name  # Nom trouvé par DNS inverse
+        self.alive = alive  # A répondu à une sonde TCP pendant le balayage
+
+    def as_dict(self):
+        return {'ip': self.ip, 'mac': self.mac, 'name': self.name, 'alive': self.alive}
+
+    def __repr__(self):
+        return f"DiscoveredHost({self.ip!r}, {self.mac!r}, name={self.name!r})"
+
+
+def _unicast_mac(mac):
+    """Adresse MAC normalisée, ou None pour une adresse nulle, de diffusion ou de multidiffusion."""
+    mac = normalize_mac(':'.join(part.zfill(2) for part in re.split('[:-]', mac)))
+    if mac == '00:00:00:00:00:00' or int(mac[:2], 16) & 1:
+        return None
+    return mac
+
+
+def parse_proc_arp(text):
+    """Lire le contenu de /proc/net/arp ; retourne {adresse MAC: adresse IP} des entrées résolues."""
+    table = {}
+    for line in text.splitlines()[1:]:
+        fields = line.split()
+        if len(fields) < 4 or not int(fields[2], 16) & ATF_COM:
+            continue
+        mac = _unicast_mac(fields[3])
+        if mac is not None:
+            table[mac] = fields[0]
+    return table
+
+
+def parse_arp_command(text):
+    """Lire la sortie de `arp -a` ; retourne {adresse MAC: adresse IP}."""
+    table = {}
+    for match in ARP_LINE_REGEX.finditer(text):
+        mac = _unicast_mac(match.group(2))
+        if mac is not None:
+            table[mac] = match.group(1)
+    return table
+
+
+def read_arp_table(path=ARP_TABLE):
+    """Table des voisins du noyau : {adresse MAC: adresse IP}."""
+    if os.path.exists(path):
+        with open(path, 'r', encoding='ascii', errors='replace') as f:
+            return parse_proc_arp(f.read())
+    try:
+        output = subprocess.run(['arp', '-a'], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return {}
+    return parse_arp_command(output)
+
+
+def parse_network(network):
+    """Valider un sous-réseau (notation CIDR) et refuser ceux qui sont trop grands pour être balayés."""
+    try:
+        network = ipaddress.ip_network(network.strip(), strict=False)
+    except ValueError as e:
+        raise ValueError(f"Sous-réseau invalide : {e}") from None
+    if network.version != 4:
+        raise ValueError("Seuls les sous-réseaux IPv4 peuvent être balayés.")
+    if network.num_addresses > MAX_SWEEP_ADDRESSES:
+        raise ValueError(f"Sous-réseau trop grand (au plus /16) : {network}")
+    return network
+
+
+async def sweep(network, probe=None, max_concurrency=SWEEP_CONCURRENCY, timeout=SWEEP_TIMEOUT):
+    """Sonder en parallèle chaque adresse d'un sous-réseau ; retourne l'ensemble des adresses qui répondent."""
+    import asyncio
+
+    network = parse_network(str(network))
+    probe = probe or (lambda ip: probe_host(ip, ports=SWEEP_PORTS, timeout=timeout))
+    semaphore = asyncio.Semaphore(max_concurrency)
+    addresses = [str(ip) for ip in network.hosts()]
+
+    async def check(ip):
+        async with semaphore:
+            try:
+                return await probe(ip)
+            except OSError:
+                return False
+
+    results = await asyncio.gather(*(check(ip) for ip in addresses))
+    return {ip for ip, alive in zip(addresses, results) if alive}
+
+
+async def resolve_names(ips, max_concurrency=DNS_CONCURRENCY, timeout=DNS_TIMEOUT):
+    """Noms des adresses IP par DNS inverse (résolutions parallèles) : {adresse IP: nom court}."""
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def resolve(ip):
+        async with semaphore:
+            try:
+                hostname = (await asyncio.wait_for(loop.run_in_executor(None, socket.gethostbyaddr, ip), timeout))[0]
+            except (OSError, asyncio.TimeoutError):
+                return None
+        # Nom court : « nas.maison.lan » devient « nas »
+        return None if hostname == ip else hostname.split('.')[0]
+
+    names = await asyncio.gather(*(resolve(ip) for ip in ips))
+    return {ip: name for ip, name in zip(ips, names) if name}
+
+
+async def discover(network=None, resolve=True, arp_path=ARP_TABLE, probe=None, max_concurrency=SWEEP_CONCURRENCY):
+    """Trouver les hôtes du réseau avec leur adresse MAC, triés par adresse IP.
+
+    Sans sous-réseau, seule la table ARP est lue ; avec un sous-réseau, il est d'abord
+    balayé et seuls ses hôtes sont retournés.
+    """
+    alive = set()
+    if network is not None:
+        network = parse_network(str(network))
+        alive = await sweep(network, probe=probe, max_concurrency=max_concurrency)
+    hosts = [DiscoveredHost(ip, mac, alive=ip in alive) for mac, ip in read_arp_table(arp_path).items()
+             if network is None or ipaddress.ip_address(ip) in network]
+    hosts.sort(key=lambda host: ipaddress.ip_address(host.ip))
+    if resolve and hosts:
+        names = await resolve_names([host.ip for host in hosts])
+        for host in hosts:
+            host.name = names.get(host.ip)
+    return hosts
+
+
+class DiscoveryDiff:
+    """Comparaison des hôtes trouvés avec les périphériques enregistrés."""
+    __slots__ = ('new', 'moved', 'known')
+
+    def __init__(self):
+        self.new = []  # Hôtes dont l'adresse MAC est inconnue
+        self.moved = []  # (périphérique, hôte) dont l'adresse IP a changé
+        self.known = []  # Périphériques déjà enregistrés avec la même adresse IP
+
+    def as_dict(self):
+        return {'new': [host.as_dict() for host in self.new],
+                'moved': [{'id': device.id, 'name': device.name, 'mac': device.mac, 'old_ip': device.ip,
+                           'ip': host.ip} for device, host in self.moved],
+                'known': [device.id for device in self.known]}
+
+    def __str__(self):
+        return f"{len(self.new)} nouveau(x), {len(self.moved)} adresse(s) IP changée(s), {len(self.known)} connu(s)"
+
+
+def diff_devices(store, hosts):
+    """Comparer des hôtes découverts aux périphériques du magasin (par adresse MAC)."""
+    diff = DiscoveryDiff()
+    for host in hosts:
+        device = store.by_mac(host.mac)
+        if device is None:
+            diff.new.append(host)
+        elif device.ip != host.ip:
+            diff.moved.append((device, host))
+        else:
+            diff.known.append(device)
+    return diff
+
+
+def host_name(store, host, taken):
+    """Nom libre pour un hôte découvert : nom DNS, sinon « host-10-0-0-12 », suffixé si déjà pris."""
+    base = host.name or f"host-{host.ip.replace('.', '-')}"
+    name = base
+    suffix = 2
+    while store.by_name(name) is not None or name in taken:
+        name = f"{base}-{suffix}"
+        suffix += 1
+    taken.add(name)
+    return name
+
+
+def add_discovered(store, diff, update_ips=True):
+    """Enregistrer les nouveaux hôtes et, si demandé, les adresses IP changées, en une seule transaction.
+
+    Retourne les périphériques créés.
+    """
+    taken = set()
+    ips = {device.id: host.ip for device, host in diff.moved} if update_ips else None
+    return store.add_many([(host_name(store, host, taken), host.mac, host.ip) for host in diff.new], ips)
@@ -0,0 +1,115 @@
+"""Groupes et étiquettes de périphériques (tables `groups`, `group_members`, `tags`, `device_tags`).
+
+Un groupe sert de cible de réveil (« @rack-b » en ligne de commande) ; une étiquette
+(« tag:salle-serveurs ») classe les périphériques. Un même périphérique peut appartenir
+à plusieurs groupes et porter plusieurs étiquettes.
+"""
+
+
+class GroupStore:
+    """Accès aux groupes et aux étiquettes ; chaque résolution est une seule requête indexée."""
+    def __init__(self, conn):
+        self.conn = conn
+
+    # Groupes
+
+    def groups(self):
+        """Liste des (identifiant, nom, nombre de membres) de tous les groupes."""
+        return self.conn.execute('''SELECT g.id, g.name, COUNT(m.device_id) FROM groups g
+                                    LEFT JOIN group_members m ON m.group_id = g.id
+                                    GROUP BY g.id ORDER BY g.name''').fetchall()
+
+    def group_id(self, name):
+        """Identifiant d'un groupe, ou None s'il n'existe pas."""
+        row = self.conn.execute('SELECT id FROM groups WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else None
+
+    def create_group(self, name):
+        """Créer un groupe (ou retrouver celui qui porte ce nom) et retourner son identifiant."""
+        name = name.strip()
+        if not name:
+            raise ValueError("Le nom du groupe est vide.")
+        with self.conn:
+            self.conn.execute('INSERT OR IGNORE INTO groups (name) VALUES (?)', (name,))
+        return self.group_id(name)
+
+    def delete_group(self, name):
+        """Supprimer un groupe et ses appartenances ; les périphériques sont conservés."""
+        group_id = self.group_id(name)
+        if group_id is None:
+            return False
+        with self.conn:
+            self.conn.execute('DELETE FROM group_members WHERE group_id = ?', (group_id,))
+            self.conn.execute('DELETE FROM groups WHERE id = ?', (group_id,))
+        return True
+
+    def add_members(self, name, device_ids):
+        """Ajouter des périphériques à un groupe, créé si besoin."""
+        group_id = self.create_group(name)
+        with self.conn:
+            self.conn.executemany('INSERT OR IGNORE INTO group_members (group_id, device_id) VALUES (?, ?)',
+                                  [(group_id, device_id) for device_id in device_ids])
+        return group_id
+
+    def remove_members(self, name, device_ids):
+        """Retirer des périphériques d'un groupe."""
+        with self.conn:
+            self.conn.executemany('DELETE FROM group_members WHERE device_id = ? AND group_id = '
+                                  '(SELECT id FROM groups WHERE name = ?)',
+                                  [(device_id, name) for device_id in device_ids])
+
+    def members(self, name):
+        """Identifiants des membres d'un groupe, dans l'ordre des identifiants."""
+        return [row[0] for row in self.conn.execute(
+            '''SELECT m.device_id FROM groups g JOIN group_members m ON m.group_id = g.id
+               WHERE g.name = ? ORDER BY m.device_id''', (name,))]
+
+    def groups_of(self, device_id):
+        """Noms des groupes d'un périphérique."""
+        return [row[0] for row in self.conn.execute(
+            '''SELECT g.name FROM group_members m JOIN groups g ON g.id = m.group_id
+               WHERE m.device_id = ? ORDER BY g.name''', (device_id,))]
+
+    # Étiquettes
+
+    def tags(self):
+        """Liste des (identifiant, nom, nombre de périphériques) de toutes les étiquettes."""
+        return self.conn.execute('''SELECT t.id, t.name, COUNT(d.device_id) FROM tags t
+                                    LEFT JOIN device_tags d ON d.tag_id = t.id
+                                    GROUP BY t.id ORDER BY t.name''').fetchall()
+
+    def tag(self, device_ids, *names):
+        """Étiqueter des périphériques (les étiquettes sont créées si besoin)."""
+        names = [name.strip() for name in names if name.strip()]
+        with self.conn:
+            self.conn.executemany('INSERT OR IGNORE INTO tags (name) VALUES (?)', [(name,) for name in names])
+            self.conn.executemany('INSERT OR IGNORE INTO device_tags (tag_id, device_id) '
+                                  'SELECT id, ? FROM tags WHERE name = ?',
+                                  [(device_id, name) for device_id in device_ids for name in names])
+
+    def untag(self, device_ids, *names):
+        """Retirer des étiquettes à des périphériques."""
+        with self.conn:
+            self.conn.executemany('DELETE FROM device_tags WHERE device_id = ? AND tag_id = '
+                                  '(SELECT id FROM tags WHERE name = ?)',
+                                  [(device_id, name) for device_id in device_ids for name in names])
+
+    def tagged(self, name):
+        """Identifiants des périphériques qui portent une étiquette."""
+        return [row[0] for row in self.conn.execute(
+            '''SELECT d.device_id FROM tags t JOIN device_tags d ON d.tag_id = t.id
+               WHERE t.name = ? ORDER BY d.device_id''', (name,))]
+
+    def tags_by_device(self):
+        """Étiquettes de tous les périphériques : {identifiant: [noms]}, en une seule requête."""
+        tags = {}
+        for device_id, name in self.conn.execute('''SELECT d.device_id, t.name FROM device_tags d
+                                                    JOIN tags t ON t.id = d.tag_id ORDER BY t.name'''):
+            tags.setdefault(device_id, []).append(name)
+        return tags
+
+    def tags_of(self, device_id):
+        """Noms des étiquettes d'un périphérique."""
+        return [row[0] for row in self.conn.execute(
+            '''SELECT t.name FROM device_tags d JOIN tags t ON t.id = d.tag_id
+               WHERE d.device_id = ? ORDER BY t.name''', (device_id,))]
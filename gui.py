@@ -1,17 +1,33 @@
+import logging
 import sys
 import os
-import re
 import sqlite3
+import time
 from PyQt5.QtWidgets import (QApplication, QWidget, QPushButton, QVBoxLayout, QHBoxLayout,
-                             QLineEdit, QLabel, QListWidget, QListWidgetItem, QFileDialog, QMainWindow, QDesktopWidget, QColorDialog, QSlider, QGridLayout, QFrame, QMessageBox)
-from PyQt5.QtGui import QIcon, QCursor, QFont, QPainter, QColor, QPixmap
-from PyQt5.QtCore import Qt, QPoint, QSize
-from wol import wake_device
-
-# Fichier de base de données pour stocker les appareils et les paramètres
-DB_FILE = 'sc_pywol.db'
+                             QLineEdit, QLabel, QListView, QFileDialog, QMainWindow, QDesktopWidget, QColorDialog, QSlider, QGridLayout, QFrame, QMessageBox,
+                             QProgressBar, QCheckBox, QComboBox, QInputDialog, QPlainTextEdit, QTableView, QHeaderView)
+from PyQt5.QtGui import QIcon, QCursor
+from PyQt5.QtCore import Qt, QPoint, QThreadPool, QTimer
+from devices import DeviceStore
+from groups import GroupStore
+from history import UP_WINDOW, HistoryStore, HistoryWriter, current_user, events_from_results
+from icons import tinted_icon
+from metrics import metrics
+from presence import ONLINE, PresenceMonitor
+from settings import SettingsManager
+from storage import Database
+from targets import schedule_targets
+from theme import ThemeEngine
+from scheduler import MAX_SLEEP_SECONDS, Scheduler
+from models import DeviceDelegate, DeviceFilterProxyModel, DeviceIdRole, DeviceListModel, HistoryModel
+from thumbnails import ThumbnailCache
+from wol import MagicPacketSender, is_valid_mac_address
+from workers import DiscoveryTask, PresenceSignals, WakeTask
+
+log = logging.getLogger(__name__)
 
 BORDER_WIDTH = 5  # Largeur de la zone cliquable pour redimensionner
+STARTUP_BATCH_SIZE = 2000  # Périphériques ajoutés à la liste par tour de boucle au démarrage
 
 # Fonction pour obtenir le bon chemin des ressources
 def get_resource_path(relative_path):
@@ -22,11 +38,6 @@ def get_resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
-def is_valid_mac_address(mac):
-    """Vérifie si l'adresse MAC a un format valide."""
-    mac_regex = re.compile(r'^([0-9A-Fa-f]{2}[:-]){5}([0-9A-Fa-f]{2})$|^[0-9A-Fa-f]{12}$')
-    return mac_regex.match(mac) is not None
-
 class CustomTitleBar(QWidget):
     """Barre de titre personnalisée."""
     def __init__(self, parent, window_to_control=None, show_settings_button=True):
@@ -45,7 +56,7 @@ class CustomTitleBar(QWidget):
 
         # Titre de la fenêtre
         self.title_label = QLabel("SC-PYWOL")
-        self.title_label.setStyleSheet(f"color: {self.parent.accent_color}; font-size: 16px; padding-left: 10px;")
+        self.title_label.setObjectName("titleLabel")  # Style défini dans le thème (style.qss)
 
         # Ajouter la favicon à gauche du titre
         title_bar_layout.addWidget(favicon)
@@ -55,9 +66,9 @@ class CustomTitleBar(QWidget):
         if show_settings_button:
             self.settings_button = QPushButton(self)
             parameters_icon_path = get_resource_path("assets/interface/parameters.svg")
-            self.settings_button.setIcon(self.colorize_svg(parameters_icon_path, self.parent.accent_color))
+            self.settings_button.setIcon(tinted_icon(parameters_icon_path, self.parent.accent_color,
+                                                     self.settings_button.iconSize(), self.devicePixelRatioF()))
             self.settings_button.setFixedSize(30, 30)
-            self.settings_button.setStyleSheet("background-color: transparent; color: white;")
             self.settings_button.clicked.connect(self.parent.open_settings)
             title_bar_layout.addStretch()  # Espace avant les boutons à droite
             title_bar_layout.addWidget(self.settings_button)
@@ -65,13 +76,11 @@ class CustomTitleBar(QWidget):
         # Bouton de minimisation
         self.minimize_button = QPushButton("-")
         self.minimize_button.setFixedSize(30, 30)
-        self.minimize_button.setStyleSheet(f"background-color: transparent; color: {self.parent.accent_color};")
         self.minimize_button.clicked.connect(self.minimize_window)
 
         # Bouton de fermeture
         self.close_button = QPushButton("X")
         self.close_button.setFixedSize(30, 30)
-        self.close_button.setStyleSheet(f"background-color: transparent; color: {self.parent.accent_color};")
         self.close_button.clicked.connect(self.close_window)
 
         # Ajouter les widgets au layout
@@ -80,7 +89,9 @@ class CustomTitleBar(QWidget):
 
         self.setLayout(title_bar_layout)
         self.setFixedHeight(30)
-        self.setStyleSheet("background-color: #333;")  # Couleur de fond de la barre de titre
+        # Couleur de fond de la barre de titre définie dans le thème
+        self.setObjectName("titleBar")
+        self.setAttribute(Qt.WA_StyledBackground)
 
     def minimize_window(self):
         """Minimiser la fenêtre."""
@@ -102,21 +113,6 @@ class CustomTitleBar(QWidget):
             self.window_to_control.move(self.window_to_control.pos() + event.globalPos() - self.start)
             self.start = event.globalPos()
 
-    def colorize_svg(self, icon_path, color):
-        """Colorier les icônes SVG avec la couleur d'accentuation."""
-        pixmap = QPixmap(icon_path)
-        painter = QPainter(pixmap)
-        painter.setCompositionMode(QPainter.CompositionMode_SourceIn)
-        painter.fillRect(pixmap.rect(), QColor(color))
-        painter.end()
-        return QIcon(pixmap)
-
-    def update_colors(self):
-        """Mettre à jour la couleur des éléments dans la barre de titre."""
-        self.title_label.setStyleSheet(f"color: {self.parent.accent_color};")
-        self.minimize_button.setStyleSheet(f"color: {self.parent.accent_color};")
-        self.close_button.setStyleSheet(f"color: {self.parent.accent_color};")
-
 
 class SettingsWindow(QWidget):
     """Fenêtre des paramètres."""
@@ -124,6 +120,7 @@ class SettingsWindow(QWidget):
         super().__init__()
         self.parent = parent
         self.setWindowTitle("Paramètres")
+        self.setObjectName("settingsWindow")
         self.setGeometry(200, 200, 400, 300)
 
         # Utiliser la barre de titre personnalisée
@@ -141,7 +138,8 @@ class SettingsWindow(QWidget):
         self.text_size_slider.setMinimum(8)
         self.text_size_slider.setMaximum(32)
         self.text_size_slider.setValue(self.parent.device_text_size)  # Taille actuelle
-        self.text_size_slider.valueChanged.connect(self.change_text_size)
+        self.text_size_slider.valueChanged.connect(self.change_text_size)  # Aperçu en direct
+        self.text_size_slider.sliderReleased.connect(self.parent.settings.flush)  # Écriture au relâchement
         text_size_layout.addWidget(self.text_size_slider)
 
         # Séparateur
@@ -156,7 +154,6 @@ class SettingsWindow(QWidget):
         color_layout.addWidget(color_label)
 
         self.color_button = QPushButton("Changer la couleur d'accentuation", self)
-        self.color_button.setStyleSheet(f"background-color: {self.parent.accent_color}; color: white;")
         self.color_button.clicked.connect(self.change_accent_color)
         color_layout.addWidget(self.color_button)
 
@@ -175,18 +172,55 @@ class SettingsWindow(QWidget):
         text_color_layout.addWidget(text_color_label)
 
         self.text_color_button = QPushButton("Changer la couleur du texte", self)
-        self.text_color_button.setStyleSheet(f"background-color: {self.parent.accent_color}; color: white;")
         self.text_color_button.clicked.connect(self.change_text_color)
         text_color_layout.addWidget(self.text_color_button)
 
         layout.addLayout(text_color_layout)
 
+        # Section pour l'API HTTP locale
+        separator_api = QFrame()
+        separator_api.setFrameShape(QFrame.HLine)
+        separator_api.setFrameShadow(QFrame.Sunken)
+        layout.addWidget(separator_api)
+
+        settings = self.parent.settings
+        self.api_checkbox = QCheckBox(f"API HTTP locale ({settings['api_host']}:{settings['api_port']})", self)
+        self.api_checkbox.setChecked(bool(settings['api_enabled']))
+        self.api_checkbox.toggled.connect(self.parent.set_api_enabled)
+        layout.addWidget(self.api_checkbox)
+
+        self.presence_checkbox = QCheckBox("Surveiller la présence des périphériques", self)
+        self.presence_checkbox.setChecked(bool(settings['presence_enabled']))
+        self.presence_checkbox.toggled.connect(self.parent.set_presence_enabled)
+        layout.addWidget(self.presence_checkbox)
+
+        self.directed_checkbox = QCheckBox("Diffusion dirigée vers le sous-réseau de chaque périphérique", self)
+        self.directed_checkbox.setChecked(bool(settings['directed_broadcast']))
+        self.directed_checkbox.toggled.connect(self.parent.set_directed_broadcast)
+        layout.addWidget(self.directed_checkbox)
+
+        # Mesures de performance et panneau de statistiques
+        metrics_layout = QHBoxLayout()
+        self.metrics_checkbox = QCheckBox("Mesures de performance", self)
+        self.metrics_checkbox.setChecked(metrics.enabled)
+        self.metrics_checkbox.toggled.connect(self.parent.set_metrics_enabled)
+        metrics_layout.addWidget(self.metrics_checkbox)
+        stats_button = QPushButton("Statistiques", self)
+        stats_button.clicked.connect(self.parent.open_stats)
+        metrics_layout.addWidget(stats_button)
+        layout.addLayout(metrics_layout)
+
         # Layout principal incluant la barre de titre
         main_layout = QVBoxLayout()
         main_layout.addWidget(self.title_bar)  # Ajouter la barre de titre
         main_layout.addLayout(layout)
         self.setLayout(main_layout)
 
+    def closeEvent(self, event):
+        """Écrire les paramètres modifiés à la fermeture de la fenêtre."""
+        self.parent.settings.flush()
+        event.accept()
+
     def change_text_size(self):
         """Changer la taille du texte des périphériques."""
         size = self.text_size_slider.value()
@@ -196,9 +230,7 @@ class SettingsWindow(QWidget):
         """Changer la couleur d'accentuation."""
         color = QColorDialog.getColor()
         if color.isValid():
-            self.parent.update_accent_color(color.name())
-            self.update_button_colors()  # Appliquer immédiatement
-            self.title_bar.update_colors()  # Mettre à jour la barre de titre des paramètres
+            self.parent.update_accent_color(color.name())  # Le thème s'applique aussi à cette fenêtre
 
     def change_text_color(self):
         """Changer la couleur du texte."""
@@ -206,18 +238,115 @@ class SettingsWindow(QWidget):
         if color.isValid():
             self.parent.update_text_color(color.name())
 
-    def update_button_colors(self):
-        """Mettre à jour la couleur des boutons dans les paramètres."""
-        self.color_button.setStyleSheet(f"background-color: {self.parent.accent_color}; color: white;")
-        self.text_color_button.setStyleSheet(f"background-color: {self.parent.accent_color}; color: white;")
+
+class StatsWindow(QWidget):
+    """Panneau des statistiques : latence des réveils et opérations lentes, rafraîchi chaque seconde."""
+    # Histogrammes affichés en premier, avec leur libellé
+    HIGHLIGHTS = (('wake_latency_seconds', "Réveil (interface)"), ('wol_send_seconds', "Envoi d'un lot"),
+                  ('api_wake_seconds', "Réveil (API HTTP)"), ('wake_confirm_seconds', "Réveil confirmé"))
+
+    def __init__(self, parent):
+        super().__init__()
+        self.setWindowTitle("Statistiques")
+        self.setObjectName("statsWindow")
+        self.resize(520, 420)
+        layout = QVBoxLayout()
+        self.summary = QLabel(self)
+        layout.addWidget(self.summary)
+        self.details = QPlainTextEdit(self)
+        self.details.setReadOnly(True)
+        layout.addWidget(self.details)
+        buttons = QHBoxLayout()
+        export_button = QPushButton("Exporter...", self)
+        export_button.clicked.connect(self.export)
+        buttons.addWidget(export_button)
+        reset_button = QPushButton("Remettre à zéro", self)
+        reset_button.clicked.connect(lambda: (metrics.reset(), self.refresh()))
+        buttons.addWidget(reset_button)
+        layout.addLayout(buttons)
+        self.setLayout(layout)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(1000)
+        self.refresh()
+
+    @staticmethod
+    def _ms(seconds):
+        return "-" if seconds is None else f"{seconds * 1000:.2f} ms"
+
+    def refresh(self):
+        """Relire les mesures."""
+        if not metrics.enabled:
+            self.summary.setText("Les mesures sont désactivées (voir les paramètres).")
+        snapshot = metrics.snapshot()
+        histograms = snapshot['histograms']
+        if metrics.enabled:
+            lines = [f"{label} : p50 {self._ms(histograms[name]['p50'])}, p99 {self._ms(histograms[name]['p99'])}"
+                     for name, label in self.HIGHLIGHTS if name in histograms]
+            self.summary.setText("\n".join(lines) or "Aucun réveil mesuré.")
+        details = [f"{name:32} n={values['count']:<6} p50 {self._ms(values['p50']):>12} p99 {self._ms(values['p99']):>12}"
+                   for name, values in sorted(histograms.items())]
+        details += [f"{name:32} {value}" for name, value in sorted(snapshot['counters'].items())]
+        if snapshot['slow_operations']:
+            details.append("")
+            details.append("Opérations lentes :")
+            details += [f"{time.strftime('%H:%M:%S', time.localtime(entry['time']))} {entry['name']} "
+                        f"{self._ms(entry['seconds'])}" for entry in reversed(snapshot['slow_operations'])]
+        self.details.setPlainText("\n".join(details))
+
+    def export(self):
+        """Exporter les mesures au format Prometheus ou JSON."""
+        path, _ = QFileDialog.getSaveFileName(self, "Exporter les mesures", "sc_pywol.prom",
+                                              "Prometheus (*.prom);;JSON (*.json)")
+        if path:
+            try:
+                metrics.export(path)
+            except OSError as e:
+                QMessageBox.warning(self, "Erreur d'export", str(e))
+
+    def closeEvent(self, event):
+        self.timer.stop()
+        event.accept()
+
+
+class HistoryWindow(QWidget):
+    """Historique des réveils, chargé page par page au défilement."""
+    def __init__(self, parent):
+        super().__init__()
+        self.setWindowTitle("Historique des réveils")
+        self.setObjectName("historyWindow")
+        self.resize(820, 460)
+        self.parent = parent
+        layout = QVBoxLayout()
+        self.model = HistoryModel(HistoryStore(parent.conn), parent=self)
+        self.table = QTableView(self)
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QTableView.SelectRows)
+        self.table.verticalHeader().hide()
+        self.table.verticalHeader().setDefaultSectionSize(self.table.fontMetrics().height() + 6)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.table)
+        refresh_button = QPushButton("Actualiser", self)
+        refresh_button.clicked.connect(self.refresh)
+        layout.addWidget(refresh_button)
+        self.setLayout(layout)
+        self.refresh()
+
+    def refresh(self):
+        """Relire la première page après l'écriture des derniers événements (les suivantes au défilement)."""
+        self.parent.history.flush()
+        self.model.refresh()
+        self.model.fetchMore()
 
 
 class WOLApp(QMainWindow):
     """Fenêtre principale avec redimensionnement."""
-    def __init__(self):
+    def __init__(self, db_file=None):
         super().__init__()
 
-        self.devices = []
+        self.db_file = db_file
         self.setMouseTracking(True)
         self.resizing = False
         self.mouse_pressed = False
@@ -226,11 +355,42 @@ class WOLApp(QMainWindow):
         self.accent_color = "#4CAF50"  # Couleur d'accentuation par défaut (vert)
         self.text_color = "#ffffff"  # Couleur du texte par défaut
 
+        # Pool de threads pour envoyer les paquets sans bloquer l'interface
+        self.thread_pool = QThreadPool(self)
+        self.wake_tasks = {}  # Tâche de réveil en cours -> (traités, total)
+        self.wake_started = {}  # Tâche de réveil en cours -> instant de la demande
+        self.wake_sources = {}  # Tâche de réveil en cours -> origine pour l'historique
+        self.awaiting_up = {}  # Périphérique réveillé -> fin de l'attente de sa réponse (historique)
+        # Émetteur partagé par les tâches de réveil et l'API HTTP, créé une fois les paramètres lus
+        self.sender = None
+        self.api_server = None
+        self.presence = None  # Surveillance de la présence (PresenceMonitor), démarrée après le chargement
+        self.presence_signals = PresenceSignals(self)
+        self.settings_window = None  # Créée à la première ouverture
+        self.history_window = None
+        self.discovery_task = None
+
+        started = time.perf_counter()
+
         # Initialiser la base de données
-        self.init_db()
+        with metrics.span('startup_db_seconds'):
+            self.init_db()
 
         # Charger les paramètres
         self.load_settings()
+        if self.settings['metrics_enabled']:
+            metrics.enable()
+        self.sender = MagicPacketSender(port=self.settings['wol_port'],
+                                        interface=self.settings['wol_interface'] or None)
+        # Historique écrit par lots depuis son propre thread (voir history.py)
+        self.history = HistoryWriter(self.conn.path, self.settings['history_retention_days'],
+                                     self.settings['history_max_rows'])
+        self.history.start()
+        self.settings.changed.connect(self.on_setting_changed)
+        ui_started = time.perf_counter()
+
+        # Thème de l'interface, généré à partir du modèle style.qss
+        self.theme = ThemeEngine(get_resource_path("style.qss"))
 
         # Créer la barre de titre personnalisée
         self.title_bar = CustomTitleBar(self)
@@ -240,8 +400,23 @@ class WOLApp(QMainWindow):
         main_layout = QVBoxLayout()
 
         # Liste des périphériques
-        self.device_list = QListWidget(self)
-        self.load_devices()
+        self.thumbnails = ThumbnailCache(parent=self)
+        self.device_model = DeviceListModel(self.devices, self.device_text_size, self.thumbnails, self)
+        self.device_filter = DeviceFilterProxyModel(self, tags=self.groups.tags_by_device)
+        self.device_filter.setSourceModel(self.device_model)
+
+        # Champ de recherche au-dessus de la liste
+        self.search_input = QLineEdit(self)
+        self.search_input.setPlaceholderText("Rechercher (nom, adresse MAC, adresse IP, étiquette)")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.textChanged.connect(self.device_filter.set_filter_text)
+        main_layout.addWidget(self.search_input)
+
+        self.device_list = QListView(self)
+        self.device_list.setUniformItemSizes(True)  # Une seule mesure pour toutes les lignes
+        self.device_list.setItemDelegate(DeviceDelegate(self.device_list))
+        self.device_list.setModel(self.device_filter)
+        self.device_list.setIconSize(self.device_model.icon_size())
         main_layout.addWidget(self.device_list)
 
         # Bouton pour ajouter un nouvel appareil
@@ -254,10 +429,41 @@ class WOLApp(QMainWindow):
         delete_button.clicked.connect(self.delete_device)
         main_layout.addWidget(delete_button)
 
+        # Boutons d'import et d'export de l'inventaire
+        inventory_layout = QHBoxLayout()
+        import_button = QPushButton('Import Devices', self)
+        import_button.clicked.connect(self.import_devices_dialog)
+        inventory_layout.addWidget(import_button)
+        export_button = QPushButton('Export Devices', self)
+        export_button.clicked.connect(self.export_devices_dialog)
+        inventory_layout.addWidget(export_button)
+        self.discover_button = QPushButton('Discover Devices', self)
+        self.discover_button.clicked.connect(self.discover_devices_dialog)
+        inventory_layout.addWidget(self.discover_button)
+        main_layout.addLayout(inventory_layout)
+
         # Bouton pour réveiller le périphérique sélectionné
+        wake_layout = QHBoxLayout()
         wake_button = QPushButton('Wake Device', self)
         wake_button.clicked.connect(self.wake_selected_device)
-        main_layout.addWidget(wake_button)
+        wake_layout.addWidget(wake_button, 1)
+        history_button = QPushButton('Wake History', self)
+        history_button.clicked.connect(self.open_history)
+        wake_layout.addWidget(history_button)
+        main_layout.addLayout(wake_layout)
+
+        # Groupes : réveil par vagues et ajout du périphérique sélectionné
+        group_layout = QHBoxLayout()
+        self.group_combo = QComboBox(self)
+        group_layout.addWidget(self.group_combo, 1)
+        wake_group_button = QPushButton('Wake Group', self)
+        wake_group_button.clicked.connect(self.wake_group)
+        group_layout.addWidget(wake_group_button)
+        add_to_group_button = QPushButton('Add to Group', self)
+        add_to_group_button.clicked.connect(self.add_selected_to_group)
+        group_layout.addWidget(add_to_group_button)
+        main_layout.addLayout(group_layout)
+        self.load_groups()
 
         # Champ de saisie pour l'adresse MAC
         self.mac_input = QLineEdit(self)
@@ -269,12 +475,25 @@ class WOLApp(QMainWindow):
         wake_button_mac.clicked.connect(self.wake_from_mac_input)
         main_layout.addWidget(wake_button_mac)
 
+        # Progression des réveils en arrière-plan et bouton d'annulation
+        self.wake_progress = QProgressBar(self)
+        self.wake_progress.setTextVisible(False)
+        self.wake_progress.hide()
+        self.cancel_wake_button = QPushButton('Cancel', self)
+        self.cancel_wake_button.clicked.connect(self.cancel_wakes)
+        self.cancel_wake_button.hide()
+        progress_layout = QHBoxLayout()
+        progress_layout.addWidget(self.wake_progress)
+        progress_layout.addWidget(self.cancel_wake_button)
+        main_layout.addLayout(progress_layout)
+
         # Icône en bas à droite pour indiquer le redimensionnement
         self.resize_icon = QPushButton(self)
         icon_path = get_resource_path("assets/interface/resize_icon.svg")
-        self.resize_icon.setIcon(self.colorize_svg(icon_path, self.accent_color))
         self.resize_icon.setFixedSize(20, 20)
-        self.resize_icon.setStyleSheet(f"background-color: transparent; border: 1px solid {self.accent_color};")
+        self.resize_icon.setIcon(tinted_icon(icon_path, self.accent_color, self.resize_icon.iconSize(),
+                                             self.devicePixelRatioF()))
+        self.resize_icon.setObjectName("resizeIcon")
         self.resize_icon.setCursor(QCursor(Qt.SizeFDiagCursor))
         resize_icon_layout = QHBoxLayout()
         resize_icon_layout.addStretch()
@@ -304,7 +523,20 @@ class WOLApp(QMainWindow):
 
         # Appliquer les paramètres au démarrage
         self.apply_accent_color()
-        self.title_bar.update_colors()  # Mettre à jour les couleurs de la barre de titre après la création
+
+        # Réveils planifiés : un minuteur unique armé sur la prochaine échéance
+        self.schedule_timer = QTimer(self)
+        self.schedule_timer.setSingleShot(True)
+        self.schedule_timer.timeout.connect(self.run_schedules)
+
+        # Démarrage par étapes : la fenêtre s'affiche vide, puis la liste se remplit par lots
+        self.startup_started = started
+        self.loading = True
+        self.startup_timer = QTimer(self)
+        self.startup_timer.timeout.connect(self.load_next_devices)
+        self.startup_timer.start(0)
+
+        metrics.observe('startup_ui_seconds', time.perf_counter() - ui_started)
 
 
     def add_device_dialog(self):
@@ -319,6 +551,8 @@ class WOLApp(QMainWindow):
         mac_input.setPlaceholderText("MAC Address")
         ip_input = QLineEdit()
         ip_input.setPlaceholderText("IP Address (optional)")
+        secureon_input = QLineEdit()
+        secureon_input.setPlaceholderText("SecureOn password, e.g. 01:02:03:04:05:06 (optional)")
 
         add_window.icon_path = QLineEdit()  # Rendre icon_path un attribut de add_window pour éviter qu'il soit supprimé
         icon_button = QPushButton('Choose Icon')
@@ -331,7 +565,8 @@ class WOLApp(QMainWindow):
 
         save_button = QPushButton('Save Device')
         save_button.clicked.connect(lambda: self.save_device(
-            name_input.text(), mac_input.text(), ip_input.text(), add_window.icon_path.text()))
+            name_input.text(), mac_input.text(), ip_input.text(), add_window.icon_path.text(), add_window,
+            secureon_input.text()))
 
         add_layout.addWidget(QLabel("Device Name:"))
         add_layout.addWidget(name_input)
@@ -339,6 +574,8 @@ class WOLApp(QMainWindow):
         add_layout.addWidget(mac_input)
         add_layout.addWidget(QLabel("IP Address (optional):"))
         add_layout.addWidget(ip_input)
+        add_layout.addWidget(QLabel("SecureOn Password (optional):"))
+        add_layout.addWidget(secureon_input)
         add_layout.addWidget(icon_button)
         add_layout.addWidget(add_window.icon_path)
         add_layout.addWidget(save_button)
@@ -351,129 +588,462 @@ class WOLApp(QMainWindow):
 
     def init_db(self):
         """Initialiser la base de données SQLite."""
-        self.conn = sqlite3.connect(DB_FILE)  # Créez un fichier de base de données
-        self.cursor = self.conn.cursor()
-        # Créez les tables si elles n'existent pas déjà
-        self.cursor.execute('''CREATE TABLE IF NOT EXISTS devices (
-            name TEXT,
-            mac TEXT,
-            ip TEXT,
-            icon TEXT
-        )''')
-        self.cursor.execute('''CREATE TABLE IF NOT EXISTS settings (
-            device_text_size INTEGER,
-            accent_color TEXT,
-            text_color TEXT
-        )''')
-        # Insérer les paramètres par défaut si la table est vide
-        self.cursor.execute('SELECT COUNT(*) FROM settings')
-        if self.cursor.fetchone()[0] == 0:
-            self.cursor.execute('INSERT INTO settings (device_text_size, accent_color, text_color) VALUES (?, ?, ?)',
-                                (self.device_text_size, self.accent_color, self.text_color))
-        self.conn.commit()
+        # Une connexion par thread (l'API HTTP lit les groupes depuis le sien), en mode WAL
+        self.conn = Database(self.db_file)
+        # Créez les tables si elles n'existent pas déjà ; les périphériques sont lus après le premier affichage
+        self.devices = DeviceStore(self.conn, load=False)
+        self.groups = GroupStore(self.conn)
+        # Paramètres gardés en mémoire, écrits en base par rafales regroupées
+        self.settings = SettingsManager(self.conn, parent=self)
+        # Planifications partagées avec `python -m cli scheduler`
+        self.scheduler = Scheduler(self.conn, self.on_schedule_due)
+
+    def load_next_devices(self):
+        """Ajouter le lot suivant de périphériques à la liste, puis terminer le démarrage."""
+        with metrics.span('startup_batch_seconds'):
+            devices = self.devices.load_batch(STARTUP_BATCH_SIZE)
+            self.device_model.add_devices(devices)
+        if not devices:
+            self.finish_startup()
+
+    def finish_startup(self):
+        """Charger les périphériques restants et lancer ce qui en dépend (planifications, API HTTP)."""
+        if not self.loading:
+            return
+        self.startup_timer.stop()
+        self.device_model.add_devices(self.devices.load_batch(sys.maxsize))
+        self.loading = False
+        self.run_schedules()  # Rattraper les réveils manqués pendant l'arrêt
+        if self.settings['api_enabled']:
+            self.start_api()
+        if self.settings['presence_enabled']:
+            self.start_presence()
+        metrics.observe('startup_seconds', time.perf_counter() - self.startup_started)
+        log.debug("%d devices loaded", len(self.devices))
 
     def load_devices(self):
-        """Charger les périphériques depuis la base de données."""
-        self.cursor.execute('SELECT * FROM devices')
-        rows = self.cursor.fetchall()
-        self.devices = [{'name': row[0], 'mac': row[1], 'ip': row[2], 'icon': row[3]} for row in rows]
-        self.device_list.clear()
-        for device in self.devices:
-            self.add_device_to_list(device)
-
-    def add_device_to_list(self, device):
-        """Ajouter un appareil à la liste affichée."""
-        item = QListWidgetItem(f"{device['name']} ({device['mac']})")
-        if device['icon'] and os.path.exists(device['icon']):
-            icon = QIcon(device['icon'])
-            # Redimensionner l'icône en fonction de la taille du texte
-            pixmap = icon.pixmap(QSize(self.device_text_size * 2, self.device_text_size * 2))
-            item.setIcon(QIcon(pixmap))
-        item.setFont(QFont("Arial", self.device_text_size))
-        # Ajuster la taille de l'icône
-        item.setSizeHint(QSize(self.device_text_size * 3, self.device_text_size * 3))
-        self.device_list.addItem(item)
-
-    def save_device(self, name, mac, ip, icon):
-        """Sauvegarder un nouvel appareil dans la base de données."""
-        self.cursor.execute('INSERT INTO devices (name, mac, ip, icon) VALUES (?, ?, ?, ?)',
-                            (name, mac, ip, icon))
-        self.conn.commit()
-        self.load_devices()  # Rechargez les appareils après l'ajout
+        """Recharger la liste des périphériques depuis la base de données."""
+        self.devices.reload()
+        self.device_model.reset()
+        if self.presence is not None:
+            self.presence.watch(self.devices)  # Adresses IP ajoutées ou modifiées
+
+    def save_device(self, name, mac, ip, icon, window=None, secureon=None):
+        """Sauvegarder un nouvel appareil dans la base de données (adresse MAC validée et normalisée)."""
+        try:
+            device = self.devices.add(name, mac, ip, icon, secureon)
+        except (ValueError, sqlite3.IntegrityError) as e:
+            QMessageBox.warning(self, "Enregistrement impossible", str(e))
+            return None
+        # Ajouter uniquement la nouvelle ligne et la sélectionner
+        source_index = self.device_model.add_device(device)
+        self.device_list.setCurrentIndex(self.device_filter.mapFromSource(source_index))
+        if self.presence is not None:
+            self.presence.watch([device])
+        if window is not None:
+            window.close()
+        return device
 
     def delete_device(self):
         """Supprimer un appareil sélectionné."""
-        selected_item = self.device_list.currentRow()
-        if selected_item >= 0:
-            device_name = self.devices[selected_item]['name']
-            self.cursor.execute('DELETE FROM devices WHERE name = ?', (device_name,))
-            self.conn.commit()
-            del self.devices[selected_item]
-            self.device_list.takeItem(selected_item)
-            print("Device deleted.")
+        selected_index = self.device_list.currentIndex()
+        if selected_index.isValid():
+            device_id = selected_index.data(DeviceIdRole)
+            try:
+                self.device_model.removeRows(self.device_filter.mapToSource(selected_index).row(), 1)
+            except sqlite3.Error as e:
+                QMessageBox.warning(self, "Suppression impossible", str(e))
+                return
+            if self.presence is not None:
+                self.presence.forget([device_id])
+            log.info("Device deleted.")
+
+    def import_devices_dialog(self):
+        """Importer un inventaire de périphériques en une seule transaction."""
+        path, _ = QFileDialog.getOpenFileName(self, 'Import Devices', '',
+                                              'Inventaires (*.csv *.json *.jsonl *.leases ethers);;Tous les fichiers (*)')
+        if not path:
+            return
+        from inventory import import_devices
+        self.finish_startup()  # Les doublons se repèrent sur la liste complète
+        try:
+            summary = import_devices(self.devices, path)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            QMessageBox.warning(self, "Erreur d'import", str(e))
+            return
+        self.device_model.reset()  # Une seule mise à jour de la liste pour tout l'import
+        if self.presence is not None:
+            self.presence.watch(self.devices)
+        details = "\n".join(f"Ligne {line} : {message}" for line, message in summary.errors[:10])
+        QMessageBox.information(self, "Import terminé", f"{summary}\n{details}".strip())
+
+    def export_devices_dialog(self):
+        """Exporter l'inventaire des périphériques."""
+        path, _ = QFileDialog.getSaveFileName(self, 'Export Devices', 'devices.csv',
+                                              'CSV (*.csv);;JSON (*.json);;ethers (*)')
+        if not path:
+            return
+        from inventory import export_devices
+        self.finish_startup()
+        try:
+            count = export_devices(self.devices, path)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Erreur d'export", str(e))
+            return
+        log.info("%d devices exported to %s", count, path)
+
+    def discover_devices_dialog(self):
+        """Chercher les périphériques du réseau en arrière-plan (table ARP et sous-réseau choisi)."""
+        from discovery import parse_network
+
+        subnet, ok = QInputDialog.getText(self, 'Discover Devices',
+                                          "Sous-réseau à balayer, ex. 192.168.0.0/22 (vide : table ARP seulement) :",
+                                          text=self.settings['discovery_subnet'])
+        if not ok:
+            return
+        subnet = subnet.strip()
+        if subnet:
+            try:
+                parse_network(subnet)
+            except ValueError as e:
+                QMessageBox.warning(self, "Découverte impossible", str(e))
+                return
+        self.settings.set('discovery_subnet', subnet)
+        self.finish_startup()  # La comparaison porte sur tous les périphériques
+        task = DiscoveryTask(subnet or None)
+        task.signals.finished.connect(self.on_discovery_finished)
+        task.signals.failed.connect(self.on_discovery_failed)
+        self.discovery_task = task
+        self.discover_button.setEnabled(False)
+        self.thread_pool.start(task)
+
+    def on_discovery_failed(self, message):
+        self.discovery_task = None
+        self.discover_button.setEnabled(True)
+        QMessageBox.warning(self, "Découverte impossible", message)
+
+    def on_discovery_finished(self, hosts):
+        """Afficher les différences avec la liste et enregistrer les nouveaux périphériques en une transaction."""
+        from discovery import add_discovered, diff_devices
+
+        self.discovery_task = None
+        self.discover_button.setEnabled(True)
+        diff = diff_devices(self.devices, hosts)
+        if not diff.new and not diff.moved:
+            QMessageBox.information(self, "Découverte terminée", f"Aucun changement ({diff}).")
+            return
+        lines = [f"+ {host.name or host.ip} ({host.mac})" for host in diff.new[:15]]
+        lines += [f"~ {device.name} : {device.ip or '-'} -> {host.ip}" for device, host in diff.moved[:15]]
+        answer = QMessageBox.question(self, "Découverte terminée",
+                                      f"{diff}\n\n" + "\n".join(lines) + "\n\nEnregistrer ces changements ?")
+        if answer != QMessageBox.Yes:
+            return
+        try:
+            devices = add_discovered(self.devices, diff)
+        except (ValueError, sqlite3.Error) as e:
+            QMessageBox.warning(self, "Enregistrement impossible", str(e))
+            return
+        if diff.moved:
+            self.device_model.reset()  # Les adresses IP changées sont réindexées pour la recherche
+        else:
+            self.device_model.add_devices(devices)
+        if self.presence is not None:
+            self.presence.watch(devices + [device for device, _ in diff.moved])
+        log.info("%d discovered devices added", len(devices))
 
     def wake_selected_device(self):
         """Réveille le périphérique sélectionné dans la liste."""
-        selected_item = self.device_list.currentItem()
-        if selected_item:
-            device_name = selected_item.text().split(' (')[0]  # Extraire le nom
-            device = next((d for d in self.devices if d["name"] == device_name), None)  # Trouver le périphérique
-            if device and "mac" in device:
-                mac_address = device["mac"]
+        selected_index = self.device_list.currentIndex()
+        if selected_index.isValid():
+            device = self.devices.get(selected_index.data(DeviceIdRole))  # Trouver le périphérique
+            if device and device.mac:
+                mac_address = device.mac
                 if is_valid_mac_address(mac_address):  # Vérification de l'adresse MAC
-                    wake_device(mac_address)  # Appeler la fonction wake_device
-                    print(f"Magic packet sent to {mac_address}")
+                    self.start_wake([mac_address])  # Envoi en arrière-plan
                 else:
                     # Affichez un message d'erreur si l'adresse MAC est invalide
-                    print(f"L'adresse MAC '{mac_address}' est invalide.")
+                    log.warning("L'adresse MAC '%s' est invalide.", mac_address)
                     QMessageBox.warning(self, "Erreur d'adresse MAC", "L'adresse MAC du périphérique sélectionné est invalide.")
             else:
-                print("Aucune adresse MAC trouvée pour le périphérique sélectionné.")
+                log.warning("Aucune adresse MAC trouvée pour le périphérique sélectionné.")
         else:
-            print("Veuillez sélectionner un périphérique dans la liste.")
+            log.info("Veuillez sélectionner un périphérique dans la liste.")
 
     def wake_from_mac_input(self):
         """Envoyer un paquet WOL à l'adresse MAC entrée manuellement."""
         mac_address = self.mac_input.text().strip()  # Obtenez l'adresse MAC saisie
         if is_valid_mac_address(mac_address):  # Vérifiez le format de l'adresse MAC
-            wake_device(mac_address)  # Appelle la fonction pour envoyer le paquet
-            print(f"Magic packet sent to {mac_address}")
+            self.start_wake([mac_address])  # Envoi en arrière-plan
         else:
             # Affichez un message d'erreur
-            print(f"L'adresse MAC '{mac_address}' est invalide.")
+            log.warning("L'adresse MAC '%s' est invalide.", mac_address)
             QMessageBox.warning(self, "Erreur d'adresse MAC", "L'adresse MAC saisie est invalide. Veuillez réessayer.")
 
+    def load_groups(self):
+        """Remplir la liste des groupes."""
+        current = self.group_combo.currentText()
+        self.group_combo.clear()
+        for _, name, count in self.groups.groups():
+            self.group_combo.addItem(f"{name} ({count})", name)
+        index = self.group_combo.findData(current)
+        if index >= 0:
+            self.group_combo.setCurrentIndex(index)
+
+    def add_selected_to_group(self):
+        """Ajouter le périphérique sélectionné à un groupe, créé s'il n'existe pas."""
+        selected_index = self.device_list.currentIndex()
+        if not selected_index.isValid():
+            log.info("Veuillez sélectionner un périphérique dans la liste.")
+            return
+        names = [name for _, name, _ in self.groups.groups()]
+        name, ok = QInputDialog.getItem(self, "Add to Group", "Groupe :", names, 0, True)
+        if ok and name.strip():
+            self.groups.add_members(name.strip(), [selected_index.data(DeviceIdRole)])
+            self.load_groups()
+
+    def wake_group(self):
+        """Réveiller les membres du groupe choisi par vagues espacées."""
+        name = self.group_combo.currentData()
+        if name is None:
+            return
+        self.finish_startup()  # Tous les membres doivent être chargés
+        devices = [self.devices.get(device_id) for device_id in self.groups.members(name)]
+        devices = [device for device in devices if device is not None]
+        if not devices:
+            log.info("Le groupe '%s' est vide.", name)
+            return
+        self.start_wake([device.mac for device in devices], chunk_size=self.settings['group_wave_size'],
+                        wave_delay=self.settings['group_wave_delay_ms'] / 1000)
+
+    def start_wake(self, macs, repeat=1, interval=0.0, chunk_size=64, wave_delay=0.0, source='gui'):
+        """Envoyer les paquets WOL dans le pool de threads sans bloquer l'interface.
+
+        `source` est l'origine du réveil notée dans l'historique ('gui' ou 'schedule').
+        """
+        # Les périphériques connus affichent leur état dans la liste jusqu'à la fin de l'envoi
+        device_ids = [device.id for device in map(self.devices.by_mac, macs) if device is not None]
+        self.device_model.set_wake_status(device_ids, 'queued')
+        if self.presence is not None:
+            self.presence.notify_wake(device_ids)  # Sondes rapprochées jusqu'à la réponse
+        task = WakeTask(macs, repeat=repeat, interval=interval, chunk_size=chunk_size, sender=self.sender,
+                        wave_delay=wave_delay, packets=self.devices.packets(macs), targets=self.wake_targets(macs))
+        task.signals.result.connect(self.on_wake_result)
+        task.signals.progress.connect(lambda done, total, task=task: self.on_wake_progress(task, done, total))
+        task.signals.finished.connect(lambda results, cancelled, task=task: self.on_wake_finished(task, results, cancelled))
+        self.wake_tasks[task] = (0, len(task.macs))
+        self.wake_started[task] = time.perf_counter()
+        self.wake_sources[task] = source
+        self.wake_progress.setRange(0, 0)  # Indicateur indéterminé jusqu'au premier lot
+        self.wake_progress.show()
+        self.cancel_wake_button.show()
+        self.thread_pool.start(task)
+        return task
+
+    def wake_targets(self, macs):
+        """Destinations par périphérique (diffusion dirigée, relais), ou None pour la diffusion générale."""
+        if not self.settings['directed_broadcast']:
+            return None
+        return self.devices.targets(macs, interface=self.settings['wol_interface'] or None,
+                                    port=self.settings['wol_port'])
+
+    def set_directed_broadcast(self, enabled):
+        """Activer ou désactiver la diffusion dirigée et enregistrer ce choix."""
+        self.settings.set('directed_broadcast', int(enabled))
+
+    def on_wake_result(self, result):
+        """Afficher le résultat de l'envoi pour une adresse MAC."""
+        device = self.devices.by_mac(result.mac)
+        if device is not None:
+            self.device_model.set_wake_status([device.id], 'sent' if result.ok else 'failed')
+        if result.ok:
+            log.info("Magic packet sent to %s", result.mac)
+        else:
+            log.warning("Échec de l'envoi vers %s : %s", result.mac, result.error)
+
+    def on_wake_progress(self, task, done, total):
+        """Mettre à jour la barre de progression de l'ensemble des réveils en cours."""
+        if task in self.wake_tasks:
+            self.wake_tasks[task] = (done, total)
+        self.wake_progress.setRange(0, sum(total for _, total in self.wake_tasks.values()))
+        self.wake_progress.setValue(sum(done for done, _ in self.wake_tasks.values()))
+
+    def on_wake_finished(self, task, results, cancelled):
+        """Terminer une tâche de réveil et signaler les échecs éventuels."""
+        self.wake_tasks.pop(task, None)
+        started = self.wake_started.pop(task, None)
+        if started is not None and not cancelled:
+            metrics.observe('wake_latency_seconds', time.perf_counter() - started)
+        self.record_history(results, self.wake_sources.pop(task, 'gui'))
+        if not self.wake_tasks:
+            self.wake_progress.hide()
+            self.cancel_wake_button.hide()
+        if cancelled:
+            log.info("Réveil annulé.")
+            # Les membres des vagues non envoyées ne sont plus en attente
+            unsent = [self.devices.by_mac(mac) for mac in task.macs if mac not in results]
+            self.device_model.set_wake_status([device.id for device in unsent if device is not None], None)
+        failures = [result for result in results.values() if not result.ok]
+        if failures:
+            details = "\n".join(f"{result.mac} : {result.error}" for result in failures[:10])
+            QMessageBox.warning(self, "Erreur d'envoi",
+                                f"{len(failures)} paquet(s) WOL n'ont pas pu être envoyés.\n{details}")
+
+    def record_history(self, results, source):
+        """Noter les réveils envoyés dans l'historique et attendre la réponse des périphériques."""
+        self.history.record(events_from_results(self.devices, results, source, current_user()))
+        deadline = time.time() + UP_WINDOW
+        for mac, result in results.items():
+            device = self.devices.by_mac(mac) if result.ok else None
+            if device is not None:
+                self.awaiting_up[device.id] = deadline
+
+    def on_presence_changes(self, changes):
+        """Noter dans l'historique la première réponse des périphériques réveillés."""
+        if not self.awaiting_up:
+            return
+        now = time.time()
+        ups = []
+        for device_id, (status, last_seen) in changes.items():
+            deadline = self.awaiting_up.get(device_id)
+            if deadline is not None and deadline > now and status == ONLINE and last_seen is not None:
+                ups.append((device_id, last_seen))
+                del self.awaiting_up[device_id]
+        self.awaiting_up = {device_id: deadline for device_id, deadline in self.awaiting_up.items()
+                            if deadline > now}
+        self.history.mark_up(ups)
+
+    def on_setting_changed(self, key, value):
+        """Transmettre au thread de l'historique les nouvelles limites de rétention."""
+        if key in ('history_retention_days', 'history_max_rows'):
+            self.history.set_retention(self.settings['history_retention_days'], self.settings['history_max_rows'])
+
+    def cancel_wakes(self):
+        """Annuler les réveils en cours."""
+        for task in self.wake_tasks:
+            task.cancel()
+
+    def run_schedules(self):
+        """Exécuter les réveils planifiés échus puis dormir jusqu'à la prochaine échéance."""
+        self.scheduler.reload()  # Planifications ajoutées depuis la ligne de commande
+        self.scheduler.run_pending()
+        delay = self.scheduler.seconds_until_next()
+        delay = MAX_SLEEP_SECONDS if delay is None else min(delay, MAX_SLEEP_SECONDS)
+        self.schedule_timer.start(int(delay * 1000))
+
+    def on_schedule_due(self, schedule):
+        """Réveiller les périphériques d'une planification échue."""
+        macs = [mac for _, mac in schedule_targets(self.devices, schedule)]
+        if macs:
+            self.start_wake(macs, source='schedule')
+        else:
+            log.warning("Aucun périphérique pour la planification %s.", schedule.id)
+
+    def start_api(self):
+        """Démarrer l'API HTTP locale dans son propre thread."""
+        if self.api_server is not None:
+            return True
+        self.finish_startup()  # L'API voit tous les périphériques
+        from api import WakeApiServer  # asyncio n'est chargé que si l'API est utilisée
+        server = WakeApiServer(self.devices, self.sender, self.settings['api_host'], self.settings['api_port'],
+                               routing=self.wake_targets, history=self.history)
+        try:
+            port = server.start_in_thread()
+        except Exception as e:  # Port occupé, adresse invalide... : l'interface continue sans l'API
+            QMessageBox.warning(self, "API HTTP", f"Impossible de démarrer l'API HTTP : {e}")
+            return False
+        self.api_server = server
+        log.info("API HTTP listening on %s:%d", server.host, port)
+        return True
+
+    def stop_api(self):
+        """Arrêter l'API HTTP locale."""
+        if self.api_server is not None:
+            self.api_server.stop()
+            self.api_server = None
+
+    def set_api_enabled(self, enabled):
+        """Activer ou désactiver l'API HTTP locale et enregistrer ce choix."""
+        if enabled:
+            enabled = self.start_api()
+        else:
+            self.stop_api()
+        self.settings.set('api_enabled', int(enabled))
+
+    def start_presence(self):
+        """Démarrer la surveillance de la présence des périphériques qui ont une adresse IP."""
+        if self.presence is not None:
+            return
+        self.finish_startup()
+        # Le signal traverse les threads : un seul appel de set_presence par lot de changements
+        self.presence_signals.changed.connect(self.device_model.set_presence)
+        self.presence_signals.changed.connect(self.on_presence_changes)
+        self.presence = PresenceMonitor(self.presence_signals.changed.emit)
+        self.presence.watch(self.devices)
+        self.presence.start_in_thread()
+
+    def stop_presence(self):
+        """Arrêter la surveillance de la présence."""
+        if self.presence is None:
+            return
+        self.presence.stop()
+        self.presence = None
+        self.presence_signals.changed.disconnect(self.device_model.set_presence)
+        self.presence_signals.changed.disconnect(self.on_presence_changes)
+        self.device_model.clear_presence()
+
+    def set_presence_enabled(self, enabled):
+        """Activer ou désactiver la surveillance de la présence et enregistrer ce choix."""
+        if enabled:
+            self.start_presence()
+        else:
+            self.stop_presence()
+        self.settings.set('presence_enabled', int(enabled))
+
+    def set_metrics_enabled(self, enabled):
+        """Activer ou désactiver les mesures de performance et enregistrer ce choix."""
+        metrics.enable(enabled)
+        self.settings.set('metrics_enabled', int(enabled))
+
+    def open_stats(self):
+        """Ouvrir le panneau des statistiques."""
+        self.stats_window = StatsWindow(self)
+        self.stats_window.show()
+
+    def open_history(self):
+        """Ouvrir l'historique des réveils (créé au premier appel puis relu à chaque ouverture)."""
+        if self.history_window is None:
+            self.history_window = HistoryWindow(self)
+        else:
+            self.history_window.refresh()
+        self.history_window.show()
+        self.history_window.raise_()
+
     def open_settings(self):
-        """Ouvrir la fenêtre des paramètres."""
-        self.settings_window = SettingsWindow(self)
+        """Ouvrir la fenêtre des paramètres (créée au premier appel puis réutilisée)."""
+        if self.settings_window is None:
+            self.settings_window = SettingsWindow(self)
         self.settings_window.show()
+        self.settings_window.raise_()
 
     def load_settings(self):
         """Charger les paramètres depuis la base de données."""
-        self.cursor.execute('SELECT * FROM settings')
-        row = self.cursor.fetchone()
-        if row:
-            self.device_text_size = row[0]
-            self.accent_color = row[1]
-            self.text_color = row[2]
-            print(f"Settings loaded: {self.device_text_size}, {self.accent_color}, {self.text_color}")
-        else:
-            # Valeurs par défaut si aucun paramètre n'est trouvé
-            self.device_text_size = 12
-            self.accent_color = "#4CAF50"
-            self.text_color = "#ffffff"
-            print("Default settings applied.")
+        self.device_text_size = self.settings['device_text_size']
+        self.accent_color = self.settings['accent_color']
+        self.text_color = self.settings['text_color']
+        log.debug("Settings loaded: %s, %s, %s", self.device_text_size, self.accent_color, self.text_color)
 
     def save_settings(self):
-        """Sauvegarder les paramètres dans la base de données."""
-        self.cursor.execute('UPDATE settings SET device_text_size = ?, accent_color = ?, text_color = ?',
-                            (self.device_text_size, self.accent_color, self.text_color))
-        self.conn.commit()
+        """Programmer l'écriture des paramètres (une seule transaction par rafale de changements)."""
+        self.settings.set('device_text_size', self.device_text_size)
+        self.settings.set('accent_color', self.accent_color)
+        self.settings.set('text_color', self.text_color)
 
     def update_device_text_size(self, size):
         """Mettre à jour la taille du texte des périphériques."""
         self.device_text_size = size
-        self.load_devices()  # Recharger les appareils avec la nouvelle taille de texte
+        # Changer la police des lignes existantes sans les recréer
+        self.device_model.set_text_size(size)
+        self.device_list.setIconSize(self.device_model.icon_size())
         self.save_settings()
 
     def update_accent_color(self, color):
@@ -490,53 +1060,20 @@ class WOLApp(QMainWindow):
         self.save_settings()
 
     def apply_accent_color(self):
-        """Appliquer la couleur d'accentuation."""
-        self.setStyleSheet(f"""
-            QPushButton {{
-                background-color: {self.accent_color};
-                color: {self.text_color};
-                border: 1px solid {self.accent_color};
-                padding: 10px;
-                font-size: 14px;
-            }}
-            QLineEdit, QListWidget {{
-                border: 1px solid {self.accent_color};
-                color: {self.text_color};
-            }}
-            QPushButton:hover {{
-                background-color: {self.accent_color};
-            }}
-            QLabel {{
-                color: {self.text_color};
-            }}
-        """)
-        # Appliquer la couleur d'accentuation au bouton des paramètres si la fenêtre est ouverte
-        if hasattr(self, 'settings_window') and self.settings_window is not None:
-            self.settings_window.update_button_colors()
-        
-        # Mettre à jour les couleurs de la barre de titre
-        self.title_bar.update_colors()
-
-        # Mettre à jour l'icône de redimensionnement
-        self.resize_icon.setStyleSheet(f"background-color: transparent; border: 1px solid {self.accent_color};")
+        """Appliquer la couleur d'accentuation et la couleur du texte (un seul recalcul des styles)."""
+        self.theme.apply(self.accent_color, self.text_color)
 
     def refresh_icons(self):
         """Rafraîchir les icônes avec la couleur d'accentuation."""
         parameters_icon_path = get_resource_path("assets/interface/parameters.svg")
         icon_path = get_resource_path("assets/interface/resize_icon.svg")
 
-        # Rafraîchir les icônes SVG en fonction de la nouvelle couleur d'accentuation
-        self.title_bar.settings_button.setIcon(self.colorize_svg(parameters_icon_path, self.accent_color))
-        self.resize_icon.setIcon(self.colorize_svg(icon_path, self.accent_color))
-
-    def colorize_svg(self, icon_path, color):
-        """Colorier les icônes SVG avec la couleur d'accentuation."""
-        pixmap = QPixmap(icon_path)
-        painter = QPainter(pixmap)
-        painter.setCompositionMode(QPainter.CompositionMode_SourceIn)
-        painter.fillRect(pixmap.rect(), QColor(color))
-        painter.end()
-        return QIcon(pixmap)
+        # Rafraîchir les icônes SVG en fonction de la nouvelle couleur d'accentuation (rendus mémorisés)
+        settings_button = self.title_bar.settings_button
+        settings_button.setIcon(tinted_icon(parameters_icon_path, self.accent_color, settings_button.iconSize(),
+                                            self.devicePixelRatioF()))
+        self.resize_icon.setIcon(tinted_icon(icon_path, self.accent_color, self.resize_icon.iconSize(),
+                                             self.devicePixelRatioF()))
 
     def start_resize(self, event):
         """Débuter le redimensionnement en cliquant sur l'icône."""
@@ -559,18 +1096,23 @@ class WOLApp(QMainWindow):
 
     def closeEvent(self, event):
         """Fermer la connexion à la base de données."""
-        self.conn.close()
+        self.startup_timer.stop()
+        self.schedule_timer.stop()
+        self.cancel_wakes()
+        self.thread_pool.waitForDone(1000)
+        self.stop_api()
+        self.stop_presence()
+        self.sender.close()
+        self.history.stop()  # Écrire les derniers événements de l'historique
+        self.settings.flush()  # Écrire les derniers changements avant de fermer
+        self.conn.close()  # Connexion du thread de l'interface ; celles des autres threads sont fermées avec eux
         event.accept()
 
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
 
-    # Charger et appliquer le style QSS (si disponible)
-    if os.path.exists(get_resource_path("style.qss")):
-        with open(get_resource_path("style.qss"), "r") as f:
-            app.setStyleSheet(f.read())
-
+    # Le style QSS (style.qss) est appliqué par le thème de WOLApp
     ex = WOLApp()
     ex.show()
     sys.exit(app.exec_())
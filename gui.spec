@@ -1,16 +1,25 @@
 # -*- mode: python ; coding: utf-8 -*-
+# Build « onedir » : les fichiers restent dans dist/gui/ et ne sont plus décompressés
+# dans un dossier temporaire à chaque lancement (pyinstaller gui.spec).
+# La base de données n'est pas embarquée : elle est créée au premier démarrage.
 
 
 a = Analysis(
     ['gui.py'],
     pathex=[],
     binaries=[],
-    datas=[('assets', 'assets'), ('assets/interface', 'assets/interface'), ('style.qss', '.'), ('wol.py', '.'), ('sc_pywol.db', '.')],
+    datas=[('assets', 'assets'), ('style.qss', '.')],
     hiddenimports=['wakeonlan'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # Modules jamais utilisés par l'application
+    excludes=['tkinter', 'unittest', 'pydoc', 'doctest', 'lib2to3', 'pytest',
+              'PyQt5.QtNetwork', 'PyQt5.QtQml', 'PyQt5.QtQuick', 'PyQt5.QtQuickWidgets', 'PyQt5.QtSql',
+              'PyQt5.QtMultimedia', 'PyQt5.QtMultimediaWidgets', 'PyQt5.QtWebEngineCore', 'PyQt5.QtWebEngineWidgets',
+              'PyQt5.QtWebChannel', 'PyQt5.QtWebSockets', 'PyQt5.QtBluetooth', 'PyQt5.QtDesigner',
+              'PyQt5.QtOpenGL', 'PyQt5.QtPrintSupport', 'PyQt5.QtPositioning', 'PyQt5.QtLocation',
+              'PyQt5.QtSensors', 'PyQt5.QtSerialPort', 'PyQt5.QtTest', 'PyQt5.QtXmlPatterns', 'PyQt5.Qt3DCore'],
     noarchive=False,
     optimize=0,
 )
@@ -19,16 +28,13 @@ pyz = PYZ(a.pure)
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.datas,
     [],
+    exclude_binaries=True,
     name='gui',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
+    upx=False,  # Les bibliothèques compressées par UPX sont décompressées à chaque chargement
     console=False,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -37,3 +43,12 @@ exe = EXE(
     entitlements_file=None,
     icon=['assets\\interface\\favicon.ico'],
 )
+
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    name='gui',
+)
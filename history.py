@@ -0,0 +1,273 @@
+"""Historique des réveils : quel périphérique, quand, à la demande de qui, et s'il a répondu.
+
+Les événements sont ajoutés à la table `wake_events` (jamais modifiés, sauf pour noter
+l'instant où le périphérique a répondu). Dans l'interface et l'API, `HistoryWriter` les
+écrit depuis un thread dédié, par lots regroupés, sans ralentir l'envoi des paquets ;
+la ligne de commande les écrit directement en une seule transaction.
+
+La rétention (ancienneté et nombre de lignes) est appliquée par petites suppressions
+successives pour ne jamais bloquer la base longtemps. Les pages sont lues par clé
+(identifiant décroissant) : la première page d'un historique de plusieurs millions de
+lignes est aussi rapide que les suivantes.
+"""
+import getpass
+import logging
+import queue
+import threading
+import time
+from metrics import metrics
+from storage import migrate, open_connection
+
+log = logging.getLogger(__name__)
+
+RETENTION_DAYS = 90
+MAX_ROWS = 1_000_000
+PAGE_SIZE = 200
+FLUSH_INTERVAL = 0.5  # Délai de regroupement des écritures (secondes)
+COMPACT_INTERVAL = 60.0  # Secondes entre deux passes de rétention
+COMPACT_CHUNK = 5000  # Lignes supprimées au plus par passe
+UP_WINDOW = 600.0  # Un réveil plus ancien n'est plus rattaché à la réponse du périphérique
+
+COLUMNS = 'id, ts, device_id, name, mac, source, user, ok, error, up_at'
+
+
+def current_user():
+    """Nom de l'utilisateur du système, ou None s'il est introuvable."""
+    try:
+        return getpass.getuser()
+    except (OSError, KeyError, ImportError):
+        return None
+
+
+def retention_settings(conn):
+    """Limites de rétention choisies dans les paramètres de l'interface : (jours, lignes).
+
+    Les colonnes sont créées par les migrations (voir storage.py).
+    """
+    row = conn.execute('SELECT history_retention_days, history_max_rows FROM settings').fetchone()
+    if row is None or None in row:
+        return RETENTION_DAYS, MAX_ROWS
+    return row
+
+
+class WakeEvent:
+    """Réveil enregistré dans l'historique."""
+    __slots__ = ('id', 'ts', 'device_id', 'name', 'mac', 'source', 'user', 'ok', 'error', 'up_at')
+
+    def __init__(self, id, ts, device_id, name, mac, source, user=None, ok=True, error=None, up_at=None):
+        self.id = id
+        self.ts = ts  # Horodatage de l'envoi (time.time)
+        self.device_id = device_id  # None pour une adresse MAC inconnue
+        self.name = name  # Nom au moment du réveil (gardé si le périphérique est supprimé)
+        self.mac = mac
+        self.source = source  # 'gui', 'schedule', 'api' ou 'cli'
+        self.user = user  # Utilisateur du système ou client de l'API
+        self.ok = bool(ok)
+        self.error = error
+        self.up_at = up_at  # Première réponse du périphérique après le réveil
+
+    @property
+    def up_after(self):
+        """Secondes entre l'envoi et la réponse du périphérique, ou None."""
+        return None if self.up_at is None else self.up_at - self.ts
+
+    def as_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __repr__(self):
+        return f"WakeEvent({self.id!r}, {self.mac!r}, source={self.source!r}, ok={self.ok!r})"
+
+
+def events_from_results(store, results, source, user=None, now=None):
+    """Lignes d'historique des résultats d'envoi {adresse MAC: WakeResult}.
+
+    Chaque ligne vaut (horodatage, identifiant, nom, adresse MAC, origine, utilisateur, ok, erreur).
+    """
+    now = time.time() if now is None else now
+    rows = []
+    for mac, result in results.items():
+        if not result.sent and result.error is None:
+            continue  # Non envoyé (réveil annulé)
+        device = store.by_mac(mac) if store is not None else None
+        rows.append((now, device.id if device else None, device.name if device else None,
+                     device.mac if device else mac, source, user, int(result.ok), result.error))
+    return rows
+
+
+class HistoryStore:
+    """Accès à la table `wake_events` par une connexion."""
+    def __init__(self, conn):
+        self.conn = conn
+        migrate(conn)
+
+    def append(self, rows):
+        """Ajouter des lignes en une transaction (voir `events_from_results` pour leur format)."""
+        if not rows:
+            return
+        with metrics.span('history_write_seconds'), self.conn:
+            self.conn.executemany('INSERT INTO wake_events (ts, device_id, name, mac, source, user, ok, error) '
+                                  'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+        metrics.inc('history_events_total', len(rows))
+
+    def mark_up(self, ups):
+        """Noter la réponse de périphériques réveillés : [(identifiant, horodatage)].
+
+        Seul le dernier réveil de chaque périphérique est complété, s'il date de moins de `UP_WINDOW` secondes.
+        """
+        with self.conn:
+            self.conn.executemany('UPDATE wake_events SET up_at = ? WHERE id = (SELECT MAX(id) FROM wake_events '
+                                  'WHERE device_id = ?) AND up_at IS NULL AND ts BETWEEN ? AND ?',
+                                  [(when, device_id, when - UP_WINDOW, when) for device_id, when in ups])
+
+    def page(self, before_id=None, limit=PAGE_SIZE, device_id=None):
+        """Événements les plus récents d'abord, à partir de l'identifiant `before_id` exclu."""
+        conditions = []
+        parameters = []
+        if before_id is not None:
+            conditions.append('id < ?')
+            parameters.append(before_id)
+        if device_id is not None:
+            conditions.append('device_id = ?')
+            parameters.append(device_id)
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ''
+        rows = self.conn.execute(f'SELECT {COLUMNS} FROM wake_events {where}ORDER BY id DESC LIMIT ?',
+                                 (*parameters, limit)).fetchall()
+        return [WakeEvent(*row) for row in rows]
+
+    def count(self):
+        return self.conn.execute('SELECT COUNT(*) FROM wake_events').fetchone()[0]
+
+    def compact(self, retention_days=RETENTION_DAYS, max_rows=MAX_ROWS, chunk=COMPACT_CHUNK, now=None):
+        """Supprimer au plus `chunk` événements trop anciens ou en trop ; retourne le nombre supprimé.
+
+        Les identifiants croissent avec le temps et seules les lignes les plus anciennes
+        sont supprimées : les `max_rows` lignes gardées sont celles d'identifiant > max - max_rows.
+        """
+        now = time.time() if now is None else now
+        newest = self.conn.execute('SELECT MAX(id) FROM wake_events').fetchone()[0]
+        if newest is None:
+            return 0
+        with self.conn:
+            # Deux suppressions indexées (clé primaire, puis horodatage) plutôt qu'un OR qui parcourt la table
+            deleted = self.conn.execute('DELETE FROM wake_events WHERE id IN (SELECT id FROM wake_events '
+                                        'WHERE id <= ? ORDER BY id LIMIT ?)', (newest - max_rows, chunk)).rowcount
+            if deleted < chunk:
+                deleted += self.conn.execute('DELETE FROM wake_events WHERE id IN (SELECT id FROM wake_events '
+                                             'WHERE ts < ? ORDER BY ts LIMIT ?)',
+                                             (now - retention_days * 86400, chunk - deleted)).rowcount
+        metrics.inc('history_compacted_total', deleted)
+        return deleted
+
+
+class HistoryWriter:
+    """Écriture de l'historique dans un thread dédié, par lots regroupés.
+
+    `record` et `mark_up` ne font que placer les événements dans une file ; le thread
+    les écrit au plus toutes les `flush_interval` secondes, avec sa propre connexion,
+    et applique la rétention par petites passes.
+    """
+    def __init__(self, path, retention_days=RETENTION_DAYS, max_rows=MAX_ROWS, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.retention_days = retention_days
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+
+    def record(self, rows):
+        """Ajouter des lignes (voir `events_from_results`) au prochain lot."""
+        if rows:
+            self._queue.put(('append', rows))
+
+    def mark_up(self, ups):
+        """Noter la réponse de périphériques réveillés : [(identifiant, horodatage)]."""
+        if ups:
+            self._queue.put(('mark_up', ups))
+
+    def set_retention(self, retention_days, max_rows):
+        """Changer les limites de rétention ; le thread les applique dès le prochain lot."""
+        if self._thread is None:
+            self.retention_days, self.max_rows = retention_days, max_rows
+        else:
+            self._queue.put(('retention', (retention_days, max_rows)))
+
+    def flush(self, timeout=5.0):
+        """Attendre l'écriture de tout ce qui a été reçu."""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._queue.put(('flush', done))
+        done.wait(timeout)
+
+    def _write(self, history, items):
+        rows = []
+        ups = []
+        waiting = []
+        for kind, value in items:
+            if kind == 'append':
+                rows.extend(value)
+            elif kind == 'mark_up':
+                ups.extend(value)
+            elif kind == 'flush':
+                waiting.append(value)
+        history.append(rows)  # Avant mark_up : une réponse peut suivre le réveil dans le même lot
+        if ups:
+            history.mark_up(ups)
+        for done in waiting:
+            done.set()
+
+    def _run(self):
+        conn = open_connection(self.path)
+        history = HistoryStore(conn)
+        next_compact = 0.0
+        stopping = False
+        try:
+            while not stopping:
+                try:
+                    items = [self._queue.get(timeout=COMPACT_INTERVAL)]
+                except queue.Empty:
+                    items = []
+                # Regrouper ce qui arrive pendant `flush_interval`, sauf pour une demande d'écriture immédiate
+                if items and items[0][0] == 'append':
+                    time.sleep(self.flush_interval)
+                while True:
+                    try:
+                        items.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stopping = any(kind == 'stop' for kind, _ in items)
+                for kind, value in items:
+                    if kind == 'retention':
+                        self.retention_days, self.max_rows = value
+                        next_compact = 0.0  # Nouvelles limites appliquées tout de suite
+                try:
+                    self._write(history, [item for item in items if item[0] != 'stop'])
+                    if time.monotonic() >= next_compact or stopping:
+                        # Passes successives tant qu'il reste à supprimer, jamais plus de COMPACT_CHUNK à la fois
+                        while (history.compact(self.retention_days, self.max_rows) == COMPACT_CHUNK
+                               and self._queue.empty()):
+                            pass
+                        next_compact = time.monotonic() + COMPACT_INTERVAL
+                except Exception:
+                    # L'historique ne doit jamais interrompre les réveils
+                    log.exception("Échec de l'écriture de l'historique des réveils")
+                    metrics.inc('history_write_errors_total')
+                    for kind, value in items:
+                        if kind == 'flush':
+                            value.set()
+        finally:
+            conn.close()
+
+    def start(self):
+        """Démarrer le thread d'écriture."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='wake-history', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Écrire ce qui reste puis arrêter le thread."""
+        if self._thread is None:
+            return
+        self._queue.put(('stop', None))
+        self._thread.join(timeout)
+        self._thread = None
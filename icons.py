@@ -0,0 +1,80 @@
+import os
+from PyQt5.QtCore import QSize, Qt
+from PyQt5.QtGui import QColor, QGuiApplication, QIcon, QImage, QPainter, QPixmap
+from PyQt5.QtSvg import QSvgRenderer
+from metrics import metrics
+
+
+class IconService:
+    """Rendu des icônes SVG teintées, mémorisé par (fichier, couleur, taille, densité de pixels).
+
+    Une entrée est recalculée si le fichier SVG a été modifié depuis son rendu.
+    """
+    def __init__(self):
+        self._icons = {}  # (chemin, couleur, largeur, hauteur, densité) -> (date de modification, QIcon)
+        self._renderers = {}  # Chemin -> (date de modification, QSvgRenderer)
+
+    def tinted_icon(self, path, color, size=QSize(16, 16), device_pixel_ratio=None):
+        """Retourner l'icône SVG `path` teintée avec `color` à la taille logique `size`."""
+        if isinstance(size, int):
+            size = QSize(size, size)
+        if device_pixel_ratio is None:
+            app = QGuiApplication.instance()
+            device_pixel_ratio = app.devicePixelRatio() if app is not None else 1.0
+        mtime = self._mtime(path)
+        key = (path, QColor(color).name(QColor.HexArgb), size.width(), size.height(), device_pixel_ratio)
+        cached = self._icons.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        with metrics.span('icon_render_seconds'):
+            icon = QIcon(self._render(path, mtime, key[1], size, device_pixel_ratio))
+        self._icons[key] = (mtime, icon)
+        return icon
+
+    def _mtime(self, path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _renderer(self, path, mtime):
+        """Analyser le fichier SVG une seule fois tant qu'il n'est pas modifié."""
+        cached = self._renderers.get(path)
+        if cached is None or cached[0] != mtime:
+            renderer = QSvgRenderer(path)
+            renderer.setAspectRatioMode(Qt.KeepAspectRatio)
+            cached = self._renderers[path] = (mtime, renderer)
+        return cached[1]
+
+    def _render(self, path, mtime, color, size, device_pixel_ratio):
+        """Dessiner le SVG à la résolution de l'écran puis le teinter."""
+        image = QImage(round(size.width() * device_pixel_ratio), round(size.height() * device_pixel_ratio),
+                       QImage.Format_ARGB32_Premultiplied)
+        image.fill(Qt.transparent)
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.Antialiasing)
+        self._renderer(path, mtime).render(painter)
+        painter.setCompositionMode(QPainter.CompositionMode_SourceIn)
+        painter.fillRect(image.rect(), QColor(color))
+        painter.end()
+        image.setDevicePixelRatio(device_pixel_ratio)
+        return QPixmap.fromImage(image)
+
+    def invalidate(self, path=None):
+        """Oublier les rendus d'un fichier SVG, ou de tous si `path` est None."""
+        if path is None:
+            self._icons.clear()
+            self._renderers.clear()
+            return
+        self._renderers.pop(path, None)
+        for key in [key for key in self._icons if key[0] == path]:
+            del self._icons[key]
+
+
+# Service partagé par toutes les fenêtres
+icon_service = IconService()
+
+
+def tinted_icon(path, color, size=QSize(16, 16), device_pixel_ratio=None):
+    """Icône SVG teintée, rendue une seule fois pour toute l'application."""
+    return icon_service.tinted_icon(path, color, size, device_pixel_ratio)
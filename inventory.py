@@ -0,0 +1,219 @@
+"""Import et export en masse de l'inventaire des périphériques.
+
+Formats pris en charge : CSV, JSON (tableau ou une ligne JSON par périphérique),
+/etc/ethers (« adresse_mac nom ») et baux DHCP dnsmasq
+(« expiration adresse_mac adresse_ip nom identifiant »).
+"""
+import csv
+import json
+import os
+import time
+from devices import mac_key
+from metrics import metrics
+from wol import build_magic_packet, mac_to_bytes, normalize_mac, secureon_to_bytes
+
+FORMATS = ('csv', 'json', 'ethers', 'leases')
+EXPORT_FORMATS = ('csv', 'json', 'ethers')  # Les baux DHCP ne sont que lus
+BATCH_SIZE = 1000
+MAX_ERRORS = 100  # Nombre maximal d'erreurs détaillées gardées dans le résumé
+_NEW = object()  # Nom réservé par une ligne insérée pendant l'import
+
+
+class ImportSummary:
+    """Résumé d'un import : lignes insérées, mises à jour, ignorées et débit."""
+    __slots__ = ('inserted', 'updated', 'skipped', 'errors', 'elapsed')
+
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+        self.errors = []  # (numéro de ligne, message)
+        self.elapsed = 0.0
+
+    @property
+    def total(self):
+        return self.inserted + self.updated + self.skipped
+
+    @property
+    def rows_per_second(self):
+        return self.total / self.elapsed if self.elapsed > 0 else float('inf')
+
+    def as_dict(self):
+        return {'inserted': self.inserted, 'updated': self.updated, 'skipped': self.skipped,
+                'errors': self.errors, 'elapsed': self.elapsed, 'rows_per_second': self.rows_per_second}
+
+    def __str__(self):
+        return (f"{self.inserted} ajouté(s), {self.updated} mis à jour, {self.skipped} ignoré(s) "
+                f"en {self.elapsed:.3f} s ({self.rows_per_second:.0f} lignes/s)")
+
+
+def guess_format(path):
+    """Deviner le format d'un fichier d'après son nom."""
+    name = os.path.basename(path).lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.json', '.jsonl')):
+        return 'json'
+    if name.endswith('.leases') or 'lease' in name:
+        return 'leases'
+    return 'ethers'
+
+
+def read_csv(f):
+    """Lire un fichier CSV avec un en-tête (name, mac, ip, icon, et secureon en option)."""
+    for line_number, row in enumerate(csv.DictReader(f), start=2):
+        yield line_number, {key.strip().lower(): value for key, value in row.items() if key}
+
+
+def read_json(f):
+    """Lire un tableau JSON, ou un objet JSON par ligne (JSON Lines)."""
+    first = f.read(1)
+    while first and first.isspace():
+        first = f.read(1)
+    if first == '[':
+        # Un tableau JSON est lu en entier : il n'existe pas d'analyseur incrémental dans la bibliothèque standard
+        for index, entry in enumerate(json.loads(first + f.read()), start=1):
+            yield index, entry
+        return
+    for line_number, line in enumerate(f, start=1):
+        if line_number == 1:
+            line = first + line
+        if line.strip():
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError:
+                yield line_number, None  # Ligne ignorée et signalée dans le résumé
+
+
+def read_ethers(f):
+    """Lire un fichier au format /etc/ethers : « adresse_mac nom »."""
+    for line_number, line in enumerate(f, start=1):
+        fields = line.split('#', 1)[0].split()
+        if len(fields) >= 2:
+            yield line_number, {'mac': fields[0], 'name': fields[1]}
+        elif fields:
+            yield line_number, {'mac': fields[0]}
+
+
+def read_leases(f):
+    """Lire des baux DHCP dnsmasq : « expiration adresse_mac adresse_ip nom identifiant »."""
+    for line_number, line in enumerate(f, start=1):
+        fields = line.split()
+        if len(fields) >= 3:
+            name = fields[3] if len(fields) > 3 and fields[3] != '*' else None
+            yield line_number, {'mac': fields[1], 'ip': fields[2], 'name': name}
+
+
+READERS = {'csv': read_csv, 'json': read_json, 'ethers': read_ethers, 'leases': read_leases}
+
+
+def _normalize(entry):
+    """Valider et normaliser une entrée ; retourne (nom, mac, ip, icône, mot de passe SecureOn)."""
+    mac = normalize_mac(str(entry.get('mac') or ''))
+    name = (entry.get('name') or '').strip() or mac
+    ip = (entry.get('ip') or '').strip() or None
+    icon = (entry.get('icon') or '').strip() or None
+    secureon = secureon_to_bytes((entry.get('secureon') or '').strip())
+    return name, mac, ip, icon, secureon
+
+
+def import_devices(store, path, fmt=None):
+    """Importer un fichier dans la base en une seule transaction (mise à jour par adresse MAC).
+
+    Les lignes sont lues en flux et écrites par lots avec `executemany`.
+    """
+    fmt = fmt or guess_format(path)
+    if fmt not in READERS:
+        raise ValueError(f"Format inconnu : {fmt}")
+    summary = ImportSummary()
+    start = time.perf_counter()
+    names = {device.name: device.id for device in store}  # Noms déjà utilisés -> identifiant
+    seen_macs = set()
+
+    def skip(line_number, message):
+        summary.skipped += 1
+        if len(summary.errors) < MAX_ERRORS:
+            summary.errors.append((line_number, message))
+
+    def write(batch):
+        inserts = []
+        updates = []
+        for line_number, entry in batch:
+            try:
+                name, mac, ip, icon, secureon = _normalize(entry)
+            except (ValueError, AttributeError, TypeError) as e:
+                skip(line_number, str(e))
+                continue
+            if mac_key(mac) in seen_macs:
+                skip(line_number, f"Adresse MAC en double dans le fichier : {mac}")
+                continue
+            existing = store.by_mac(mac)
+            owner = names.get(name)
+            if name in names and (existing is None or owner != existing.id):
+                skip(line_number, f"Le nom '{name}' est déjà utilisé par un autre périphérique.")
+                continue
+            seen_macs.add(mac_key(mac))
+            raw = mac_to_bytes(mac)
+            if existing is None:
+                names[name] = _NEW
+                inserts.append((name, mac, ip, icon, raw, secureon, build_magic_packet(raw, secureon)))
+            else:
+                names.pop(existing.name, None)
+                names[name] = existing.id
+                secureon = secureon or existing.secureon
+                updates.append((name, mac, ip, icon, raw, secureon, build_magic_packet(raw, secureon), existing.id))
+        # Mises à jour d'abord : un périphérique renommé libère son ancien nom pour une ligne insérée
+        conn.executemany('UPDATE devices SET name = ?, mac = ?, ip = COALESCE(?, ip), icon = COALESCE(?, icon), '
+                         'mac_bytes = ?, secureon = ?, packet = ? WHERE id = ?', updates)
+        conn.executemany('INSERT INTO devices (name, mac, ip, icon, mac_bytes, secureon, packet) '
+                         'VALUES (?, ?, ?, ?, ?, ?, ?)', inserts)
+        summary.inserted += len(inserts)
+        summary.updated += len(updates)
+
+    conn = store.conn
+    with open(path, 'r', encoding='utf-8', newline='') as f, conn:
+        batch = []
+        for line_number, entry in READERS[fmt](f):
+            if not isinstance(entry, dict):
+                skip(line_number, "Entrée invalide.")
+                continue
+            batch.append((line_number, entry))
+            if len(batch) >= BATCH_SIZE:
+                write(batch)
+                batch = []
+        write(batch)
+    store.reload()
+    summary.elapsed = time.perf_counter() - start
+    metrics.observe('import_seconds', summary.elapsed)
+    metrics.inc('import_rows_total', summary.total)
+    return summary
+
+
+def export_devices(store, path, fmt=None):
+    """Exporter tous les périphériques ; retourne le nombre de lignes écrites."""
+    fmt = fmt or guess_format(path)
+    if fmt not in EXPORT_FORMATS:
+        # Vérifié avant d'ouvrir le fichier, qui serait sinon vidé
+        raise ValueError(f"Format d'export non pris en charge : {fmt}")
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            writer = csv.writer(f)
+            writer.writerow(['name', 'mac', 'ip', 'icon'])
+            for device in store:
+                writer.writerow([device.name, device.mac, device.ip or '', device.icon or ''])
+                count += 1
+        elif fmt == 'json':
+            f.write('[\n')
+            for device in store:
+                if count:
+                    f.write(',\n')
+                json.dump({'name': device.name, 'mac': device.mac, 'ip': device.ip, 'icon': device.icon},
+                          f, ensure_ascii=False)
+                count += 1
+            f.write('\n]\n')
+        elif fmt == 'ethers':
+            for device in store:
+                f.write(f"{device.mac.lower()} {device.name.replace(' ', '_')}\n")
+                count += 1
+    return count
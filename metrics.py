@@ -0,0 +1,183 @@
+"""Mesures internes : compteurs, histogrammes de durées et intervalles chronométrés.
+
+Désactivées par défaut, les mesures ne coûtent qu'un test de booléen par appel.
+Elles s'activent avec `metrics.enable()` (case à cocher des paramètres) ou la
+variable d'environnement SC_PYWOL_METRICS=1, et s'exportent au format texte de
+Prometheus ou en JSON.
+
+    with metrics.span('db_load_devices_seconds'):
+        ...
+    metrics.inc('wol_packets_sent_total', 3)
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Bornes des histogrammes (secondes), comme celles des clients Prometheus
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RESERVOIR_SIZE = 1024  # Dernières valeurs gardées pour calculer les percentiles
+SLOW_THRESHOLD_SECONDS = 0.05  # Au-delà, une opération chronométrée est signalée comme lente
+MAX_SLOW_OPERATIONS = 100
+
+
+class Histogram:
+    """Répartition de durées par tranches, avec les dernières valeurs pour les percentiles."""
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Dernière case : au-delà de la plus grande borne
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=RESERVOIR_SIZE)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def percentile(self, fraction):
+        """Percentile des dernières valeurs (0.5 : médiane), None sans valeur."""
+        if not self.recent:
+            return None
+        values = sorted(self.recent)
+        return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class _Span:
+    """Intervalle chronométré, enregistré dans un histogramme à sa sortie."""
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+
+
+class _NullSpan:
+    """Intervalle sans effet utilisé quand les mesures sont désactivées."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Metrics:
+    """Registre des compteurs et histogrammes de l'application (utilisable depuis plusieurs threads)."""
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.counters = {}
+        self.histograms = {}
+        self.slow_operations = deque(maxlen=MAX_SLOW_OPERATIONS)  # (horodatage, nom, durée)
+        self._lock = threading.Lock()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def reset(self):
+        """Oublier toutes les valeurs mesurées."""
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.slow_operations.clear()
+
+    def inc(self, name, value=1):
+        """Augmenter un compteur."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        """Enregistrer une durée dans un histogramme."""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+            if seconds >= SLOW_THRESHOLD_SECONDS:
+                self.slow_operations.append((time.time(), name, seconds))
+
+    def span(self, name):
+        """Chronométrer un bloc `with` dans l'histogramme `name`."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def timed(self, name):
+        """Décorateur qui chronomètre chaque appel d'une fonction."""
+        def decorator(func):
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Span(self, name):
+                    return func(*args, **kwargs)
+            wrapper.__name__ = func.__name__
+            wrapper.__doc__ = func.__doc__
+            return wrapper
+        return decorator
+
+    def percentile(self, name, fraction):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            return histogram.percentile(fraction) if histogram else None
+
+    # Export
+
+    def snapshot(self):
+        """État des mesures sous une forme sérialisable en JSON."""
+        with self._lock:
+            return {
+                'counters': dict(self.counters),
+                'histograms': {name: {'count': h.count, 'sum': h.sum, 'p50': h.percentile(0.5),
+                                      'p99': h.percentile(0.99),
+                                      'buckets': dict(zip([str(b) for b in h.buckets] + ['+Inf'], h.counts))}
+                               for name, h in self.histograms.items()},
+                'slow_operations': [{'time': when, 'name': name, 'seconds': seconds}
+                                    for when, name, seconds in self.slow_operations],
+            }
+
+    def to_prometheus(self):
+        """Mesures au format texte de Prometheus (préfixe sc_pywol_)."""
+        lines = []
+        with self._lock:
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE sc_pywol_{name} counter")
+                lines.append(f"sc_pywol_{name} {value}")
+            for name, histogram in sorted(self.histograms.items()):
+                lines.append(f"# TYPE sc_pywol_{name} histogram")
+                cumulative = 0
+                for bound, count in zip(list(histogram.buckets) + ['+Inf'], histogram.counts):
+                    cumulative += count
+                    lines.append(f'sc_pywol_{name}_bucket{{le="{bound}"}} {cumulative}')
+                lines.append(f"sc_pywol_{name}_sum {histogram.sum}")
+                lines.append(f"sc_pywol_{name}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        """Écrire les mesures dans un fichier : JSON si le nom finit par .json, sinon texte Prometheus."""
+        text = json.dumps(self.snapshot(), indent=2) if path.endswith('.json') else self.to_prometheus()
+        temporary = path + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(temporary, path)  # Un lecteur (node_exporter) ne voit jamais un fichier à moitié écrit
+
+
+# Registre partagé par toute l'application
+metrics = Metrics(enabled=os.environ.get('SC_PYWOL_METRICS') == '1')
@@ -0,0 +1,450 @@
+import time
+from PyQt5.QtCore import Qt, QAbstractListModel, QAbstractProxyModel, QAbstractTableModel, QModelIndex, QRectF, QSize
+from PyQt5.QtGui import QBrush, QColor, QFont, QPainter
+from PyQt5.QtWidgets import QStyledItemDelegate
+from metrics import metrics
+from search import SearchIndex
+
+# Rôle donnant l'identifiant du périphérique en base de données
+DeviceIdRole = Qt.UserRole
+# Rôle donnant l'état du dernier réveil du périphérique (voir WAKE_STATUS_LABELS)
+WakeStatusRole = Qt.UserRole + 1
+
+# Rôles donnant la présence du périphérique ('online', 'offline', 'unknown', voir presence.py)
+# et l'horodatage de sa dernière réponse
+PresenceRole = Qt.UserRole + 2
+LastSeenRole = Qt.UserRole + 3
+
+WAKE_STATUS_LABELS = {'queued': "en attente", 'sent': "paquet envoyé", 'failed': "échec"}
+PRESENCE_LABELS = {'online': "en ligne", 'offline': "hors ligne", 'unknown': "état inconnu"}
+PRESENCE_COLORS = {'online': "#4CAF50", 'offline': "#9E9E9E"}
+SOURCE_LABELS = {'gui': "interface", 'schedule': "planification", 'api': "API HTTP", 'cli': "ligne de commande"}
+
+
+class DeviceListModel(QAbstractListModel):
+    """Modèle de la liste des périphériques, mis à jour ligne par ligne."""
+    def __init__(self, store, text_size=12, thumbnails=None, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self._ids = [device.id for device in store]
+        self._rows = None  # Identifiant -> ligne, reconstruit après une suppression
+        self.thumbnails = thumbnails  # Cache des icônes (ThumbnailCache), None pour ne pas en afficher
+        self._waiting_icons = {}  # Chemin d'image -> périphériques qui attendent sa miniature
+        self._wake_status = {}  # Identifiant -> état du dernier réveil
+        self._presence = {}  # Identifiant -> (présence, dernière réponse)
+        if thumbnails is not None:
+            thumbnails.loaded.connect(self._on_thumbnail_loaded)
+        self.set_text_size(text_size)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._ids)
+
+    def data(self, index, role=Qt.DisplayRole):
+        """Calculer les données d'une ligne uniquement quand la vue les demande."""
+        if not index.isValid():
+            return None
+        device_id = self._ids[index.row()]
+        if role == Qt.DisplayRole:
+            device = self.store.get(device_id)
+            status = self._wake_status.get(device_id)
+            if status is not None:
+                return f"{device.name} ({device.mac}) — {WAKE_STATUS_LABELS[status]}"
+            return f"{device.name} ({device.mac})"
+        if role == Qt.DecorationRole:
+            return self._icon(device_id)
+        if role == Qt.FontRole:
+            return self._font
+        if role == Qt.SizeHintRole:
+            return self._size_hint
+        if role == DeviceIdRole:
+            return device_id
+        if role == WakeStatusRole:
+            return self._wake_status.get(device_id)
+        if role == PresenceRole:
+            return self._presence.get(device_id, ('unknown', None))[0]
+        if role == LastSeenRole:
+            return self._presence.get(device_id, ('unknown', None))[1]
+        if role == Qt.ToolTipRole:
+            status, last_seen = self._presence.get(device_id, ('unknown', None))
+            if last_seen is None:
+                return PRESENCE_LABELS[status].capitalize()
+            seen = time.strftime('%d/%m/%Y %H:%M:%S', time.localtime(last_seen))
+            return f"{PRESENCE_LABELS[status].capitalize()} (dernière réponse : {seen})"
+        return None
+
+    def _icon(self, device_id):
+        """Miniature de l'icône d'un périphérique, chargée en arrière-plan à la première demande."""
+        device = self.store.get(device_id)
+        if self.thumbnails is None or not device.icon:
+            return None
+        pixmap = self.thumbnails.pixmap(device.icon)
+        if pixmap is None:
+            self._waiting_icons.setdefault(device.icon, set()).add(device_id)
+        return pixmap
+
+    def _on_thumbnail_loaded(self, path):
+        """Rafraîchir uniquement les lignes qui attendaient cette miniature."""
+        for device_id in self._waiting_icons.pop(path, ()):
+            row = self.row_of(device_id)
+            if row >= 0:
+                index = self.index(row)
+                self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def device(self, index):
+        """Retourner le périphérique d'un index de la vue."""
+        if not index.isValid():
+            return None
+        return self.store.get(self._ids[index.row()])
+
+    def device_id_at(self, row):
+        """Identifiant du périphérique affiché à une ligne."""
+        return self._ids[row]
+
+    def row_of(self, device_id):
+        """Retourner la ligne d'un périphérique, ou -1 s'il n'est pas affiché."""
+        if self._rows is None:
+            self._rows = {device_id: row for row, device_id in enumerate(self._ids)}
+        return self._rows.get(device_id, -1)
+
+    def add_device(self, device):
+        """Ajouter une ligne à la fin de la liste pour un périphérique enregistré."""
+        self.add_devices([device])
+        return self.index(len(self._ids) - 1)
+
+    def add_devices(self, devices):
+        """Ajouter des lignes à la fin de la liste en une seule insertion (chargement progressif)."""
+        if not devices:
+            return
+        first = len(self._ids)
+        self.beginInsertRows(QModelIndex(), first, first + len(devices) - 1)
+        for row, device in enumerate(devices, first):
+            self._ids.append(device.id)
+            if self._rows is not None:
+                self._rows[device.id] = row
+        self.endInsertRows()
+
+    def removeRows(self, row, count, parent=QModelIndex()):
+        """Supprimer des lignes et les périphériques correspondants."""
+        if parent.isValid() or row < 0 or count <= 0 or row + count > len(self._ids):
+            return False
+        # Suppression en base d'abord : si elle échoue, la liste n'est pas modifiée
+        for device_id in self._ids[row:row + count]:
+            self.store.remove(device_id)
+        self.beginRemoveRows(QModelIndex(), row, row + count - 1)
+        for device_id in self._ids[row:row + count]:
+            self._wake_status.pop(device_id, None)
+            self._presence.pop(device_id, None)
+        del self._ids[row:row + count]
+        self._rows = None
+        self.endRemoveRows()
+        return True
+
+    def remove_device(self, device_id):
+        """Supprimer la ligne d'un périphérique."""
+        row = self.row_of(device_id)
+        return row >= 0 and self.removeRows(row, 1)
+
+    def set_wake_status(self, device_ids, status):
+        """Afficher l'état du réveil de périphériques ('queued', 'sent', 'failed' ou None pour l'effacer)."""
+        for device_id in device_ids:
+            if status is None:
+                self._wake_status.pop(device_id, None)
+            else:
+                self._wake_status[device_id] = status
+            row = self.row_of(device_id)
+            if row >= 0:
+                index = self.index(row)
+                self.dataChanged.emit(index, index, [Qt.DisplayRole, WakeStatusRole])
+
+    def set_presence(self, changes):
+        """Appliquer un lot de changements de présence {identifiant: (présence, dernière réponse)}.
+
+        Un seul signal couvre toutes les lignes modifiées : la vue ne redessine que celles qui sont visibles.
+        """
+        rows = []
+        for device_id, presence in changes.items():
+            row = self.row_of(device_id)
+            if row >= 0:
+                self._presence[device_id] = presence
+                rows.append(row)
+        if rows:
+            self.dataChanged.emit(self.index(min(rows)), self.index(max(rows)),
+                                  [PresenceRole, LastSeenRole, Qt.ToolTipRole])
+
+    def clear_presence(self):
+        """Oublier la présence de tous les périphériques (surveillance arrêtée)."""
+        if self._presence and self._ids:
+            self._presence.clear()
+            self.dataChanged.emit(self.index(0), self.index(len(self._ids) - 1),
+                                  [PresenceRole, LastSeenRole, Qt.ToolTipRole])
+
+    def set_text_size(self, size):
+        """Changer la taille du texte de toutes les lignes sans les recréer."""
+        self.layoutAboutToBeChanged.emit()
+        self.text_size = size
+        self._font = QFont("Arial", size)
+        self._size_hint = QSize(size * 3, size * 3)
+        self.layoutChanged.emit()
+
+    def icon_size(self):
+        """Taille des icônes adaptée à la taille du texte."""
+        return QSize(self.text_size * 2, self.text_size * 2)
+
+    def reset(self):
+        """Recharger toutes les lignes depuis le magasin de périphériques."""
+        # Le filtre et la vue se reconstruisent pendant endResetModel : ils sont inclus dans la mesure
+        with metrics.span('list_rebuild_seconds'):
+            self.beginResetModel()
+            self._ids = [device.id for device in self.store]
+            self._rows = None
+            self._waiting_icons.clear()
+            self.endResetModel()
+
+
+class DeviceFilterProxyModel(QAbstractProxyModel):
+    """Vue filtrée de la liste des périphériques, à la manière d'un QSortFilterProxyModel.
+
+    Le filtrage s'appuie sur un index de recherche en mémoire et ne rappelle jamais
+    Python ligne par ligne depuis Qt, ce qui garde chaque frappe rapide même avec
+    des dizaines de milliers de périphériques. `tags`, s'il est donné, retourne les
+    étiquettes de tous les périphériques ({identifiant: [noms]}) ; elles sont relues
+    au début de chaque recherche, car elles peuvent changer depuis la ligne de commande.
+    """
+    def __init__(self, parent=None, tags=None):
+        super().__init__(parent)
+        self.tags = tags
+        self.search_index = SearchIndex()
+        self.filter_text = ""
+        self._rows = None  # Lignes du modèle source affichées (None : toutes)
+        self._proxy_rows = {}  # Ligne source -> ligne filtrée
+        self._removing_visible = False
+
+    def setSourceModel(self, source):
+        """Brancher le modèle source et suivre ses changements ligne par ligne."""
+        self.beginResetModel()
+        super().setSourceModel(source)
+        source.rowsInserted.connect(self._on_rows_inserted)
+        source.rowsAboutToBeRemoved.connect(self._on_rows_about_to_be_removed)
+        source.rowsRemoved.connect(self._on_rows_removed)
+        source.dataChanged.connect(self._on_data_changed)
+        source.layoutAboutToBeChanged.connect(self.layoutAboutToBeChanged)
+        source.layoutChanged.connect(self.layoutChanged)
+        source.modelAboutToBeReset.connect(self.beginResetModel)
+        source.modelReset.connect(self._on_model_reset)
+        self._rebuild_index()
+        self._apply_filter()
+        self.endResetModel()
+
+    def _rebuild_index(self):
+        self.search_index = SearchIndex(self.sourceModel().store, self.tags() if self.tags else None)
+
+    def _apply_filter(self):
+        """Calculer les lignes affichées pour le texte de recherche courant."""
+        with metrics.span('search_filter_seconds'):
+            ids = self.search_index.search(self.filter_text)
+            if ids is None:
+                self._rows = None
+                self._proxy_rows = {}
+                return
+            source = self.sourceModel()
+            self._rows = [row for row in range(source.rowCount()) if source.device_id_at(row) in ids]
+            self._proxy_rows = {source_row: row for row, source_row in enumerate(self._rows)}
+
+    def set_filter_text(self, text):
+        """Filtrer les périphériques par nom, adresse MAC, adresse IP ou étiquette."""
+        if text == self.filter_text:
+            return
+        if self.tags is not None and not self.filter_text.strip() and text.strip():
+            self.search_index.set_tags(self.tags())  # Nouvelle recherche : étiquettes à jour
+        self.beginResetModel()
+        self.filter_text = text
+        self._apply_filter()
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self.sourceModel() is None:
+            return 0
+        return self.sourceModel().rowCount() if self._rows is None else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 1
+
+    def index(self, row, column=0, parent=QModelIndex()):
+        if parent.isValid() or not 0 <= row < self.rowCount() or column != 0:
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid() or self.sourceModel() is None:
+            return QModelIndex()
+        row = proxy_index.row() if self._rows is None else self._rows[proxy_index.row()]
+        return self.sourceModel().index(row)
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        row = source_index.row() if self._rows is None else self._proxy_rows.get(source_index.row(), -1)
+        return self.index(row) if row >= 0 else QModelIndex()
+
+    def _on_rows_inserted(self, parent, first, last):
+        """Ajouter les nouveaux périphériques à l'index et les afficher s'ils correspondent."""
+        source = self.sourceModel()
+        matching = []
+        for source_row in range(first, last + 1):
+            device = source.store.get(source.device_id_at(source_row))
+            self.search_index.add(device)
+            if self._rows is not None and self.search_index.matches(device.id, self.filter_text):
+                matching.append(source_row)
+        # Une seule insertion pour tout le lot (les lignes sont ajoutées à la fin du modèle source)
+        if self._rows is None:
+            self.beginInsertRows(QModelIndex(), first, last)
+            self.endInsertRows()
+        elif matching:
+            row = len(self._rows)
+            self.beginInsertRows(QModelIndex(), row, row + len(matching) - 1)
+            for source_row in matching:
+                self._proxy_rows[source_row] = len(self._rows)
+                self._rows.append(source_row)
+            self.endInsertRows()
+
+    def _on_rows_about_to_be_removed(self, parent, first, last):
+        """Retirer les lignes supprimées de l'index et de la vue filtrée."""
+        source = self.sourceModel()
+        for source_row in range(first, last + 1):
+            self.search_index.remove(source.device_id_at(source_row))
+        if self._rows is None:
+            self._removing_visible = True
+            self.beginRemoveRows(QModelIndex(), first, last)
+            return
+        # Les lignes filtrées sont triées : celles qui disparaissent se suivent
+        removed = [self._proxy_rows[row] for row in range(first, last + 1) if row in self._proxy_rows]
+        self._removing_visible = bool(removed)
+        if removed:
+            self.beginRemoveRows(QModelIndex(), removed[0], removed[-1])
+
+    def _on_rows_removed(self, parent, first, last):
+        if self._rows is not None:
+            count = last - first + 1
+            self._rows = [row if row < first else row - count for row in self._rows if not first <= row <= last]
+            self._proxy_rows = {source_row: row for row, source_row in enumerate(self._rows)}
+        if self._removing_visible:
+            self.endRemoveRows()
+
+    def _on_data_changed(self, top_left, bottom_right, roles=()):
+        """Relayer un changement de lignes source en un seul signal sur les lignes affichées."""
+        first, last = top_left.row(), bottom_right.row()
+        if self._rows is not None:
+            rows = [self._proxy_rows[row] for row in range(first, last + 1) if row in self._proxy_rows]
+            if not rows:
+                return
+            first, last = min(rows), max(rows)
+        self.dataChanged.emit(self.index(first), self.index(last), roles)
+
+    def _on_model_reset(self):
+        self._rebuild_index()
+        self._apply_filter()
+        self.endResetModel()
+
+
+class DeviceDelegate(QStyledItemDelegate):
+    """Délégué qui donne la même taille à toutes les lignes sans mesurer le texte.
+
+    Une pastille à droite de la ligne indique la présence (verte : en ligne, grise : hors ligne).
+    """
+    def paint(self, painter, option, index):
+        super().paint(painter, option, index)
+        color = PRESENCE_COLORS.get(index.data(PresenceRole))
+        if color is None:
+            return
+        diameter = min(10.0, option.rect.height() / 2)
+        rect = QRectF(option.rect.right() - diameter - 8, option.rect.center().y() - diameter / 2,
+                      diameter, diameter)
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QBrush(QColor(color)))
+        painter.drawEllipse(rect)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        size_hint = index.data(Qt.SizeHintRole)
+        if size_hint is not None:
+            return QSize(option.rect.width() or size_hint.width(), size_hint.height())
+        return super().sizeHint(option, index)
+
+
+class HistoryModel(QAbstractTableModel):
+    """Historique des réveils, du plus récent au plus ancien, lu page par page quand la vue défile."""
+    HEADERS = ("Date", "Périphérique", "Adresse MAC", "Origine", "Utilisateur", "Résultat", "Réponse")
+
+    def __init__(self, history, device_id=None, page_size=200, parent=None):
+        super().__init__(parent)
+        self.history = history  # HistoryStore
+        self.device_id = device_id  # None : tous les périphériques
+        self.page_size = page_size
+        self._events = []
+        self._exhausted = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._events)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        event = self._events[index.row()]
+        if role == Qt.DisplayRole:
+            column = index.column()
+            if column == 0:
+                return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(event.ts))
+            if column == 1:
+                return event.name or "-"
+            if column == 2:
+                return event.mac
+            if column == 3:
+                return SOURCE_LABELS.get(event.source, event.source)
+            if column == 4:
+                return event.user or "-"
+            if column == 5:
+                return "paquet envoyé" if event.ok else f"échec : {event.error}"
+            if column == 6:
+                return "-" if event.up_after is None else f"en ligne après {event.up_after:.0f} s"
+        if role == Qt.ForegroundRole and index.column() == 5 and not event.ok:
+            return QBrush(QColor("#E53935"))
+        return None
+
+    def event_at(self, row):
+        return self._events[row]
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        """Lire la page suivante (appelé par la vue quand elle atteint la fin de la liste)."""
+        if parent.isValid() or self._exhausted:
+            return
+        before_id = self._events[-1].id if self._events else None
+        with metrics.span('history_page_seconds'):
+            events = self.history.page(before_id, self.page_size, self.device_id)
+        self._exhausted = len(events) < self.page_size
+        if events:
+            self.beginInsertRows(QModelIndex(), len(self._events), len(self._events) + len(events) - 1)
+            self._events.extend(events)
+            self.endInsertRows()
+
+    def refresh(self):
+        """Relire l'historique depuis le début (nouveaux événements)."""
+        self.beginResetModel()
+        self._events = []
+        self._exhausted = False
+        self.endResetModel()
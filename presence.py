@@ -0,0 +1,236 @@
+"""Surveillance de la présence des périphériques (en ligne, hors ligne, inconnu).
+
+Chaque périphérique qui a une adresse IP est sondé en TCP (voir `wol.probe_host`)
+par une boucle asyncio dans un thread dédié, avec un nombre limité de sondes
+simultanées. L'intervalle entre deux sondes s'adapte : court après un réveil ou
+un changement d'état, il double ensuite tant que l'état reste stable.
+
+Les changements ne sont pas signalés un par un : ils sont regroupés et transmis
+au plus une fois par `flush_interval` sous la forme {identifiant: (état, dernière réponse)}.
+"""
+import heapq
+import threading
+import time
+from wol import probe_host
+
+ONLINE = 'online'
+OFFLINE = 'offline'
+UNKNOWN = 'unknown'
+
+MIN_INTERVAL = 2.0  # Secondes entre deux sondes après un réveil ou un changement d'état
+MAX_INTERVAL = 300.0  # Secondes entre deux sondes d'un état stable
+WAKE_WATCH_SECONDS = 120.0  # Durée de la surveillance rapprochée après un réveil
+PROBE_TIMEOUT = 1.0
+MAX_CONCURRENCY = 64
+FLUSH_INTERVAL = 0.25  # Au plus un lot de changements par intervalle
+
+
+class Presence:
+    """État de présence d'un périphérique."""
+    __slots__ = ('status', 'last_seen', 'interval', 'fast_until')
+
+    def __init__(self, status=UNKNOWN, last_seen=None):
+        self.status = status
+        self.last_seen = last_seen  # Horodatage (time.time) de la dernière réponse
+        self.interval = MIN_INTERVAL
+        self.fast_until = 0.0
+
+    def __repr__(self):
+        return f"Presence({self.status!r}, last_seen={self.last_seen!r})"
+
+
+class PresenceMonitor:
+    """Sondes périodiques des adresses IP, avec intervalles adaptatifs et changements regroupés.
+
+    `on_changes` est appelé depuis le thread de surveillance avec un dictionnaire
+    {identifiant: (état, horodatage de la dernière réponse ou None)} ; l'interface le
+    relaie par un signal Qt.
+    """
+    def __init__(self, on_changes, probe=None, clock=time.time, max_concurrency=MAX_CONCURRENCY,
+                 probe_timeout=PROBE_TIMEOUT, flush_interval=FLUSH_INTERVAL):
+        self.on_changes = on_changes
+        self.probe = probe or (lambda ip: probe_host(ip, timeout=probe_timeout))
+        self.clock = clock
+        self.max_concurrency = max_concurrency
+        self.flush_interval = flush_interval
+        self.states = {}  # Identifiant -> Presence
+        self._ips = {}  # Identifiant -> adresse IP sondée
+        self._heap = []  # (échéance, identifiant)
+        self._due = {}  # Identifiant -> échéance valide (les autres entrées du tas sont ignorées)
+        self._changes = {}
+        self._last_flush = 0.0
+        self._loop = None
+        self._thread = None
+        self._wakeup = None
+        self._stopping = False
+
+    # Appels depuis n'importe quel thread
+
+    def watch(self, devices):
+        """Surveiller des périphériques (objets avec `id` et `ip`) ; ceux sans adresse IP restent inconnus."""
+        self._call(self._watch, [(device.id, device.ip) for device in devices])
+
+    def forget(self, device_ids):
+        """Ne plus surveiller des périphériques supprimés."""
+        self._call(self._forget, list(device_ids))
+
+    def notify_wake(self, device_ids):
+        """Sonder rapidement des périphériques qui viennent d'être réveillés."""
+        self._call(self._notify_wake, list(device_ids))
+
+    def _call(self, func, *args):
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(func, *args)
+        else:
+            func(*args)
+
+    # État (thread de surveillance)
+
+    def _schedule(self, device_id, due):
+        self._due[device_id] = due
+        heapq.heappush(self._heap, (due, device_id))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _watch(self, devices):
+        now = self.clock()
+        for device_id, ip in devices:
+            previous = self._ips.get(device_id)
+            if ip:
+                self._ips[device_id] = ip
+                if ip != previous:
+                    self.states[device_id] = Presence()
+                    self._schedule(device_id, now)
+            else:
+                if previous is not None:
+                    self._changes[device_id] = (UNKNOWN, None)  # Adresse IP retirée
+                self._ips.pop(device_id, None)
+                self._due.pop(device_id, None)
+                self.states[device_id] = Presence()
+
+    def _forget(self, device_ids):
+        for device_id in device_ids:
+            self._ips.pop(device_id, None)
+            self._due.pop(device_id, None)
+            self.states.pop(device_id, None)
+            self._changes.pop(device_id, None)
+
+    def _notify_wake(self, device_ids):
+        now = self.clock()
+        for device_id in device_ids:
+            state = self.states.get(device_id)
+            if state is None or device_id not in self._ips:
+                continue
+            state.fast_until = now + WAKE_WATCH_SECONDS
+            state.interval = MIN_INTERVAL
+            if self._due.get(device_id, float('inf')) > now + MIN_INTERVAL:
+                self._schedule(device_id, now + MIN_INTERVAL)
+
+    def record(self, device_id, online, now=None):
+        """Enregistrer le résultat d'une sonde et programmer la suivante ; retourne l'intervalle choisi."""
+        state = self.states.get(device_id)
+        if state is None or device_id not in self._ips:
+            return None
+        now = self.clock() if now is None else now
+        status = ONLINE if online else OFFLINE
+        if status != state.status or now < state.fast_until:
+            state.interval = MIN_INTERVAL
+        else:
+            state.interval = min(state.interval * 2, MAX_INTERVAL)
+        if status != state.status or online:
+            state.status = status
+            if online:
+                state.last_seen = now
+            self._changes[device_id] = (state.status, state.last_seen)
+        self._schedule(device_id, now + state.interval)
+        return state.interval
+
+    def take_changes(self):
+        """Retirer et retourner les changements en attente."""
+        changes, self._changes = self._changes, {}
+        return changes
+
+    def _flush(self, force=False):
+        now = time.monotonic()
+        if self._changes and (force or now - self._last_flush >= self.flush_interval):
+            self._last_flush = now
+            self.on_changes(self.take_changes())
+
+    # Boucle asyncio
+
+    async def _probe(self, semaphore, device_id, ip):
+        async with semaphore:
+            if self._ips.get(device_id) != ip:
+                return  # Supprimé ou modifié pendant l'attente
+            try:
+                online = await self.probe(ip)
+            except OSError:
+                online = False
+        if self._ips.get(device_id) == ip:
+            self.record(device_id, online)
+
+    async def run(self):
+        """Sonder les périphériques jusqu'à l'appel de `stop`."""
+        import asyncio
+
+        self._wakeup = asyncio.Event()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        probes = set()
+        try:
+            while not self._stopping:
+                now = self.clock()
+                while self._heap and self._heap[0][0] <= now:
+                    due, device_id = heapq.heappop(self._heap)
+                    if self._due.get(device_id) != due:
+                        continue  # Échéance remplacée ou périphérique oublié
+                    del self._due[device_id]
+                    task = asyncio.ensure_future(self._probe(semaphore, device_id, self._ips[device_id]))
+                    probes.add(task)
+                    task.add_done_callback(probes.discard)
+                self._flush()
+                delay = self._heap[0][0] - now if self._heap else MAX_INTERVAL
+                if self._changes:
+                    delay = min(delay, self.flush_interval)
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), max(delay, 0.01))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in probes:
+                task.cancel()
+            await asyncio.gather(*probes, return_exceptions=True)
+            self._flush(force=True)
+
+    def start_in_thread(self):
+        """Démarrer la surveillance dans un thread dédié."""
+        import asyncio
+
+        started = threading.Event()
+
+        def run():
+            loop = self._loop = asyncio.new_event_loop()
+            loop.call_soon(started.set)
+            try:
+                loop.run_until_complete(self.run())
+            finally:
+                loop.close()
+
+        self._stopping = False
+        self._thread = threading.Thread(target=run, name='presence-monitor', daemon=True)
+        self._thread.start()
+        started.wait(5.0)
+
+    def stop(self, timeout=5.0):
+        """Arrêter la surveillance démarrée par `start_in_thread`."""
+        if self._thread is None:
+            return
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            def request_stop():
+                self._stopping = True
+                self._wakeup.set()
+            loop.call_soon_threadsafe(request_stop)
+        self._thread.join(timeout)
+        self._thread = None
+        self._loop = None
@@ -0,0 +1,276 @@
+"""Relais Wake On Lan entre sous-réseaux.
+
+Les routeurs ne transmettent pas la diffusion 255.255.255.255 et bloquent souvent
+la diffusion dirigée. Un relais tourne sur une machine du sous-réseau distant :
+il reçoit des demandes de réveil authentifiées (UDP) et réémet les paquets
+magiques sur son propre segment.
+
+Format d'une demande (un datagramme) :
+    b'SCWR', version (1 octet), horodatage en millisecondes (8 octets), nonce (8 octets),
+    nombre d'entrées (1 octet), puis pour chaque entrée l'adresse MAC (6 octets),
+    la longueur du mot de passe SecureOn (1 octet) et le mot de passe,
+    suivis de la signature HMAC-SHA256 de tout ce qui précède (32 octets).
+
+Les demandes trop anciennes (horloges décalées de plus de `MAX_SKEW` secondes)
+ou déjà reçues (même nonce) sont ignorées.
+
+    python -m cli relay serve --key secret             # sur une machine du sous-réseau distant
+    python -m cli relay add 10.20.0.0/16 relais-b --key secret
+
+Les clés des relais (table relays) sont enregistrées en clair dans la base de données :
+elles doivent pouvoir signer les demandes sans intervention. La base est donc créée lisible
+par son propriétaire seulement (voir `storage.create_private_file`). Le relais lui-même
+lit sa clé sur la ligne de commande ou dans $SC_PYWOL_RELAY_KEY, jamais dans la base.
+"""
+import hashlib
+import hmac
+import ipaddress
+import os
+import struct
+import threading
+import time
+from metrics import metrics
+from wol import MagicPacketSender, _ip_to_int, _mask, build_magic_packet
+
+MAGIC = b'SCWR'
+VERSION = 1
+RELAY_PORT = 9009
+KEY_ENV = 'SC_PYWOL_RELAY_KEY'
+MAX_ENTRIES = 64  # Entrées par datagramme (moins de 1 Ko)
+MAX_SKEW = 30.0  # Écart maximal entre les horloges (secondes)
+DIGEST_SIZE = 32
+HEADER = struct.Struct('!4sBQ8sB')
+
+
+class RelayError(ValueError):
+    """Demande de relais invalide, mal signée, trop ancienne ou rejouée."""
+
+
+def _key(key):
+    if isinstance(key, str):
+        key = key.encode('utf-8')
+    if not key:
+        raise RelayError("La clé du relais ne peut pas être vide.")
+    return key
+
+
+def build_request(key, entries, now=None, nonce=None):
+    """Construire une demande signée pour des entrées (adresse MAC en 6 octets, mot de passe SecureOn en octets)."""
+    if not 0 < len(entries) <= MAX_ENTRIES:
+        raise RelayError(f"Une demande contient de 1 à {MAX_ENTRIES} adresses MAC.")
+    timestamp = int((time.time() if now is None else now) * 1000)
+    body = [HEADER.pack(MAGIC, VERSION, timestamp, nonce or os.urandom(8), len(entries))]
+    for mac, secureon in entries:
+        if len(mac) != 6 or len(secureon) not in (0, 6):
+            raise RelayError("Entrée de demande invalide.")
+        body.append(mac + bytes((len(secureon),)) + secureon)
+    data = b''.join(body)
+    return data + hmac.new(_key(key), data, hashlib.sha256).digest()
+
+
+def parse_request(key, data, now=None):
+    """Vérifier la signature et l'âge d'une demande ; retourne (nonce, [(adresse MAC, mot de passe SecureOn)])."""
+    if len(data) < HEADER.size + DIGEST_SIZE:
+        raise RelayError("Demande trop courte.")
+    data, digest = data[:-DIGEST_SIZE], data[-DIGEST_SIZE:]
+    if not hmac.compare_digest(digest, hmac.new(_key(key), data, hashlib.sha256).digest()):
+        raise RelayError("Signature invalide.")
+    magic, version, timestamp, nonce, count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise RelayError("Format de demande inconnu.")
+    now = time.time() if now is None else now
+    if abs(now - timestamp / 1000) > MAX_SKEW:
+        raise RelayError("Demande périmée (horloges décalées ?).")
+    entries = []
+    offset = HEADER.size
+    for _ in range(count):
+        mac = data[offset:offset + 6]
+        length = data[offset + 6] if offset + 6 < len(data) else -1
+        secureon = data[offset + 7:offset + 7 + length]
+        if len(mac) != 6 or length not in (0, 6) or len(secureon) != length:
+            raise RelayError("Demande tronquée.")
+        entries.append((mac, secureon))
+        offset += 7 + length
+    if offset != len(data):
+        raise RelayError("Données inattendues en fin de demande.")
+    return nonce, entries
+
+
+class RelayServer:
+    """Relais UDP asyncio : vérifie les demandes puis réémet les paquets sur le segment local."""
+    def __init__(self, key, sender=None, host='0.0.0.0', port=RELAY_PORT):
+        self.key = _key(key)
+        self.sender = sender or MagicPacketSender()
+        self._own_sender = sender is None
+        self.host = host
+        self.port = port
+        self.relayed = 0  # Paquets réémis
+        self.rejected = 0  # Demandes refusées
+        self._nonces = {}  # Nonce -> expiration, contre le rejeu
+        self._transport = None
+        self._loop = None
+        self._thread = None
+
+    def handle(self, data, now=None):
+        """Traiter un datagramme ; retourne les résultats d'envoi {adresse MAC: WakeResult}."""
+        now = time.time() if now is None else now
+        try:
+            nonce, entries = parse_request(self.key, data, now)
+            if self._nonces.get(nonce, 0) > now:
+                raise RelayError("Demande déjà reçue.")
+        except RelayError:
+            self.rejected += 1
+            metrics.inc('relay_rejected_total')
+            raise
+        self._nonces[nonce] = now + 2 * MAX_SKEW
+        if len(self._nonces) > 4096:
+            self._nonces = {key: expiry for key, expiry in self._nonces.items() if expiry > now}
+        packets = {}
+        for mac, secureon in entries:
+            mac = ':'.join(f'{byte:02X}' for byte in mac)
+            packets[mac] = build_magic_packet(mac, secureon)
+        results = self.sender.send(list(packets), packets=packets)
+        sent = sum(result.sent for result in results.values())
+        self.relayed += sent
+        metrics.inc('relay_packets_total', sent)
+        return results
+
+    async def start(self):
+        """Ouvrir la socket d'écoute (port 0 : port choisi par le système)."""
+        import asyncio
+
+        server = self
+
+        class Protocol(asyncio.DatagramProtocol):
+            def datagram_received(self, data, addr):
+                try:
+                    server.handle(data)
+                except (RelayError, OSError):
+                    pass  # Pas de réponse : un relais ne doit pas servir d'amplificateur
+
+        self._loop = asyncio.get_running_loop()
+        self._transport, _ = await self._loop.create_datagram_endpoint(Protocol, local_addr=(self.host, self.port))
+        self.port = self._transport.get_extra_info('sockname')[1]
+
+    def close(self):
+        """Fermer la socket d'écoute et, s'il a été créé ici, l'émetteur."""
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+        if self._own_sender:
+            self.sender.close()
+
+    async def serve_forever(self):
+        import asyncio
+
+        await self.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            self.close()
+
+    def start_in_thread(self, timeout=5.0):
+        """Démarrer le relais dans un thread dédié ; retourne le port d'écoute."""
+        import asyncio
+
+        error = []
+        started = threading.Event()
+
+        def run():
+            loop = asyncio.new_event_loop()
+            try:
+                loop.run_until_complete(self.start())
+            except Exception as e:
+                # Port occupé ou toute autre erreur : transmise à l'appelant au lieu d'attendre `timeout`
+                error.append(e)
+                started.set()
+                loop.close()
+                return
+            started.set()
+            try:
+                loop.run_forever()
+            finally:
+                self.close()
+                loop.close()
+
+        self._thread = threading.Thread(target=run, name='wol-relay', daemon=True)
+        self._thread.start()
+        ready = started.wait(timeout)
+        if error:
+            raise error[0]
+        if not ready:
+            raise TimeoutError(f"Le relais n'a pas démarré en {timeout} s.")
+        return self.port
+
+    def stop(self, timeout=5.0):
+        """Arrêter le relais démarré par `start_in_thread`."""
+        if self._thread is None:
+            return
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
+
+
+# Relais connus, enregistrés dans la table relays
+
+def parse_relay_address(text):
+    """Lire « hôte » ou « hôte:port » ; retourne (hôte, port)."""
+    host, sep, port = text.strip().rpartition(':')
+    if not sep:
+        return text.strip(), RELAY_PORT
+    try:
+        port = int(port)
+    except ValueError:
+        raise ValueError(f"Port de relais invalide : {text}") from None
+    if not host or not 0 < port < 65536:
+        raise ValueError(f"Adresse de relais invalide : {text}")
+    return host, port
+
+
+class RelayRoutes:
+    """Sous-réseaux joignables par un relais (table relays, clés en clair)."""
+    generation = 0  # Modifications faites dans ce processus (invalide `DeviceStore.relay_table`)
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def add(self, network, host, port=RELAY_PORT, key=''):
+        """Enregistrer (ou remplacer) le relais d'un sous-réseau IPv4 ; retourne le sous-réseau normalisé."""
+        try:
+            network = ipaddress.IPv4Network(network.strip(), strict=False)
+        except ValueError as e:
+            raise ValueError(f"Sous-réseau invalide : {e}") from None
+        _key(key)
+        with self.conn:
+            self.conn.execute('INSERT INTO relays (network, host, port, key) VALUES (?, ?, ?, ?) '
+                              'ON CONFLICT(network) DO UPDATE SET host = excluded.host, port = excluded.port, '
+                              'key = excluded.key', (str(network), host, port, key))
+        RelayRoutes.generation += 1
+        return str(network)
+
+    def remove(self, network):
+        """Retirer le relais d'un sous-réseau ; retourne True s'il existait."""
+        try:
+            network = str(ipaddress.IPv4Network(network.strip(), strict=False))
+        except ValueError:
+            return False
+        with self.conn:
+            removed = self.conn.execute('DELETE FROM relays WHERE network = ?', (network,)).rowcount > 0
+        RelayRoutes.generation += 1
+        return removed
+
+    def all(self):
+        """Liste des relais : [(sous-réseau, hôte, port)] (les clés ne sont pas retournées)."""
+        return self.conn.execute('SELECT network, host, port FROM relays ORDER BY network').fetchall()
+
+    def table(self):
+        """Routes pour `wol.resolve_target` : [(réseau, masque, (hôte, port, clé))], préfixe le plus long en tête."""
+        routes = []
+        for network, host, port, key in self.conn.execute('SELECT network, host, port, key FROM relays'):
+            address, _, prefix = network.partition('/')
+            mask = _mask(int(prefix or 32))
+            routes.append((_ip_to_int(address) & mask, mask, (host, port, key)))
+        routes.sort(key=lambda route: route[1], reverse=True)
+        return routes
+
@@ -0,0 +1,279 @@
+"""Planification des réveils : ponctuels, de type cron ou périodiques.
+
+Les planifications sont enregistrées dans la table `schedules`. Une seule file de
+priorité (tas) donne la prochaine échéance : la boucle dort jusqu'à cette date au
+lieu d'interroger la base à intervalle régulier. Les exécutions manquées pendant un
+arrêt sont rattrapées une seule fois au démarrage.
+
+Ce module n'utilise pas PyQt5 : il sert aussi bien dans WOLApp que sans interface.
+"""
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from metrics import metrics
+from storage import migrate
+
+log = logging.getLogger(__name__)
+
+KINDS = ('once', 'cron', 'interval')
+
+# Retard au-delà duquel une exécution manquée est abandonnée si le rattrapage est désactivé
+MISFIRE_GRACE_SECONDS = 60
+
+# Durée maximale d'une attente : une mise en veille ou un changement d'heure ne décale pas une échéance plus longtemps
+MAX_SLEEP_SECONDS = 3600
+
+
+class CronExpression:
+    """Expression cron à cinq champs : minute, heure, jour du mois, mois, jour de la semaine.
+
+    Chaque champ accepte `*`, des valeurs, des listes (`1,3`), des plages (`1-5`) et
+    des pas (`*/15`). Le dimanche vaut 0 ou 7.
+    """
+    FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, text):
+        fields = text.split()
+        if len(fields) != 5:
+            raise ValueError(f"Expression cron invalide (cinq champs attendus) : '{text}'")
+        self.text = text
+        values = [self._parse_field(field, low, high) for field, (low, high) in zip(fields, self.FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = values
+        self.weekdays = {day % 7 for day in weekdays}
+        # Comme cron : si le jour du mois et le jour de la semaine sont restreints, l'un ou l'autre suffit
+        self._any_day = fields[2] == '*'
+        self._any_weekday = fields[4] == '*'
+
+    @staticmethod
+    def _parse_field(field, low, high):
+        values = set()
+        for part in field.split(','):
+            step = 1
+            if '/' in part:
+                part, step_text = part.split('/', 1)
+                step = int(step_text)
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = (int(value) for value in part.split('-', 1))
+            else:
+                start = end = int(part)
+            if step < 1 or not low <= start <= end <= high:
+                raise ValueError(f"Champ cron invalide : '{field}'")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment):
+        in_month = moment.day in self.days
+        in_week = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return in_month and in_week
+        return in_month or in_week
+
+    def next_after(self, moment):
+        """Première date correspondante strictement après `moment` (datetime local)."""
+        moment = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 5)
+        while moment < limit:
+            # Avancer champ par champ plutôt que minute par minute
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f"L'expression cron '{self.text}' ne correspond à aucune date.")
+
+
+class Schedule:
+    """Planification d'un réveil, pour un périphérique ou une cible (nom, adresse MAC ou motif glob)."""
+    __slots__ = ('id', 'kind', 'spec', 'device_id', 'target', 'next_run', 'last_run', 'enabled', 'catch_up')
+
+    def __init__(self, id, kind, spec, device_id=None, target=None, next_run=None, last_run=None,
+                 enabled=True, catch_up=True):
+        if kind not in KINDS:
+            raise ValueError(f"Type de planification inconnu : {kind}")
+        self.id = id
+        self.kind = kind
+        self.spec = spec
+        self.device_id = device_id
+        self.target = target
+        self.next_run = next_run  # Horodatage de la prochaine exécution, None si terminée
+        self.last_run = last_run
+        self.enabled = bool(enabled)
+        self.catch_up = bool(catch_up)
+
+    def first_run(self, now):
+        """Première échéance d'une nouvelle planification."""
+        if self.kind == 'once':
+            return datetime.fromisoformat(self.spec).timestamp()
+        return self.following(now, now)
+
+    def following(self, due, now):
+        """Échéance suivante après une exécution prévue à `due`, sans revenir avant `now`."""
+        if self.kind == 'once':
+            return None
+        if self.kind == 'interval':
+            interval = float(self.spec)
+            # Garder la même phase en sautant les périodes déjà passées
+            periods = int((now - due) // interval) + 1 if now >= due else 1
+            return due + periods * interval
+        return CronExpression(self.spec).next_after(datetime.fromtimestamp(max(due, now))).timestamp()
+
+    def as_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __repr__(self):
+        return f"Schedule(id={self.id!r}, kind={self.kind!r}, spec={self.spec!r})"
+
+
+def validate_spec(kind, spec):
+    """Vérifier la description d'une planification ; lève ValueError si elle est invalide."""
+    if kind == 'once':
+        datetime.fromisoformat(spec)
+    elif kind == 'cron':
+        CronExpression(spec)
+    elif kind == 'interval':
+        if float(spec) <= 0:
+            raise ValueError("L'intervalle doit être strictement positif.")
+    else:
+        raise ValueError(f"Type de planification inconnu : {kind}")
+
+
+class Scheduler:
+    """File des planifications, ordonnée par prochaine échéance.
+
+    `wake` est appelé avec chaque planification échue. `clock` retourne l'heure
+    courante en secondes depuis l'époque (remplaçable dans les tests).
+    """
+    def __init__(self, conn, wake, clock=time.time):
+        self.conn = conn
+        self.wake = wake
+        self.clock = clock
+        self.schedules = {}
+        self._heap = []  # (échéance, identifiant) ; les entrées périmées sont ignorées à la lecture
+        self._changed = threading.Event()  # Réveille la boucle quand la file change
+        self._stopping = threading.Event()
+        migrate(conn)  # Table `schedules` créée par les migrations de storage.py
+        self.reload()
+
+    def reload(self):
+        """Relire les planifications actives de la base de données."""
+        self.schedules = {}
+        for row in self.conn.execute('SELECT id, kind, spec, device_id, target, next_run, last_run, enabled, '
+                                     'catch_up FROM schedules WHERE enabled = 1 AND next_run IS NOT NULL'):
+            schedule = Schedule(*row)
+            self.schedules[schedule.id] = schedule
+        self._heap = [(schedule.next_run, schedule.id) for schedule in self.schedules.values()]
+        heapq.heapify(self._heap)
+        self._changed.set()
+
+    def all(self):
+        """Toutes les planifications enregistrées, y compris celles terminées."""
+        rows = self.conn.execute('SELECT id, kind, spec, device_id, target, next_run, last_run, enabled, '
+                                 'catch_up FROM schedules ORDER BY id')
+        return [Schedule(*row) for row in rows]
+
+    def add(self, kind, spec, device_id=None, target=None, catch_up=True):
+        """Enregistrer une planification et l'ajouter à la file."""
+        if (device_id is None) == (target is None):
+            raise ValueError("Une planification vise soit un périphérique, soit une cible.")
+        validate_spec(kind, spec)
+        schedule = Schedule(None, kind, spec, device_id, target, catch_up=catch_up)
+        schedule.next_run = schedule.first_run(self.clock())
+        with self.conn:
+            cursor = self.conn.execute(
+                'INSERT INTO schedules (kind, spec, device_id, target, next_run, catch_up) VALUES (?, ?, ?, ?, ?, ?)',
+                (kind, spec, device_id, target, schedule.next_run, int(catch_up)))
+        schedule.id = cursor.lastrowid
+        self.schedules[schedule.id] = schedule
+        heapq.heappush(self._heap, (schedule.next_run, schedule.id))
+        self._changed.set()
+        return schedule
+
+    def remove(self, schedule_id):
+        """Supprimer une planification ; son entrée dans le tas est ignorée ensuite."""
+        with self.conn:
+            deleted = self.conn.execute('DELETE FROM schedules WHERE id = ?', (schedule_id,)).rowcount
+        self.schedules.pop(schedule_id, None)
+        self._changed.set()
+        return deleted > 0
+
+    def next_due(self):
+        """Prochaine planification à exécuter, ou None."""
+        heap = self._heap
+        while heap:
+            due, schedule_id = heap[0]
+            schedule = self.schedules.get(schedule_id)
+            if schedule is not None and schedule.next_run == due:
+                return schedule
+            heapq.heappop(heap)  # Entrée d'une planification supprimée ou reprogrammée
+        return None
+
+    def seconds_until_next(self):
+        """Durée avant la prochaine échéance (0 si elle est passée), ou None s'il n'y en a pas."""
+        schedule = self.next_due()
+        if schedule is None:
+            return None
+        return max(0.0, schedule.next_run - self.clock())
+
+    def run_pending(self):
+        """Exécuter les planifications échues ; retourne celles qui ont déclenché un réveil.
+
+        Plusieurs exécutions manquées d'une même planification n'en déclenchent qu'une.
+        """
+        now = self.clock()
+        fired = []
+        updates = []
+        while True:
+            schedule = self.next_due()
+            if schedule is None or schedule.next_run > now:
+                break
+            heapq.heappop(self._heap)
+            due = schedule.next_run
+            if schedule.catch_up or now - due <= MISFIRE_GRACE_SECONDS:
+                schedule.last_run = now
+                fired.append(schedule)
+            schedule.next_run = schedule.following(due, now)
+            if schedule.next_run is None:
+                schedule.enabled = False
+                del self.schedules[schedule.id]
+            else:
+                heapq.heappush(self._heap, (schedule.next_run, schedule.id))
+            updates.append((schedule.next_run, schedule.last_run, int(schedule.enabled), schedule.id))
+        if updates:
+            with self.conn:
+                self.conn.executemany('UPDATE schedules SET next_run = ?, last_run = ?, enabled = ? WHERE id = ?',
+                                      updates)
+        for schedule in fired:
+            # L'échéance suivante est déjà enregistrée : une erreur est notée et n'arrête ni les
+            # autres planifications ni la boucle (base verrouillée, périphériques illisibles...)
+            try:
+                self.wake(schedule)
+            except Exception:
+                log.exception("Échec du réveil de la planification %s", schedule.id)
+                metrics.inc('schedule_wake_errors_total')
+        return fired
+
+    def run_forever(self):
+        """Boucle sans interface : dormir jusqu'à la prochaine échéance puis réveiller, jusqu'à `stop`."""
+        self._stopping.clear()
+        while not self._stopping.is_set():
+            self._changed.clear()
+            self.run_pending()
+            delay = self.seconds_until_next()
+            delay = MAX_SLEEP_SECONDS if delay is None else min(delay, MAX_SLEEP_SECONDS)
+            # Une planification ajoutée ou l'arrêt demandé réveille la boucle plus tôt
+            if not self._changed.wait(delay):
+                self.reload()  # Prendre en compte les planifications ajoutées par un autre processus
+
+    def stop(self):
+        """Interrompre `run_forever`, éventuellement depuis un autre thread."""
+        self._stopping.set()
+        self._changed.set()
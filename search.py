@@ -0,0 +1,94 @@
+from devices import mac_key
+
+# Nombre de recherches récentes gardées pour revenir en arrière sans tout reparcourir
+MAX_CACHED_QUERIES = 64
+
+
+class SearchIndex:
+    """Index en mémoire des périphériques pour la recherche par sous-chaîne.
+
+    Chaque périphérique est résumé en une seule chaîne en minuscules (nom, adresse MAC
+    avec et sans séparateurs, adresse IP, étiquettes). Une recherche qui prolonge la
+    précédente ne parcourt que les résultats précédents ; les résultats récents sont
+    mémorisés pour que l'effacement d'un caractère soit immédiat.
+
+    `tags` : {identifiant: noms des étiquettes}, gardé pour les périphériques ajoutés ensuite.
+    """
+    def __init__(self, devices=(), tags=None):
+        self._fields = {}  # Identifiant -> texte de recherche du périphérique, sans les étiquettes
+        self._haystacks = {}  # Identifiant -> texte de recherche
+        self._tags = dict(tags or {})
+        self._results = {}  # Recherche récente -> identifiants trouvés
+        for device in devices:
+            self._fields[device.id] = self.haystack(device)
+            self._haystacks[device.id] = self._join(device.id)
+
+    @staticmethod
+    def haystack(device):
+        """Texte dans lequel une recherche est faite pour un périphérique (hors étiquettes)."""
+        fields = [device.name, device.mac, mac_key(device.mac), device.ip or '']
+        return '\x00'.join(fields).lower()
+
+    def _join(self, device_id):
+        tags = self._tags.get(device_id)
+        fields = self._fields[device_id]
+        return '\x00'.join([fields, *(tag.lower() for tag in tags)]) if tags else fields
+
+    def _update(self, device_id):
+        """Recalculer le texte d'un périphérique et les résultats mémorisés qui le concernent."""
+        haystack = self._haystacks[device_id] = self._join(device_id)
+        for query, ids in self._results.items():
+            if query in haystack:
+                ids.add(device_id)
+            else:
+                ids.discard(device_id)
+
+    def add(self, device):
+        """Ajouter ou mettre à jour un périphérique dans l'index."""
+        self._fields[device.id] = self.haystack(device)
+        self._update(device.id)
+
+    def set_tags(self, tags):
+        """Remplacer les étiquettes {identifiant: noms} ; seuls les périphériques modifiés sont recalculés."""
+        old, self._tags = self._tags, dict(tags)
+        for device_id in old.keys() | self._tags.keys():
+            if device_id in self._fields and old.get(device_id) != self._tags.get(device_id):
+                self._update(device_id)
+
+    def remove(self, device_id):
+        """Retirer un périphérique de l'index."""
+        self._fields.pop(device_id, None)
+        self._haystacks.pop(device_id, None)
+        for ids in self._results.values():
+            ids.discard(device_id)
+
+    def matches(self, device_id, query):
+        """Vrai si le périphérique correspond à la recherche."""
+        return query.strip().lower() in self._haystacks.get(device_id, '')
+
+    def search(self, query):
+        """Identifiants des périphériques qui contiennent `query`, ou None si la recherche est vide."""
+        query = query.strip().lower()
+        if not query:
+            return None
+        ids = self._results.get(query)
+        if ids is not None:
+            return ids
+        # Partir des résultats de la plus longue recherche précédente qui est un préfixe
+        candidates = None
+        for length in range(len(query) - 1, 0, -1):
+            candidates = self._results.get(query[:length])
+            if candidates is not None:
+                break
+        haystacks = self._haystacks
+        if candidates is None:
+            ids = {device_id for device_id, haystack in haystacks.items() if query in haystack}
+        else:
+            ids = {device_id for device_id in candidates if query in haystacks[device_id]}
+        if len(self._results) >= MAX_CACHED_QUERIES:
+            del self._results[next(iter(self._results))]
+        self._results[query] = ids
+        return ids
+
+    def __len__(self):
+        return len(self._haystacks)
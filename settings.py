@@ -0,0 +1,107 @@
+import logging
+import sqlite3
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from metrics import metrics
+from storage import migrate
+
+log = logging.getLogger(__name__)
+
+# Paramètres de l'interface et leurs valeurs par défaut (colonnes de la table `settings`,
+# créées par les migrations de storage.py : un nouveau paramètre demande une migration)
+DEFAULT_SETTINGS = {
+    'device_text_size': 12,
+    'accent_color': "#4CAF50",
+    'text_color': "#ffffff",
+    'api_enabled': 0,
+    'api_host': "127.0.0.1",
+    'api_port': 8760,
+    'group_wave_size': 16,  # Périphériques réveillés à la fois dans un groupe
+    'group_wave_delay_ms': 1000,  # Pause entre deux vagues
+    'metrics_enabled': 0,  # Mesures de performance (voir metrics.py)
+    'presence_enabled': 1,  # Surveillance de la présence des périphériques (voir presence.py)
+    'discovery_subnet': "",  # Dernier sous-réseau balayé par la découverte (vide : table ARP seulement)
+    'directed_broadcast': 1,  # Paquets envoyés au sous-réseau de chaque périphérique, ou par son relais
+    'wol_port': 9,  # Port UDP des paquets WOL
+    'wol_interface': "",  # Adresse IP de la carte réseau d'envoi (vide : choisie par le système)
+    'history_retention_days': 90,  # Ancienneté maximale de l'historique des réveils (voir history.py)
+    'history_max_rows': 1000000,  # Nombre maximal d'événements gardés
+}
+
+
+class SettingsManager(QObject):
+    """Paramètres gardés en mémoire et écrits en base par rafales regroupées.
+
+    Chaque modification relance un délai d'attente ; une seule transaction écrit
+    toutes les valeurs modifiées quand le délai expire ou lors d'un appel à `flush`.
+    """
+    changed = pyqtSignal(str, object)  # Nom du paramètre, nouvelle valeur
+
+    def __init__(self, conn, delay_ms=500, parent=None):
+        super().__init__(parent)
+        self.conn = conn
+        self.flush_count = 0  # Nombre de transactions d'écriture effectuées
+        self._dirty = set()
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay_ms)
+        self._timer.timeout.connect(self.flush)
+        self._values = self._load()
+
+    def _load(self):
+        """Lire les paramètres enregistrés (colonnes et valeurs par défaut créées par les migrations)."""
+        migrate(self.conn)
+        columns = ', '.join(DEFAULT_SETTINGS)
+        row = self.conn.execute(f'SELECT {columns} FROM settings').fetchone()
+        if row is None:
+            # Ligne supprimée à la main : la recréer avec les valeurs par défaut
+            placeholders = ', '.join('?' for _ in DEFAULT_SETTINGS)
+            with self.conn:
+                self.conn.execute(f'INSERT INTO settings ({columns}) VALUES ({placeholders})',
+                                  tuple(DEFAULT_SETTINGS.values()))
+            return dict(DEFAULT_SETTINGS)
+        return dict(zip(DEFAULT_SETTINGS, row))
+
+    def get(self, key):
+        return self._values[key]
+
+    def __getitem__(self, key):
+        return self._values[key]
+
+    def set(self, key, value):
+        """Modifier un paramètre en mémoire et programmer son écriture en base."""
+        if key not in DEFAULT_SETTINGS:
+            raise KeyError(key)
+        if self._values[key] == value:
+            return
+        self._values[key] = value
+        self._dirty.add(key)
+        self._timer.start()  # Relancer le délai : les changements rapprochés sont regroupés
+        self.changed.emit(key, value)
+
+    @property
+    def pending(self):
+        """Vrai si des modifications n'ont pas encore été écrites."""
+        return bool(self._dirty)
+
+    def flush(self):
+        """Écrire toutes les modifications en attente en une seule transaction.
+
+        Appelée par le minuteur et par des signaux de l'interface : une erreur de la base
+        (verrou tenu au-delà du délai d'attente, disque plein) est notée dans le journal,
+        les modifications restent en attente et l'écriture est retentée au délai suivant.
+        """
+        self._timer.stop()
+        if not self._dirty:
+            return
+        keys = [key for key in DEFAULT_SETTINGS if key in self._dirty]
+        assignments = ', '.join(f'{key} = ?' for key in keys)
+        try:
+            with metrics.span('db_write_seconds'), self.conn:
+                self.conn.execute(f'UPDATE settings SET {assignments}', [self._values[key] for key in keys])
+        except sqlite3.Error as e:
+            log.warning("Échec de l'enregistrement des paramètres, nouvel essai plus tard : %s", e)
+            metrics.inc('settings_write_errors_total')
+            self._timer.start()
+            return
+        self._dirty.clear()
+        self.flush_count += 1
@@ -0,0 +1,393 @@
+"""Base de données SQLite partagée par l'interface, la ligne de commande et le planificateur.
+
+Plusieurs processus peuvent ouvrir le même fichier en même temps : le journal WAL laisse
+les lectures se poursuivre pendant une écriture, et une écriture qui en croise une autre
+attend (busy_timeout) au lieu d'échouer avec « database is locked ». Dans un processus,
+chaque thread utilise sa propre connexion (voir `Database`), qui garde ses requêtes préparées.
+
+Le schéma est versionné par PRAGMA user_version : `migrate` applique dans l'ordre les
+migrations de `MIGRATIONS` qui manquent, chacune dans sa propre transaction.
+"""
+import logging
+import os
+import sqlite3
+import sys
+import threading
+from wol import build_magic_packet, mac_key, mac_to_bytes, normalize_mac
+
+log = logging.getLogger(__name__)
+
+APP_NAME = 'sc-pywol'
+DB_NAME = 'sc_pywol.db'
+LEGACY_DB_FILE = DB_NAME  # Anciennes versions : fichier relatif au dossier de lancement
+DB_ENV = 'SC_PYWOL_DB'  # Chemin imposé de la base de données
+BUSY_TIMEOUT_SECONDS = 10.0  # Attente maximale d'un verrou d'écriture tenu par un autre processus
+STATEMENT_CACHE_SIZE = 256  # Requêtes préparées gardées par connexion
+DB_FILE_MODE = 0o600  # La base contient les clés des relais en clair : lisible par son propriétaire seulement
+
+
+def data_dir():
+    """Dossier de données de l'utilisateur (%APPDATA%, Application Support ou $XDG_DATA_HOME)."""
+    if sys.platform == 'win32':
+        base = os.environ.get('APPDATA') or os.path.expanduser('~\\AppData\\Roaming')
+        return os.path.join(base, 'SC-PYWOL')
+    if sys.platform == 'darwin':
+        return os.path.expanduser('~/Library/Application Support/SC-PYWOL')
+    base = os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+    return os.path.join(base, APP_NAME)
+
+
+def default_db_path():
+    """Chemin de la base de données : $SC_PYWOL_DB, sinon le dossier de données de l'utilisateur.
+
+    Au premier démarrage, une base laissée par une ancienne version dans le dossier de
+    lancement (ou à côté de l'exécutable) y est recopiée ; l'original n'est pas supprimé.
+    """
+    path = os.environ.get(DB_ENV)
+    if path:
+        return path
+    path = os.path.join(data_dir(), DB_NAME)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        candidates = [os.path.abspath(LEGACY_DB_FILE)]
+        if getattr(sys, 'frozen', False):
+            candidates.append(os.path.join(os.path.dirname(sys.executable), LEGACY_DB_FILE))
+        for legacy in candidates:
+            if os.path.isfile(legacy):
+                adopt_legacy_db(legacy, path)
+                break
+    return path
+
+
+def create_private_file(path):
+    """Créer un fichier de base de données vide, lisible et modifiable par son propriétaire seulement.
+
+    SQLite donne ces droits aux fichiers -wal et -shm qu'il crée ensuite à côté. Sous Windows,
+    les droits viennent du dossier de données de l'utilisateur.
+    """
+    if os.path.exists(path):
+        return
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, DB_FILE_MODE)
+    except FileExistsError:
+        return  # Créé entre-temps par un autre processus
+    os.close(fd)
+
+
+def adopt_legacy_db(source, destination):
+    """Recopier une ancienne base de données (API de sauvegarde de SQLite, cohérente même en cours d'écriture)."""
+    create_private_file(destination)
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(destination)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+    log.info("Base de données %s recopiée dans %s", source, destination)
+
+
+def open_connection(path):
+    """Ouvrir une connexion configurée pour l'accès concurrent (WAL, attente des verrous)."""
+    if path != ':memory:':
+        create_private_file(path)
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_SECONDS, cached_statements=STATEMENT_CACHE_SIZE)
+    conn.execute(f'PRAGMA busy_timeout = {int(BUSY_TIMEOUT_SECONDS * 1000)}')
+    if path != ':memory:':
+        # Le mode WAL est enregistré dans le fichier ; synchronous=NORMAL suffit avec WAL
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+    return conn
+
+
+def connect(path=None):
+    """Ouvrir la base de données (chemin par défaut : `default_db_path`) et appliquer les migrations."""
+    conn = open_connection(path or default_db_path())
+    migrate(conn)
+    return conn
+
+
+class Database:
+    """Fichier SQLite partagé entre threads, avec l'interface d'une connexion sqlite3.
+
+    Les magasins (DeviceStore, GroupStore, SettingsManager, Scheduler) l'utilisent comme
+    une connexion ordinaire ; chaque appel passe par la connexion du thread courant, ouverte
+    à sa première utilisation. La connexion d'un thread terminé est fermée avec lui.
+    Une base « :memory: » n'est pas partagée entre connexions : utiliser un fichier.
+    """
+    def __init__(self, path=None):
+        self.path = path or default_db_path()
+        self._local = threading.local()
+        migrate(self.connection())
+
+    def connection(self):
+        """Connexion du thread courant."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = open_connection(self.path)
+        return conn
+
+    def execute(self, sql, parameters=()):
+        return self.connection().execute(sql, parameters)
+
+    def executemany(self, sql, parameters):
+        return self.connection().executemany(sql, parameters)
+
+    def cursor(self):
+        return self.connection().cursor()
+
+    def commit(self):
+        self.connection().commit()
+
+    def rollback(self):
+        self.connection().rollback()
+
+    @property
+    def in_transaction(self):
+        return self.connection().in_transaction
+
+    def __enter__(self):
+        return self.connection().__enter__()
+
+    def __exit__(self, *exc_info):
+        return self.connection().__exit__(*exc_info)
+
+    def close(self):
+        """Fermer la connexion du thread courant."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# Migrations du schéma, appliquées dans l'ordre
+
+def _create_devices(cursor):
+    """Table des périphériques ; l'ancienne table sans clé primaire est recopiée sans les doublons."""
+    columns = [row[1] for row in cursor.execute('PRAGMA table_info(devices)')]
+    if columns and 'id' not in columns:
+        _migrate_legacy_devices(cursor)
+    cursor.execute('''CREATE TABLE IF NOT EXISTS devices (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        mac TEXT NOT NULL,
+        ip TEXT,
+        icon TEXT,
+        mac_bytes BLOB,
+        secureon BLOB,
+        packet BLOB
+    )''')
+
+
+def _migrate_legacy_devices(cursor):
+    """Recopier l'ancienne table `devices` dans la nouvelle en supprimant les doublons.
+
+    Une même adresse MAC n'est gardée qu'une fois ; les noms en double sont suffixés.
+    """
+    # L'ancienne table n'est supprimée qu'une fois les lignes recopiées
+    cursor.execute('ALTER TABLE devices RENAME TO devices_legacy')
+    rows = cursor.execute('SELECT name, mac, ip, icon FROM devices_legacy ORDER BY rowid').fetchall()
+    cursor.execute('''CREATE TABLE devices (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        mac TEXT NOT NULL,
+        ip TEXT,
+        icon TEXT
+    )''')
+    names = set()
+    macs = set()
+    kept = []
+    for name, mac, ip, icon in rows:
+        if not mac or mac_key(mac) in macs:
+            continue
+        macs.add(mac_key(mac))
+        name = name or mac
+        unique_name = name
+        suffix = 2
+        while unique_name in names:
+            unique_name = f"{name} ({suffix})"
+            suffix += 1
+        names.add(unique_name)
+        kept.append((unique_name, mac, ip or None, icon or None))
+    cursor.executemany('INSERT INTO devices (name, mac, ip, icon) VALUES (?, ?, ?, ?)', kept)
+    cursor.execute('DROP TABLE devices_legacy')
+
+
+def _create_groups(cursor):
+    """Groupes et étiquettes : appartenance plusieurs-à-plusieurs, indexée dans les deux sens."""
+    cursor.execute('CREATE TABLE IF NOT EXISTS groups (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS group_members (
+        group_id INTEGER NOT NULL REFERENCES groups (id) ON DELETE CASCADE,
+        device_id INTEGER NOT NULL REFERENCES devices (id) ON DELETE CASCADE,
+        PRIMARY KEY (group_id, device_id)
+    ) WITHOUT ROWID''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_group_members_device ON group_members (device_id)')
+    cursor.execute('CREATE TABLE IF NOT EXISTS tags (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS device_tags (
+        tag_id INTEGER NOT NULL REFERENCES tags (id) ON DELETE CASCADE,
+        device_id INTEGER NOT NULL REFERENCES devices (id) ON DELETE CASCADE,
+        PRIMARY KEY (tag_id, device_id)
+    ) WITHOUT ROWID''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_device_tags_device ON device_tags (device_id)')
+
+
+def _precompute_packets(cursor):
+    """Adresse MAC sur 6 octets, mot de passe SecureOn et paquet magique précalculé ; noms et adresses uniques.
+
+    Les adresses MAC existantes sont réécrites sous leur forme canonique. Une adresse
+    invalide est laissée telle quelle : elle sera signalée à l'envoi.
+    """
+    columns = [row[1] for row in cursor.execute('PRAGMA table_info(devices)')]
+    for column in ('mac_bytes', 'secureon', 'packet'):
+        if column not in columns:
+            cursor.execute(f'ALTER TABLE devices ADD COLUMN {column} BLOB')
+    # Index créés avant la réécriture des adresses : une adresse déjà présente sous sa forme
+    # canonique lève IntegrityError au lieu de créer un doublon
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_devices_name ON devices (name)')
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_devices_mac ON devices (mac)')
+    rows = cursor.execute('SELECT id, mac, secureon FROM devices ORDER BY id').fetchall()
+    for device_id, mac, secureon in rows:
+        try:
+            raw = mac_to_bytes(mac)
+        except ValueError:
+            continue
+        try:
+            cursor.execute('UPDATE devices SET mac = ?, mac_bytes = ?, packet = ? WHERE id = ?',
+                           (normalize_mac(mac), raw, build_magic_packet(raw, secureon), device_id))
+        except sqlite3.IntegrityError:
+            # Même adresse écrite sous deux formes : seule la première est normalisée
+            continue
+
+
+def _create_relays(cursor):
+    """Relais Wake On Lan des sous-réseaux distants (voir relay.py)."""
+    cursor.execute('''CREATE TABLE IF NOT EXISTS relays (
+        id INTEGER PRIMARY KEY,
+        network TEXT NOT NULL UNIQUE,
+        host TEXT NOT NULL,
+        port INTEGER NOT NULL,
+        key TEXT NOT NULL
+    )''')
+
+
+def _create_settings_and_schedules(cursor):
+    """Paramètres de l'interface et planifications, créés jusqu'ici par leur module.
+
+    Les autres colonnes de paramètres sont créées par la migration 7 (`_complete_settings`).
+    """
+    cursor.execute('''CREATE TABLE IF NOT EXISTS settings (
+        device_text_size INTEGER,
+        accent_color TEXT,
+        text_color TEXT
+    )''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS schedules (
+        id INTEGER PRIMARY KEY,
+        kind TEXT NOT NULL,
+        spec TEXT NOT NULL,
+        device_id INTEGER,
+        target TEXT,
+        next_run REAL,
+        last_run REAL,
+        enabled INTEGER NOT NULL DEFAULT 1,
+        catch_up INTEGER NOT NULL DEFAULT 1
+    )''')
+
+
+def _create_wake_events(cursor):
+    """Historique des réveils (voir history.py), indexé par périphérique et par date."""
+    cursor.execute('''CREATE TABLE IF NOT EXISTS wake_events (
+        id INTEGER PRIMARY KEY,
+        ts REAL NOT NULL,
+        device_id INTEGER,
+        name TEXT,
+        mac TEXT NOT NULL,
+        source TEXT NOT NULL,
+        user TEXT,
+        ok INTEGER NOT NULL,
+        error TEXT,
+        up_at REAL
+    )''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_wake_events_device ON wake_events (device_id, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_wake_events_ts ON wake_events (ts)')
+
+
+def _complete_settings(cursor):
+    """Toutes les colonnes des paramètres (settings.DEFAULT_SETTINGS) et la ligne des valeurs par défaut.
+
+    Elles étaient ajoutées au démarrage par SettingsManager, hors des migrations. Un paramètre
+    ajouté par la suite demande une nouvelle migration.
+    """
+    columns = (
+        ('device_text_size', 'INTEGER', 12),
+        ('accent_color', 'TEXT', "#4CAF50"),
+        ('text_color', 'TEXT', "#ffffff"),
+        ('api_enabled', 'INTEGER', 0),
+        ('api_host', 'TEXT', "127.0.0.1"),
+        ('api_port', 'INTEGER', 8760),
+        ('group_wave_size', 'INTEGER', 16),
+        ('group_wave_delay_ms', 'INTEGER', 1000),
+        ('metrics_enabled', 'INTEGER', 0),
+        ('presence_enabled', 'INTEGER', 1),
+        ('discovery_subnet', 'TEXT', ""),
+        ('directed_broadcast', 'INTEGER', 1),
+        ('wol_port', 'INTEGER', 9),
+        ('wol_interface', 'TEXT', ""),
+        ('history_retention_days', 'INTEGER', 90),
+        ('history_max_rows', 'INTEGER', 1000000),
+    )
+    existing = {row[1] for row in cursor.execute('PRAGMA table_info(settings)')}
+    for name, column_type, default in columns:
+        if name not in existing:
+            cursor.execute(f'ALTER TABLE settings ADD COLUMN {name} {column_type} DEFAULT {default!r}')
+    if cursor.execute('SELECT COUNT(*) FROM settings').fetchone()[0] == 0:
+        names = ', '.join(name for name, _, _ in columns)
+        placeholders = ', '.join('?' for _ in columns)
+        cursor.execute(f'INSERT INTO settings ({names}) VALUES ({placeholders})',
+                       [default for _, _, default in columns])
+
+
+# (version atteinte, migration) ; une migration ne doit jamais être modifiée une fois publiée
+MIGRATIONS = (
+    (1, _create_devices),
+    (2, _create_groups),
+    (3, _precompute_packets),
+    (4, _create_relays),
+    (5, _create_settings_and_schedules),
+    (6, _create_wake_events),
+    (7, _complete_settings),
+)
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn):
+    """Appliquer les migrations manquantes ; retourne la version du schéma.
+
+    Chaque migration s'exécute dans une transaction BEGIN IMMEDIATE : si deux processus
+    démarrent ensemble, le second attend le premier puis voit les migrations déjà faites.
+    """
+    version = schema_version(conn)
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(f"Base de données créée par une version plus récente (schéma {version}).")
+    for target, migration in MIGRATIONS:
+        if version >= target:
+            continue
+        if conn.in_transaction:
+            conn.commit()
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            version = schema_version(conn)  # Relire une fois le verrou obtenu
+            if version < target:
+                migration(cursor)
+                cursor.execute(f'PRAGMA user_version = {target}')
+                version = target
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        log.debug("Schéma migré vers la version %d", target)
+    return version
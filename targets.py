@@ -0,0 +1,53 @@
+"""Résolution des cibles de réveil, partagée par l'interface, l'API HTTP et la ligne de commande.
+
+Une cible est un nom, une adresse MAC, un motif glob (« rack-b-* »), « @groupe » ou
+« tag:étiquette ». Ce module n'importe ni PyQt5 ni la ligne de commande.
+"""
+import fnmatch
+from groups import GroupStore
+from wol import is_valid_mac_address, mac_key
+
+GLOB_CHARS = set('*?[')
+
+
+def resolve_targets(store, targets):
+    """Associer chaque cible (nom, adresse MAC, motif glob, « @groupe » ou « tag:étiquette ») aux périphériques.
+
+    Retourne la liste des (nom, adresse MAC) trouvés et la liste des cibles sans correspondance.
+    """
+    matches = {}
+    unmatched = []
+    groups = GroupStore(store.conn)
+    for target in targets:
+        if target.startswith('@') or target.startswith('tag:'):
+            if target.startswith('@'):
+                device_ids = groups.members(target[1:])
+            else:
+                device_ids = groups.tagged(target[4:])
+            devices = [store.get(device_id) for device_id in device_ids]
+            found = [(device.name, device.mac) for device in devices if device is not None]
+        elif GLOB_CHARS & set(target):
+            pattern = target.lower()
+            found = [(d.name, d.mac) for d in store if fnmatch.fnmatchcase(d.name.lower(), pattern)]
+        elif store.by_name(target):
+            device = store.by_name(target)
+            found = [(device.name, device.mac)]
+        elif is_valid_mac_address(target):
+            # Une adresse MAC inconnue est réveillée telle quelle
+            device = store.by_mac(target)
+            found = [(device.name, device.mac) if device else (None, target)]
+        else:
+            found = []
+        if not found:
+            unmatched.append(target)
+        for name, mac in found:
+            matches.setdefault(mac_key(mac), (name, mac))
+    return list(matches.values()), unmatched
+
+
+def schedule_targets(store, schedule):
+    """Liste des (nom, adresse MAC) visés par une planification."""
+    if schedule.device_id is not None:
+        device = store.get(schedule.device_id)
+        return [(device.name, device.mac)] if device else []
+    return resolve_targets(store, [schedule.target])[0]
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import socket
+import sqlite3
+import threading
+import time
+import unittest
+from unittest import mock
+from api import WakeApiServer
+from devices import DeviceStore
+from groups import GroupStore
+from targets import resolve_targets
+from wol import MagicPacketSender
+
+class TestWakeApiServer(unittest.TestCase):
+
+    def setUp(self):
+        """Démarre l'API sur un port libre avec un récepteur UDP local à la place du réseau."""
+        self.conn = sqlite3.connect(':memory:', check_same_thread=False)
+        self.store = DeviceStore(self.conn)
+        self.nas = self.store.add("NAS", "00:11:22:33:44:01", "10.0.0.1")
+        self.store.add("rack-b-01", "00:11:22:33:44:02")
+        self.store.add("rack-b-02", "00:11:22:33:44:03")
+        self.sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sink.bind(("127.0.0.1", 0))
+        self.sender = MagicPacketSender("127.0.0.1", self.sink.getsockname()[1])
+        self.server = WakeApiServer(self.store, self.sender, port=0)
+        self.port = self.server.start_in_thread()
+
+    def tearDown(self):
+        self.server.stop()
+        self.sender.close()
+        self.sink.close()
+        self.conn.close()
+
+    async def request(self, reader, writer, method, path, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else b''
+        writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+                     + body)
+        head = await reader.readuntil(b'\r\n\r\n')
+        status = int(head.split(b' ', 2)[1])
+        length = int(head.lower().split(b'content-length: ')[1].split(b'\r\n')[0])
+        return status, json.loads(await reader.readexactly(length))
+
+    def call(self, *requests):
+        """Envoyer plusieurs requêtes sur une même connexion ; retourne les réponses."""
+        async def run():
+            reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+            try:
+                return [await self.request(reader, writer, *request) for request in requests]
+            finally:
+                writer.close()
+        return asyncio.run(asyncio.wait_for(run(), 10))  # Une requête sans réponse fait échouer le test
+
+    def test_list_wake_and_results(self):
+        """Test la liste des périphériques, le réveil par identifiant, nom et motif, et la relecture du résultat."""
+        (status, devices), (_, wake), (_, result), (missing, _) = self.call(
+            ('GET', '/devices'),
+            ('POST', '/wake', {'targets': [self.nas.id, "rack-b-*", "inconnu"]}),
+            ('GET', '/results/1'),
+            ('GET', '/devices/999'))
+        self.assertEqual(status, 200)
+        self.assertEqual([device['name'] for device in devices], ["NAS", "rack-b-01", "rack-b-02"])
+        self.assertEqual([entry['name'] for entry in wake['results']], ["NAS", "rack-b-01", "rack-b-02"])
+        self.assertTrue(all(entry['ok'] for entry in wake['results']))
+        self.assertEqual(wake['unmatched'], ["inconnu"])
+        self.assertEqual(result, wake)
+        self.assertEqual(missing, 404)
+        self.assertEqual(len(self.sink.recv(1024)), 102)
+
+    def test_invalid_requests(self):
+        """Test les réponses d'erreur pour un corps invalide ou une méthode non autorisée."""
+        (bad, _), (method, _), (by_query, wake) = self.call(
+            ('POST', '/wake', {'targets': "NAS"}), ('DELETE', '/devices'), ('GET', '/wake?target=NAS'))
+        self.assertEqual((bad, method, by_query), (400, 405, 200))
+        self.assertEqual(wake['results'][0]['mac'], "00:11:22:33:44:01")
+
+    def test_send_error_answers_pending_requests(self):
+        """Test une réponse 500, et non une requête bloquée, quand l'envoi lève une exception."""
+        with mock.patch.object(self.sender, 'send', side_effect=RuntimeError("panne")):
+            (status, payload), = self.call(('POST', '/wake', {'targets': ["NAS"]}))
+        self.assertEqual((status, payload), (500, {'error': "panne"}))
+        (status, _), = self.call(('POST', '/wake', {'targets': ["NAS"]}))
+        self.assertEqual(status, 200)
+
+    def test_wake_recorded_in_history(self):
+        """Test l'enregistrement des réveils dans l'historique avec l'adresse du client."""
+        recorded = []
+        self.server.history = mock.Mock(record=recorded.extend)
+        self.call(('POST', '/wake', {'targets': ["NAS"]}))
+        self.assertEqual([row[1:6] for row in recorded], [(self.nas.id, "NAS", self.nas.mac, 'api', "127.0.0.1")])
+
+    def test_start_error_reaches_caller(self):
+        """Test qu'une erreur au démarrage est levée tout de suite dans le thread appelant."""
+        server = WakeApiServer(self.store, self.sender, port=0)
+        with mock.patch.object(server, 'start', side_effect=RuntimeError("échec")):
+            started = time.perf_counter()
+            with self.assertRaisesRegex(RuntimeError, "échec"):
+                server.start_in_thread(timeout=5)
+        self.assertLess(time.perf_counter() - started, 1)
+
+    def test_routing_once_per_batch_and_groups_off_loop(self):
+        """Test les destinations résolues une fois par lot et les groupes lus hors de la boucle d'événements."""
+        routed = []
+        self.server.routing = lambda macs: routed.append(list(macs)) or {}
+        GroupStore(self.conn).add_members("rack", [self.store.by_name("rack-b-01").id])
+        threads = []
+
+        def resolve(store, names):
+            threads.append(threading.current_thread().name)
+            return resolve_targets(store, names)
+
+        with mock.patch('api.resolve_targets', resolve):
+            (_, wake), = self.call(('POST', '/wake', {'targets': ["@rack", "NAS"]}))
+        self.assertEqual([entry['name'] for entry in wake['results']], ["rack-b-01", "NAS"])
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], 'wake-api')
+        self.assertEqual(routed, [["00:11:22:33:44:02", "00:11:22:33:44:01"]])
+
+    def test_local_load(self):
+        """Test de charge local : réveils simultanés sur des connexions persistantes, envoyés par lots."""
+        connections, per_connection = 16, 250
+
+        async def client():
+            reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+            try:
+                for _ in range(per_connection):
+                    status, _ = await self.request(reader, writer, 'POST', '/wake', {'targets': ["NAS"]})
+                    self.assertEqual(status, 200)
+            finally:
+                writer.close()
+
+        async def run():
+            await asyncio.gather(*(client() for _ in range(connections)))
+
+        asyncio.run(run())
+        # Les requêtes simultanées sont regroupées en lots (le débit est mesuré par benchmark.py)
+        self.assertLess(self.server.batch_count, connections * per_connection)
+
+if __name__ == '__main__':
+    unittest.main()
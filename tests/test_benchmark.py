@@ -0,0 +1,25 @@
+import time
+import unittest
+import benchmark
+from wol import MagicPacketSender
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_sink_receives_packets(self):
+        """Test le récepteur UDP local qui remplace le réseau pendant les mesures."""
+        with benchmark.PacketSink() as sink:
+            with MagicPacketSender('127.0.0.1', sink.port) as sender:
+                sender.send([f"00:11:22:33:44:{i:02x}" for i in range(10)])
+            deadline = time.monotonic() + 2
+            while sink.received < 10 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self.assertEqual(sink.received, 10)
+
+    def test_compare_flags_regressions(self):
+        """Test la détection des mesures plus lentes que la référence au-delà de la tolérance."""
+        baseline = {'load_devices_1000': 0.010, 'cold_start': 0.200}
+        results = {'load_devices_1000': 0.014, 'cold_start': 0.350, 'new_metric': 1.0}
+        self.assertEqual(benchmark.compare(results, baseline, 0.5), [('cold_start', 0.350, 0.200)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import contextlib
+import io
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import unittest
+import cli
+from storage import migrate
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Budget de temps pour importer la ligne de commande dans un interpréteur neuf
+IMPORT_BUDGET_SECONDS = 0.1
+
+class TestCli(unittest.TestCase):
+
+    def setUp(self):
+        """Crée une base de données temporaire et un récepteur UDP local."""
+        fd, self.db_file = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        conn = sqlite3.connect(self.db_file)
+        migrate(conn)
+        conn.executemany('INSERT INTO devices (name, mac, ip, icon) VALUES (?, ?, ?, ?)', [
+            ("rack-b-01", "00:11:22:33:44:01", "10.0.0.1", None),
+            ("rack-b-02", "00:11:22:33:44:02", None, None),
+            ("NAS", "00-11-22-33-44-03", None, None),
+        ])
+        conn.commit()
+        conn.close()
+        self.sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sink.bind(("127.0.0.1", 0))
+        self.sink.settimeout(1)
+
+    def tearDown(self):
+        self.sink.close()
+        os.remove(self.db_file)
+
+    def run_cli(self, *argv):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(io.StringIO()):
+            code = cli.main(['--db', self.db_file, *argv])
+        return code, output.getvalue()
+
+    def test_resolve_targets(self):
+        """Test la résolution par nom, adresse MAC et motif glob."""
+        store = cli.load_devices(self.db_file)
+        targets, unmatched = cli.resolve_targets(store, ["rack-b-*", "NAS", "001122334403", "ff:ff:ff:ff:ff:fe", "x"])
+        self.assertEqual(targets, [("rack-b-01", "00:11:22:33:44:01"), ("rack-b-02", "00:11:22:33:44:02"),
+                                   ("NAS", "00-11-22-33-44-03"), (None, "ff:ff:ff:ff:ff:fe")])
+        self.assertEqual(unmatched, ["x"])
+
+    def test_wake_json(self):
+        """Test le réveil par motif glob avec une sortie JSON."""
+        code, output = self.run_cli('wake', 'rack-b-*', '--json', '--broadcast', '127.0.0.1',
+                                    '--port', str(self.sink.getsockname()[1]))
+        self.assertEqual(code, 0)
+        report = json.loads(output)
+        self.assertEqual([entry['name'] for entry in report['results']], ["rack-b-01", "rack-b-02"])
+        self.assertTrue(all(entry['ok'] for entry in report['results']))
+        self.assertEqual(len(self.sink.recv(1024)), 102)
+
+    def test_wake_unknown_target(self):
+        """Test le code de sortie quand aucune cible n'est trouvée."""
+        code, _ = self.run_cli('wake', 'unknown')
+        self.assertEqual(code, 2)
+
+    def test_relay_routes(self):
+        """Test l'ajout, la liste et la suppression d'un relais."""
+        self.assertEqual(self.run_cli('relay', 'add', '10.0.0.0/24', 'relais-a', '--key', 'secret')[0], 0)
+        code, output = self.run_cli('relay', 'list', '--json')
+        self.assertEqual(json.loads(output), [{'network': '10.0.0.0/24', 'host': 'relais-a', 'port': 9009}])
+        store = cli.open_store(self.db_file)
+        try:
+            target = store.targets(["00:11:22:33:44:01"])["00:11:22:33:44:01"]
+        finally:
+            store.conn.close()
+        self.assertEqual(target.relay, ('relais-a', 9009, 'secret'))
+        self.assertEqual(self.run_cli('relay', 'remove', '10.0.0.0/24')[0], 0)
+        self.assertEqual(self.run_cli('relay', 'remove', '10.0.0.0/24')[0], 2)
+
+    def test_import_time_budget(self):
+        """Test que la ligne de commande démarre vite et n'importe pas PyQt5."""
+        code = ("import sys, time; start = time.perf_counter(); import cli; "
+                "print(time.perf_counter() - start, 'PyQt5' in sys.modules)")
+        best = None
+        for _ in range(3):  # Garder la meilleure mesure pour limiter le bruit
+            output = subprocess.run([sys.executable, '-c', code], cwd=ROOT_DIR, capture_output=True,
+                                    text=True, check=True).stdout.split()
+            self.assertEqual(output[1], 'False')
+            best = min(best or float(output[0]), float(output[0]))
+        self.assertLess(best, IMPORT_BUDGET_SECONDS)
+
+if __name__ == '__main__':
+    unittest.main()
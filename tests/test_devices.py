@@ -0,0 +1,142 @@
+import sqlite3
+import threading
+import unittest
+from devices import Device, DeviceStore, SCHEMA_VERSION
+from targets import resolve_targets
+
+class TestDeviceStore(unittest.TestCase):
+
+    def setUp(self):
+        """Crée une base de données en mémoire pour chaque test."""
+        self.conn = sqlite3.connect(':memory:')
+        self.store = DeviceStore(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_lookups(self):
+        """Test la recherche par identifiant, nom et adresse MAC."""
+        device = self.store.add("NAS", "00:11:22:33:44:55", "", None)
+        self.assertIsInstance(device, Device)
+        self.assertIsNone(device.ip)
+        self.assertIs(self.store.get(device.id), device)
+        self.assertIs(self.store.by_name("NAS"), device)
+        self.assertIs(self.store.by_mac("00-11-22-33-44-55"), device)
+        self.assertIs(self.store.by_mac("0011.2233.4455"), device)
+        self.assertEqual(resolve_targets(self.store, ["0011.2233.4455"]), ([("NAS", "00:11:22:33:44:55")], []))
+        self.assertEqual(len(self.store), 1)
+
+    def test_duplicates_are_rejected(self):
+        """Test le refus des noms et adresses MAC en double."""
+        self.store.add("NAS", "00:11:22:33:44:55")
+        with self.assertRaises(ValueError):
+            self.store.add("NAS", "00:11:22:33:44:66")
+        with self.assertRaises(ValueError):
+            self.store.add("Other", "001122334455")
+        self.assertEqual(len(self.store), 1)
+
+    def test_remove_by_id(self):
+        """Test la suppression d'un seul périphérique par identifiant."""
+        first = self.store.add("PC 1", "00:11:22:33:44:01")
+        second = self.store.add("PC 2", "00:11:22:33:44:02")
+        self.assertIs(self.store.remove(first.id), first)
+        self.assertIsNone(self.store.by_name("PC 1"))
+        self.assertEqual([d.id for d in DeviceStore(self.conn)], [second.id])
+
+    def test_failed_remove_keeps_device(self):
+        """Test qu'une suppression refusée par la base laisse le périphérique en mémoire comme en base."""
+        device = self.store.add("PC", "00:11:22:33:44:01")
+        self.conn.execute("CREATE TEMP TRIGGER refuse BEFORE DELETE ON devices BEGIN SELECT RAISE(ABORT, 'refusé'); END")
+        with self.assertRaises(sqlite3.DatabaseError):
+            self.store.remove(device.id)
+        self.assertIs(self.store.by_mac("00:11:22:33:44:01"), device)
+        self.assertEqual([d.id for d in DeviceStore(self.conn)], [device.id])
+
+    def test_set_ips(self):
+        """Test le changement d'adresses IP en une transaction, identifiants inconnus ignorés."""
+        first = self.store.add("PC 1", "00:11:22:33:44:01", "10.0.0.1")
+        second = self.store.add("PC 2", "00:11:22:33:44:02")
+        self.store.set_ips({first.id: "", second.id: "10.0.0.2", 999: "10.0.0.9"})
+        self.assertIsNone(first.ip)
+        self.assertEqual(second.ip, "10.0.0.2")
+        self.assertEqual([d.ip for d in DeviceStore(self.conn)], [None, "10.0.0.2"])
+
+    def test_reads_during_reload(self):
+        """Test les lectures d'un autre thread (l'API HTTP) pendant que l'interface relit la liste."""
+        self.store.add_many([(f"pc-{i}", f"02:00:00:00:{i >> 8:02x}:{i & 255:02x}", None) for i in range(2000)])
+        macs = [device.mac for device in self.store]
+        errors = []
+        done = threading.Event()
+
+        def read():
+            try:
+                while not done.is_set():
+                    self.assertEqual(len(list(self.store)), 2000)
+                    self.assertEqual(len(self.store.packets(macs)), 2000)
+            except Exception as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=read)
+        thread.start()
+        for _ in range(20):
+            self.store.reload()
+        done.set()
+        thread.join()
+        self.assertEqual(errors, [])
+
+    def test_load_in_batches(self):
+        """Test le chargement progressif sans doublon des périphériques ajoutés entre deux lots."""
+        for i in range(5):
+            self.store.add(f"PC {i}", f"00:11:22:33:44:{i:02x}")
+        store = DeviceStore(self.conn, load=False)
+        self.assertEqual(len(store), 0)
+        self.assertEqual([d.name for d in store.load_batch(2)], ["PC 0", "PC 1"])
+        added = store.add("PC 5", "00:11:22:33:44:05")
+        self.assertEqual([d.name for d in store.load_batch(2)], ["PC 2", "PC 3"])
+        self.assertEqual([d.name for d in store.load_batch(2)], ["PC 4"])
+        self.assertEqual(store.load_batch(2), [])
+        self.assertIs(store.get(added.id), added)
+        self.assertEqual(len(store), 6)
+
+    def test_legacy_table_is_migrated(self):
+        """Test la migration de l'ancienne table sans clé primaire."""
+        conn = sqlite3.connect(':memory:')
+        conn.execute('CREATE TABLE devices (name TEXT, mac TEXT, ip TEXT, icon TEXT)')
+        conn.executemany('INSERT INTO devices VALUES (?, ?, ?, ?)', [
+            ("PC", "00:11:22:33:44:01", "", ""),
+            ("PC", "00:11:22:33:44:02", None, None),
+            ("Copy", "00-11-22-33-44-01", None, None),
+        ])
+        store = DeviceStore(conn)
+        self.assertEqual([d.name for d in store], ["PC", "PC (2)"])
+        self.assertEqual(conn.execute('PRAGMA user_version').fetchone()[0], SCHEMA_VERSION)
+        conn.close()
+
+    def test_mac_is_normalized_with_packet(self):
+        """Test la validation et la normalisation de l'adresse MAC, et le paquet précalculé avec SecureOn."""
+        device = self.store.add("NAS", "aa-bb-cc-dd-ee-ff", secureon="01:02:03:04:05:06")
+        self.assertEqual(device.mac, "AA:BB:CC:DD:EE:FF")
+        self.assertEqual(device.packet, b"\xff" * 6 + bytes.fromhex("aabbccddeeff") * 16 + bytes(range(1, 7)))
+        self.assertEqual(DeviceStore(self.conn).get(device.id).packet, device.packet)
+        self.assertEqual(self.store.packets(["aabbccddeeff"]), {"aabbccddeeff": device.packet})
+        self.assertNotIn('secureon', device.as_dict())
+        with self.assertRaises(ValueError):
+            self.store.add("Bad", "not-a-mac")
+        with self.assertRaises(ValueError):
+            self.store.add("Bad", "00:11:22:33:44:55", secureon="123")
+
+    def test_existing_macs_are_normalized(self):
+        """Test la normalisation des adresses MAC d'une base créée avant le paquet précalculé."""
+        conn = sqlite3.connect(':memory:')
+        conn.execute('CREATE TABLE devices (id INTEGER PRIMARY KEY, name TEXT NOT NULL, mac TEXT NOT NULL, '
+                     'ip TEXT, icon TEXT)')
+        conn.executemany('INSERT INTO devices (name, mac) VALUES (?, ?)', [("PC", "00-11-22-33-44-0a"), ("X", "??")])
+        conn.execute('PRAGMA user_version = 2')
+        store = DeviceStore(conn)
+        self.assertEqual(store.by_name("PC").mac, "00:11:22:33:44:0A")
+        self.assertEqual(len(store.by_name("PC").packet), 102)
+        self.assertIsNone(store.by_name("X").packet)
+        conn.close()
+
+if __name__ == '__main__':
+    unittest.main()
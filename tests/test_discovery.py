@@ -0,0 +1,137 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from devices import DeviceStore
+from discovery import (DiscoveredHost, add_discovered, diff_devices, discover, parse_arp_command, parse_network,
+                       parse_proc_arp, sweep)
+
+PROC_ARP = """IP address       HW type     Flags       HW address            Mask     Device
+10.0.0.1         0x1         0x2         00:11:22:33:44:01     *        eth0
+10.0.0.2         0x1         0x0         00:00:00:00:00:00     *        eth0
+10.0.0.3         0x1         0x2         aa:bb:cc:dd:ee:03     *        eth0
+10.0.1.4         0x1         0x2         00:11:22:33:44:04     *        eth0
+10.0.0.255       0x1         0x2         ff:ff:ff:ff:ff:ff     *        eth0
+"""
+
+class TestArpTable(unittest.TestCase):
+
+    def test_parse_proc_arp(self):
+        """Test la lecture des entrées résolues de /proc/net/arp (sans diffusion ni entrée incomplète)."""
+        self.assertEqual(parse_proc_arp(PROC_ARP), {'00:11:22:33:44:01': '10.0.0.1', 'AA:BB:CC:DD:EE:03': '10.0.0.3',
+                                                    '00:11:22:33:44:04': '10.0.1.4'})
+
+    def test_parse_arp_command(self):
+        """Test la lecture de `arp -a` sous macOS (octets sans zéro initial) et Windows."""
+        output = ("? (192.168.1.1) at 0:11:22:3:44:5 on en0 ifscope [ethernet]\n"
+                  "? (192.168.1.255) at ff:ff:ff:ff:ff:ff on en0 ifscope [ethernet]\n"
+                  "  192.168.1.20          aa-bb-cc-dd-ee-20     dynamic\n"
+                  "  224.0.0.22            01-00-5e-00-00-16     static\n")
+        self.assertEqual(parse_arp_command(output), {'00:11:22:03:44:05': '192.168.1.1',
+                                                     'AA:BB:CC:DD:EE:20': '192.168.1.20'})
+
+    def test_parse_network(self):
+        """Test le refus des sous-réseaux invalides ou trop grands."""
+        self.assertEqual(parse_network(" 192.168.1.17/22 ").num_addresses, 1024)
+        for network in ("10.0.0.0/8", "fe80::/64", "pas un réseau"):
+            with self.assertRaises(ValueError):
+                parse_network(network)
+
+
+class TestSweep(unittest.TestCase):
+
+    def test_sweep_is_parallel_and_bounded(self):
+        """Test le balayage d'un /22 en parallèle, avec un nombre limité de sondes simultanées."""
+        in_flight = [0, 0]
+
+        async def probe(ip):
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight[1], in_flight[0])
+            await asyncio.sleep(0.02)
+            in_flight[0] -= 1
+            return ip.endswith('.7')
+
+        start = time.perf_counter()
+        alive = asyncio.run(sweep('10.0.0.0/22', probe=probe, max_concurrency=128))
+        self.assertLess(time.perf_counter() - start, 2)
+        self.assertEqual(alive, {'10.0.0.7', '10.0.1.7', '10.0.2.7', '10.0.3.7'})
+        self.assertEqual(in_flight[1], 128)
+
+    def test_discover_filters_subnet(self):
+        """Test la découverte limitée au sous-réseau balayé, triée par adresse IP."""
+        fd, path = tempfile.mkstemp()
+        with os.fdopen(fd, 'w') as f:
+            f.write(PROC_ARP)
+
+        async def probe(ip):
+            return ip == '10.0.0.3'
+
+        try:
+            hosts = asyncio.run(discover('10.0.0.0/24', resolve=False, arp_path=path, probe=probe))
+            everything = asyncio.run(discover(resolve=False, arp_path=path))
+        finally:
+            os.remove(path)
+        self.assertEqual([(host.ip, host.alive) for host in hosts], [('10.0.0.1', False), ('10.0.0.3', True)])
+        self.assertEqual([host.ip for host in everything], ['10.0.0.1', '10.0.0.3', '10.0.1.4'])
+
+
+class TestDiscoveryDiff(unittest.TestCase):
+
+    def setUp(self):
+        """Crée une base de données en mémoire pour chaque test."""
+        self.conn = sqlite3.connect(':memory:')
+        self.store = DeviceStore(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_diff_and_bulk_insert(self):
+        """Test la comparaison avec les périphériques enregistrés puis l'ajout en une transaction."""
+        known = self.store.add("nas", "00:11:22:33:44:01", "10.0.0.1")
+        moved = self.store.add("pc", "00:11:22:33:44:02", "10.0.0.2")
+        hosts = [DiscoveredHost('10.0.0.1', '00:11:22:33:44:01', 'nas'),
+                 DiscoveredHost('10.0.0.20', '00:11:22:33:44:02', 'pc'),
+                 DiscoveredHost('10.0.0.30', '00:11:22:33:44:03', 'nas'),
+                 DiscoveredHost('10.0.0.31', '00:11:22:33:44:04')]
+        diff = diff_devices(self.store, hosts)
+        self.assertEqual([host.ip for host in diff.new], ['10.0.0.30', '10.0.0.31'])
+        self.assertEqual([(device.id, host.ip) for device, host in diff.moved], [(moved.id, '10.0.0.20')])
+        self.assertEqual(diff.known, [known])
+
+        changes = []
+        self.conn.set_trace_callback(changes.append)
+        devices = add_discovered(self.store, diff)
+        self.conn.set_trace_callback(None)
+        self.assertEqual([device.name for device in devices], ["nas-2", "host-10-0-0-31"])
+        self.assertEqual(sum(statement == 'BEGIN ' for statement in changes), 1)  # Ajouts et adresses IP ensemble
+        self.assertEqual(self.store.get(moved.id).ip, '10.0.0.20')
+        reloaded = DeviceStore(self.conn)
+        self.assertEqual(reloaded.by_mac("00:11:22:33:44:04").ip, '10.0.0.31')
+        self.assertEqual(reloaded.get(moved.id).ip, '10.0.0.20')
+        self.assertIsNotNone(reloaded.by_name("nas-2").packet)
+
+    def test_add_discovered_is_all_or_nothing(self):
+        """Test qu'un échec du changement d'adresse IP annule aussi les ajouts."""
+        moved = self.store.add("pc", "00:11:22:33:44:02", "10.0.0.2")
+        diff = diff_devices(self.store, [DiscoveredHost('10.0.0.20', '00:11:22:33:44:02'),
+                                         DiscoveredHost('10.0.0.30', '00:11:22:33:44:03')])
+        self.conn.execute("CREATE TEMP TRIGGER refuse_ip BEFORE UPDATE OF ip ON devices "
+                          "BEGIN SELECT RAISE(ABORT, 'refusé'); END")
+        with self.assertRaises(sqlite3.DatabaseError):
+            add_discovered(self.store, diff)
+        reloaded = DeviceStore(self.conn)
+        self.assertEqual(len(reloaded), 1)
+        self.assertEqual(reloaded.get(moved.id).ip, '10.0.0.2')
+        self.assertIsNone(self.store.by_mac('00:11:22:33:44:03'))
+
+    def test_add_many_is_all_or_nothing(self):
+        """Test qu'un doublon empêche tout l'ajout groupé."""
+        self.store.add("nas", "00:11:22:33:44:01")
+        with self.assertRaises(ValueError):
+            self.store.add_many([("a", "00:11:22:33:44:0a", None), ("b", "00:11:22:33:44:01", None)])
+        self.assertEqual(len(DeviceStore(self.conn)), 1)
+
+if __name__ == '__main__':
+    unittest.main()
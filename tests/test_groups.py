@@ -0,0 +1,74 @@
+import socket
+import sqlite3
+import time
+import unittest
+from targets import resolve_targets
+from devices import DeviceStore
+from groups import GroupStore
+from wol import MagicPacketSender, wake_in_waves
+
+class TestGroupStore(unittest.TestCase):
+
+    def setUp(self):
+        """Crée des périphériques et des groupes dans une base de données en mémoire."""
+        self.conn = sqlite3.connect(':memory:')
+        self.store = DeviceStore(self.conn)
+        self.devices = [self.store.add(f"rack-b-{i:02d}", f"00:11:22:33:44:{i:02x}") for i in range(4)]
+        self.nas = self.store.add("NAS", "00:11:22:33:55:01")
+        self.groups = GroupStore(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_membership_is_many_to_many(self):
+        """Test l'appartenance d'un périphérique à plusieurs groupes."""
+        self.groups.add_members("rack-b", [device.id for device in self.devices])
+        self.groups.add_members("stockage", [self.devices[0].id, self.nas.id])
+        self.assertEqual(self.groups.members("rack-b"), [device.id for device in self.devices])
+        self.assertEqual(self.groups.groups_of(self.devices[0].id), ["rack-b", "stockage"])
+        self.assertEqual([(name, count) for _, name, count in self.groups.groups()], [("rack-b", 4), ("stockage", 2)])
+        self.groups.remove_members("rack-b", [self.devices[3].id])
+        self.store.remove(self.devices[0].id)  # Les appartenances du périphérique supprimé disparaissent
+        self.assertEqual(self.groups.members("rack-b"), [self.devices[1].id, self.devices[2].id])
+        self.assertEqual(self.groups.members("stockage"), [self.nas.id])
+        self.assertTrue(self.groups.delete_group("stockage"))
+        self.assertEqual(self.groups.members("stockage"), [])
+
+    def test_group_resolution_uses_indexes(self):
+        """Test que la résolution d'un groupe est une seule requête qui ne parcourt aucune table."""
+        plan = self.conn.execute('''EXPLAIN QUERY PLAN SELECT m.device_id FROM groups g
+                                    JOIN group_members m ON m.group_id = g.id WHERE g.name = ?''', ("x",)).fetchall()
+        self.assertFalse([row for row in plan if 'SCAN' in row[-1]], plan)
+
+    def test_tags_and_targets(self):
+        """Test les étiquettes et la résolution de « @groupe » et « tag:étiquette »."""
+        self.groups.add_members("rack-b", [self.devices[1].id, self.devices[2].id])
+        self.groups.tag([self.nas.id, self.devices[1].id], "salle-serveurs")
+        self.assertEqual(self.groups.tags_of(self.nas.id), ["salle-serveurs"])
+        targets, unmatched = resolve_targets(self.store, ["@rack-b", "tag:salle-serveurs", "@inconnu"])
+        self.assertEqual([name for name, _ in targets], ["rack-b-01", "rack-b-02", "NAS"])
+        self.assertEqual(unmatched, ["@inconnu"])
+        self.groups.untag([self.nas.id], "salle-serveurs")
+        self.assertEqual(self.groups.tagged("salle-serveurs"), [self.devices[1].id])
+
+
+class TestWakeInWaves(unittest.TestCase):
+
+    def test_waves_are_spaced(self):
+        """Test l'envoi par vagues limitées et espacées, avec un résultat par membre au fil de l'eau."""
+        sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sink.bind(("127.0.0.1", 0))
+        received = []
+        macs = [f"00:11:22:33:44:{i:02x}" for i in range(5)]
+        start = time.perf_counter()
+        with MagicPacketSender("127.0.0.1", sink.getsockname()[1]) as sender:
+            results = wake_in_waves(macs, wave_size=2, wave_delay=0.05, sender=sender,
+                                    on_result=lambda result: received.append((result.mac, time.perf_counter())))
+        sink.close()
+        self.assertGreaterEqual(time.perf_counter() - start, 0.1)  # Trois vagues, deux pauses
+        self.assertTrue(all(result.ok for result in results.values()))
+        self.assertEqual([mac for mac, _ in received], macs)
+        self.assertGreaterEqual(received[2][1] - received[1][1], 0.05)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+import unittest
+from PyQt5.QtWidgets import QApplication
+import cli
+from devices import DeviceStore
+from history import UP_WINDOW, HistoryStore, HistoryWriter, events_from_results, retention_settings
+from models import HistoryModel
+from storage import connect
+from wol import WakeResult
+
+
+class TestHistory(unittest.TestCase):
+
+    def setUp(self):
+        """Crée une base de données temporaire avec deux périphériques."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmp.name, 'test.db')
+        self.conn = connect(self.db_file)
+        self.store = DeviceStore(self.conn)
+        self.nas = self.store.add("NAS", "00:11:22:33:44:01", "10.0.0.1")
+        self.pc = self.store.add("PC", "00:11:22:33:44:02")
+        self.history = HistoryStore(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def wake_rows(self, count, now=1000.0):
+        return [(now + i, self.nas.id, "NAS", self.nas.mac, 'gui', "alice", 1, None) for i in range(count)]
+
+    def test_events_from_results(self):
+        """Test les lignes d'historique : périphérique connu, adresse inconnue, échec et réveil non envoyé."""
+        results = {self.nas.mac: WakeResult(self.nas.mac, sent=1),
+                   "aa:bb:cc:dd:ee:ff": WakeResult("aa:bb:cc:dd:ee:ff", sent=1),
+                   self.pc.mac: WakeResult(self.pc.mac, error="Réseau inaccessible"),
+                   "00:00:00:00:00:01": WakeResult("00:00:00:00:00:01")}
+        rows = events_from_results(self.store, results, 'api', "10.0.0.9", now=50.0)
+        self.assertEqual(rows, [(50.0, self.nas.id, "NAS", self.nas.mac, 'api', "10.0.0.9", 1, None),
+                                (50.0, None, None, "aa:bb:cc:dd:ee:ff", 'api', "10.0.0.9", 1, None),
+                                (50.0, self.pc.id, "PC", self.pc.mac, 'api', "10.0.0.9", 0, "Réseau inaccessible")])
+
+    def test_keyset_pages(self):
+        """Test la lecture par pages, du plus récent au plus ancien, et le filtre par périphérique."""
+        self.history.append(self.wake_rows(5) + [(2000.0, self.pc.id, "PC", self.pc.mac, 'cli', None, 0, "x")])
+        first = self.history.page(limit=4)
+        self.assertEqual([event.name for event in first], ["PC", "NAS", "NAS", "NAS"])
+        second = self.history.page(first[-1].id, limit=4)
+        self.assertEqual([event.ts for event in second], [1001.0, 1000.0])
+        self.assertEqual([event.error for event in self.history.page(device_id=self.pc.id)], ["x"])
+        self.assertEqual(self.history.count(), 6)
+
+    def test_mark_up_latest_wake_only(self):
+        """Test la réponse notée sur le dernier réveil du périphérique, et seulement s'il est récent."""
+        self.history.append(self.wake_rows(2))
+        self.history.mark_up([(self.nas.id, 1031.0)])
+        latest, previous = self.history.page()
+        self.assertEqual(latest.up_after, 30.0)
+        self.assertIsNone(previous.up_at)
+        self.history.mark_up([(self.nas.id, 1040.0)])  # Réponse déjà notée : inchangée
+        self.assertEqual(self.history.page()[0].up_at, 1031.0)
+        self.history.append(self.wake_rows(1, now=5000.0))
+        self.history.mark_up([(self.nas.id, 5000.0 + UP_WINDOW + 1)])
+        self.assertIsNone(self.history.page()[0].up_at)
+
+    def test_compact_by_rows_and_age(self):
+        """Test la rétention par nombre de lignes puis par ancienneté, par passes limitées."""
+        now = 1000.0 + 100 * 86400
+        self.history.append(self.wake_rows(30) + [(now - i, self.pc.id, "PC", self.pc.mac, 'gui', None, 1, None)
+                                                  for i in range(20)])
+        self.assertEqual(self.history.compact(retention_days=90, max_rows=40, chunk=4, now=now), 4)
+        self.assertEqual(self.history.compact(retention_days=90, max_rows=40, chunk=100, now=now), 26)
+        self.assertEqual(self.history.count(), 20)
+        self.assertEqual({event.name for event in self.history.page(limit=100)}, {"PC"})
+        self.assertEqual(self.history.compact(retention_days=90, max_rows=10, chunk=100, now=now), 10)
+        self.assertEqual(self.history.compact(now=now), 0)
+
+    def test_retention_settings(self):
+        """Test les limites par défaut puis celles des paramètres de l'interface."""
+        self.assertEqual(retention_settings(self.conn), (90, 1_000_000))
+        with self.conn:
+            self.conn.execute('UPDATE settings SET history_retention_days = 7, history_max_rows = 500')
+        self.assertEqual(tuple(retention_settings(self.conn)), (7, 500))
+
+    def test_writer_batches_events(self):
+        """Test l'écriture groupée depuis le thread de l'historique, puis l'arrêt qui écrit le reste."""
+        writer = HistoryWriter(self.db_file, flush_interval=0.05)
+        writer.start()
+        try:
+            for row in self.wake_rows(50, now=time.time() - 100):
+                writer.record([row])
+            writer.mark_up([(self.nas.id, time.time())])
+            writer.flush()
+            self.assertEqual(self.history.count(), 50)
+            self.assertIsNotNone(self.history.page()[0].up_at)
+            writer.record(self.wake_rows(3, now=time.time()))
+        finally:
+            writer.stop()
+        self.assertEqual(self.history.count(), 53)
+
+    def test_writer_retention_change(self):
+        """Test les nouvelles limites de rétention appliquées par le thread de l'historique."""
+        writer = HistoryWriter(self.db_file, flush_interval=0.01)
+        writer.start()
+        try:
+            writer.record(self.wake_rows(10, now=time.time() - 100))
+            writer.flush()
+            self.assertEqual(self.history.count(), 10)
+            writer.set_retention(90, 3)
+            writer.flush()
+            self.assertEqual((writer.retention_days, writer.max_rows), (90, 3))
+        finally:
+            writer.stop()
+        self.assertEqual(self.history.count(), 3)
+
+    def test_model_fetches_pages(self):
+        """Test le chargement progressif du modèle de la vue d'historique."""
+        QApplication.instance() or QApplication([])
+        self.history.append(self.wake_rows(5))
+        model = HistoryModel(self.history, page_size=2)
+        self.assertEqual(model.rowCount(), 0)
+        while model.canFetchMore():
+            model.fetchMore()
+        self.assertEqual(model.rowCount(), 5)
+        self.assertEqual(model.event_at(0).ts, 1004.0)
+        self.assertEqual(model.index(0, 3).data(), "interface")
+        self.history.append(self.wake_rows(1, now=3000.0))
+        model.refresh()
+        model.fetchMore()
+        self.assertEqual(model.event_at(0).ts, 3000.0)
+
+    def test_cli_history(self):
+        """Test l'affichage de l'historique en ligne de commande."""
+        self.history.append(self.wake_rows(3) + [(2000.0, self.pc.id, "PC", self.pc.mac, 'cli', "bob", 1, None)])
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            code = cli.main(['--db', self.db_file, 'history', '--device', "NAS", '--limit', '2', '--json'])
+        self.assertEqual(code, 0)
+        self.assertEqual([event['ts'] for event in json.loads(output.getvalue())], [1002.0, 1001.0])
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            self.assertEqual(cli.main(['--db', self.db_file, 'history', '--device', "inconnu"]), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import os
+import shutil
+import tempfile
+import unittest
+from PyQt5.QtGui import QColor
+from PyQt5.QtWidgets import QApplication
+from icons import IconService
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class TestIconService(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Initialise l'application pour les tests."""
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        """Copie une icône SVG dans un dossier temporaire."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.svg_path = os.path.join(self.temp_dir.name, "parameters.svg")
+        shutil.copy(os.path.join(ROOT_DIR, "assets/interface/parameters.svg"), self.svg_path)
+        self.service = IconService()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_icons_are_memoized(self):
+        """Test qu'une même icône teintée n'est rendue qu'une fois."""
+        icon = self.service.tinted_icon(self.svg_path, "#4CAF50", 16, 1.0)
+        self.assertIs(self.service.tinted_icon(self.svg_path, "#4caf50", 16, 1.0), icon)
+        self.assertIsNot(self.service.tinted_icon(self.svg_path, "#FF5733", 16, 1.0), icon)
+
+    def test_render_is_tinted_at_device_pixel_ratio(self):
+        """Test le rendu à la densité de pixels de l'écran avec la couleur demandée."""
+        icon = self.service.tinted_icon(self.svg_path, "#FF5733", 16, 2.0)
+        image = icon.pixmap(32, 32).toImage()
+        self.assertEqual((image.width(), image.height()), (32, 32))
+        colors = {QColor(image.pixel(x, y)).name() for x in range(32) for y in range(32)
+                  if QColor.fromRgba(image.pixel(x, y)).alpha() == 255}
+        self.assertEqual(colors, {"#ff5733"})
+
+    def test_modified_asset_invalidates_cache(self):
+        """Test qu'un fichier SVG modifié est rendu à nouveau."""
+        icon = self.service.tinted_icon(self.svg_path, "#4CAF50", 16, 1.0)
+        stat = os.stat(self.svg_path)
+        os.utime(self.svg_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertIsNot(self.service.tinted_icon(self.svg_path, "#4CAF50", 16, 1.0), icon)
+
+if __name__ == '__main__':
+    unittest.main()
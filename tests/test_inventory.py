@@ -0,0 +1,89 @@
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from devices import DeviceStore
+from inventory import export_devices, import_devices
+
+class TestInventory(unittest.TestCase):
+
+    def setUp(self):
+        """Crée une base de données en mémoire et un dossier temporaire."""
+        self.conn = sqlite3.connect(':memory:')
+        self.store = DeviceStore(self.conn)
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.conn.close()
+        self.temp_dir.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_csv_import_upserts_by_mac(self):
+        """Test l'import CSV avec mise à jour des adresses MAC connues."""
+        existing = self.store.add("old-name", "00-11-22-33-44-01", "10.0.0.1")
+        path = self.write("devices.csv", "name,mac,ip\nrack-b-01,00:11:22:33:44:01,\n"
+                                         "rack-b-02,001122334402,10.0.0.2\nbad,not-a-mac,\n")
+        summary = import_devices(self.store, path)
+        self.assertEqual((summary.inserted, summary.updated, summary.skipped), (1, 1, 1))
+        self.assertEqual(summary.errors[0][0], 4)
+        device = self.store.get(existing.id)
+        self.assertEqual((device.name, device.mac, device.ip), ("rack-b-01", "00:11:22:33:44:01", "10.0.0.1"))
+        self.assertEqual(self.store.by_name("rack-b-02").mac, "00:11:22:33:44:02")
+
+    def test_rename_frees_name_for_new_device(self):
+        """Test un import qui renomme un périphérique et donne son ancien nom à un nouveau."""
+        existing = self.store.add("NAS", "00:11:22:33:44:01")
+        path = self.write("devices.csv", "name,mac\nNAS-old,00:11:22:33:44:01\nNAS,00:11:22:33:44:02\n")
+        summary = import_devices(self.store, path)
+        self.assertEqual((summary.inserted, summary.updated, summary.skipped), (1, 1, 0))
+        self.assertEqual(self.store.get(existing.id).name, "NAS-old")
+        self.assertEqual(self.store.by_name("NAS").mac, "00:11:22:33:44:02")
+
+    def test_export_refuses_read_only_format(self):
+        """Test le refus d'exporter en baux DHCP sans créer ni vider le fichier."""
+        path = self.write("dhcp.leases", "contenu\n")
+        with self.assertRaises(ValueError):
+            export_devices(self.store, path)
+        with open(path, encoding='utf-8') as f:
+            self.assertEqual(f.read(), "contenu\n")
+
+    def test_ethers_and_leases(self):
+        """Test l'import des formats /etc/ethers et baux DHCP."""
+        ethers = self.write("ethers", "# commentaire\n00:11:22:33:44:01 pc-1\n00:11:22:33:44:02 pc-2\n")
+        leases = self.write("dnsmasq.leases", "1700000000 00:11:22:33:44:02 10.0.0.2 pc-2 *\n"
+                                              "1700000000 00:11:22:33:44:03 10.0.0.3 * *\n")
+        self.assertEqual(import_devices(self.store, ethers).inserted, 2)
+        summary = import_devices(self.store, leases)
+        self.assertEqual((summary.inserted, summary.updated), (1, 1))
+        self.assertEqual(self.store.by_name("pc-2").ip, "10.0.0.2")
+        self.assertEqual(self.store.by_mac("00:11:22:33:44:03").name, "00:11:22:33:44:03")
+
+    def test_duplicates_in_file_are_skipped(self):
+        """Test qu'un nom ou une adresse MAC en double dans le fichier est ignoré."""
+        path = self.write("devices.jsonl", '{"name": "a", "mac": "00:11:22:33:44:01"}\n'
+                                           '{"name": "a", "mac": "00:11:22:33:44:02"}\n'
+                                           '{"name": "b", "mac": "00:11:22:33:44:01"}\n{broken\n')
+        summary = import_devices(self.store, path)
+        self.assertEqual((summary.inserted, summary.skipped), (1, 3))
+        self.assertEqual(len(self.store), 1)
+
+    def test_large_import_and_export_round_trip(self):
+        """Test l'import de 2 000 périphériques en une transaction puis l'export JSON."""
+        rows = "\n".join(f"pc-{i},00:11:22:{i >> 16 & 255:02x}:{i >> 8 & 255:02x}:{i & 255:02x}"
+                         for i in range(2000))
+        summary = import_devices(self.store, self.write("big.csv", "name,mac\n" + rows))
+        self.assertEqual(summary.inserted, 2000)
+        self.assertEqual(len(self.store), 2000)
+        path = os.path.join(self.temp_dir.name, "export.json")
+        self.assertEqual(export_devices(self.store, path), 2000)
+        with open(path, encoding='utf-8') as f:
+            self.assertEqual(len(json.load(f)), 2000)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+import unittest
+import metrics as metrics_module
+from metrics import Metrics
+
+class TestMetrics(unittest.TestCase):
+
+    def test_disabled_is_noop(self):
+        """Test qu'aucune valeur n'est enregistrée quand les mesures sont désactivées."""
+        registry = Metrics(enabled=False)
+        registry.inc('wol_packets_sent_total')
+        registry.observe('wol_send_seconds', 0.5)
+        with registry.span('db_write_seconds'):
+            pass
+        self.assertEqual(registry.snapshot(), {'counters': {}, 'histograms': {}, 'slow_operations': []})
+
+    def test_counters_and_histograms(self):
+        """Test les compteurs, les intervalles chronométrés et les percentiles."""
+        registry = Metrics(enabled=True)
+        registry.inc('wol_packets_sent_total', 3)
+        registry.inc('wol_packets_sent_total')
+        for value in range(1, 101):
+            registry.observe('wake_latency_seconds', value / 1000)
+        with registry.span('db_write_seconds'):
+            pass
+
+        @registry.timed('import_seconds')
+        def work():
+            return 42
+
+        self.assertEqual(work(), 42)
+        snapshot = registry.snapshot()
+        self.assertEqual(snapshot['counters'], {'wol_packets_sent_total': 4})
+        self.assertEqual(snapshot['histograms']['wake_latency_seconds']['count'], 100)
+        self.assertEqual(snapshot['histograms']['db_write_seconds']['count'], 1)
+        self.assertEqual(snapshot['histograms']['import_seconds']['count'], 1)
+        self.assertAlmostEqual(registry.percentile('wake_latency_seconds', 0.5), 0.051)
+        self.assertAlmostEqual(registry.percentile('wake_latency_seconds', 0.99), 0.1)
+        self.assertIsNone(registry.percentile('inconnu', 0.5))
+
+    def test_slow_operations(self):
+        """Test le relevé des opérations plus lentes que le seuil."""
+        registry = Metrics(enabled=True)
+        registry.observe('list_rebuild_seconds', metrics_module.SLOW_THRESHOLD_SECONDS / 10)
+        registry.observe('db_load_devices_seconds', metrics_module.SLOW_THRESHOLD_SECONDS * 2)
+        slow = registry.snapshot()['slow_operations']
+        self.assertEqual([entry['name'] for entry in slow], ['db_load_devices_seconds'])
+        registry.reset()
+        self.assertEqual(registry.snapshot()['slow_operations'], [])
+
+    def test_export(self):
+        """Test l'export au format Prometheus et en JSON."""
+        registry = Metrics(enabled=True)
+        registry.inc('wol_packets_sent_total', 2)
+        registry.observe('wol_send_seconds', 0.003)
+        text = registry.to_prometheus()
+        self.assertIn("# TYPE sc_pywol_wol_packets_sent_total counter\nsc_pywol_wol_packets_sent_total 2", text)
+        self.assertIn('sc_pywol_wol_send_seconds_bucket{le="0.001"} 0', text)
+        self.assertIn('sc_pywol_wol_send_seconds_bucket{le="0.005"} 1', text)
+        self.assertIn('sc_pywol_wol_send_seconds_bucket{le="+Inf"} 1', text)
+        self.assertIn('sc_pywol_wol_send_seconds_count 1', text)
+
+        with tempfile.TemporaryDirectory() as workdir:
+            json_path = os.path.join(workdir, 'metrics.json')
+            registry.export(json_path)
+            with open(json_path, encoding='utf-8') as f:
+                self.assertEqual(json.load(f)['counters'], {'wol_packets_sent_total': 2})
+            prom_path = os.path.join(workdir, 'metrics.prom')
+            registry.export(prom_path)
+            with open(prom_path, encoding='utf-8') as f:
+                self.assertEqual(f.read(), text)
+            self.assertEqual(sorted(os.listdir(workdir)), ['metrics.json', 'metrics.prom'])
+
+if __name__ == '__main__':
+    unittest.main()
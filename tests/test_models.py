@@ -0,0 +1,64 @@
+import sqlite3
+import unittest
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication
+from devices import DeviceStore
+from models import DeviceIdRole, DeviceListModel, WakeStatusRole
+
+class TestDeviceListModel(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Initialise l'application pour les tests."""
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        """Crée un modèle sur une base de données en mémoire."""
+        self.conn = sqlite3.connect(':memory:')
+        self.store = DeviceStore(self.conn)
+        self.store.add("PC 1", "00:11:22:33:44:01")
+        self.model = DeviceListModel(self.store, text_size=12)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_add_device_inserts_one_row(self):
+        """Test l'insertion d'une seule ligne sans réinitialiser le modèle."""
+        inserted = []
+        resets = []
+        self.model.rowsInserted.connect(lambda parent, first, last: inserted.append((first, last)))
+        self.model.modelReset.connect(lambda: resets.append(True))
+        index = self.model.add_device(self.store.add("PC 2", "00:11:22:33:44:02"))
+        self.assertEqual(inserted, [(1, 1)])
+        self.assertEqual(resets, [])
+        self.assertEqual(index.data(Qt.DisplayRole), "PC 2 (00:11:22:33:44:02)")
+
+    def test_remove_rows_deletes_device(self):
+        """Test la suppression d'une ligne et du périphérique associé."""
+        device_id = self.model.index(0).data(DeviceIdRole)
+        self.assertTrue(self.model.removeRows(0, 1))
+        self.assertEqual(self.model.rowCount(), 0)
+        self.assertIsNone(self.store.get(device_id))
+
+    def test_text_size_restyles_without_reset(self):
+        """Test le changement de taille du texte sans recharger les lignes."""
+        self.model.set_text_size(20)
+        index = self.model.index(0)
+        self.assertEqual(index.data(Qt.FontRole).pointSize(), 20)
+        self.assertEqual(index.data(Qt.SizeHintRole).height(), 60)
+
+    def test_wake_status_updates_one_row(self):
+        """Test l'affichage de l'état d'un réveil sur la seule ligne concernée."""
+        self.model.add_device(self.store.add("PC 2", "00:11:22:33:44:02"))
+        changed = []
+        self.model.dataChanged.connect(lambda top_left, bottom_right, roles: changed.append(top_left.row()))
+        device_id = self.model.index(1).data(DeviceIdRole)
+        self.model.set_wake_status([device_id], 'sent')
+        self.assertEqual(changed, [1])
+        self.assertEqual(self.model.index(1).data(WakeStatusRole), 'sent')
+        self.assertEqual(self.model.index(1).data(Qt.DisplayRole), "PC 2 (00:11:22:33:44:02) — paquet envoyé")
+        self.model.set_wake_status([device_id], None)
+        self.assertIsNone(self.model.index(1).data(WakeStatusRole))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import sqlite3
+import threading
+import time
+import unittest
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication
+from devices import Device, DeviceStore
+from models import DeviceListModel, LastSeenRole, PresenceRole
+from presence import MAX_INTERVAL, MIN_INTERVAL, OFFLINE, ONLINE, UNKNOWN, PresenceMonitor
+
+class TestPresenceMonitor(unittest.TestCase):
+
+    def test_adaptive_intervals(self):
+        """Test l'intervalle court après un changement ou un réveil, puis doublé tant que l'état est stable."""
+        now = [1000.0]
+        monitor = PresenceMonitor(on_changes=None, clock=lambda: now[0])
+        monitor.watch([Device(1, "NAS", "00:11:22:33:44:01", "10.0.0.1"), Device(2, "PC", "00:11:22:33:44:02")])
+        self.assertEqual(monitor.states[2].status, UNKNOWN)
+        self.assertEqual(monitor.take_changes(), {})  # Rien à signaler pour un périphérique sans adresse IP
+
+        self.assertEqual(monitor.record(1, False), MIN_INTERVAL)
+        self.assertEqual(monitor.take_changes(), {1: (OFFLINE, None)})
+        self.assertEqual([monitor.record(1, False) for _ in range(3)], [MIN_INTERVAL * 2, MIN_INTERVAL * 4,
+                                                                       MIN_INTERVAL * 8])
+        self.assertEqual(monitor.take_changes(), {})  # État stable : aucun changement
+        for _ in range(20):
+            monitor.record(1, False)
+        self.assertEqual(monitor.states[1].interval, MAX_INTERVAL)
+
+        monitor.notify_wake([1])
+        self.assertEqual(monitor._due[1], now[0] + MIN_INTERVAL)
+        now[0] += 10
+        self.assertEqual(monitor.record(1, False), MIN_INTERVAL)  # Surveillance rapprochée après un réveil
+        self.assertEqual(monitor.record(1, True), MIN_INTERVAL)
+        self.assertEqual(monitor.take_changes(), {1: (ONLINE, now[0])})
+        self.assertIsNone(monitor.record(2, True))  # Non sondé
+
+    def test_batched_changes(self):
+        """Test la surveillance en arrière-plan avec des changements regroupés en peu d'appels."""
+        batches = []
+        done = threading.Event()
+
+        def on_changes(changes):
+            batches.append(changes)
+            if sum(len(batch) for batch in batches) >= 500:
+                done.set()
+
+        async def probe(ip):
+            return int(ip.rsplit('.', 1)[1]) % 2 == 0
+
+        monitor = PresenceMonitor(on_changes, probe=probe, max_concurrency=16, flush_interval=0.2)
+        monitor.start_in_thread()
+        try:
+            monitor.watch([Device(i, f"host-{i}", f"02:00:00:00:{i >> 8:02x}:{i & 255:02x}", f"10.0.{i >> 8}.{i & 255}")
+                           for i in range(500)])
+            self.assertTrue(done.wait(5))
+        finally:
+            monitor.stop()
+        changes = {}
+        for batch in batches:
+            changes.update(batch)
+        self.assertEqual(len(changes), 500)
+        self.assertEqual(changes[3][0], OFFLINE)
+        self.assertEqual(changes[4][0], ONLINE)
+        self.assertIsNotNone(changes[4][1])
+        self.assertLess(len(batches), 20)
+
+
+class TestPresenceModel(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Initialise l'application pour les tests."""
+        cls.app = QApplication.instance() or QApplication([])
+
+    def test_set_presence_emits_one_signal(self):
+        """Test l'application d'un lot de changements de présence en un seul signal."""
+        conn = sqlite3.connect(':memory:')
+        store = DeviceStore(conn)
+        for i in range(10):
+            store.add(f"PC {i}", f"00:11:22:33:44:{i:02x}", f"10.0.0.{i}")
+        model = DeviceListModel(store)
+        changed = []
+        model.dataChanged.connect(lambda top, bottom, roles: changed.append((top.row(), bottom.row())))
+        seen = time.time()
+        ids = [model.device_id_at(row) for row in range(10)]
+        model.set_presence({ids[2]: (ONLINE, seen), ids[7]: (OFFLINE, None), 999: (ONLINE, seen)})
+        self.assertEqual(changed, [(2, 7)])
+        self.assertEqual(model.index(2).data(PresenceRole), ONLINE)
+        self.assertEqual(model.index(2).data(LastSeenRole), seen)
+        self.assertEqual(model.index(7).data(PresenceRole), OFFLINE)
+        self.assertEqual(model.index(0).data(PresenceRole), UNKNOWN)
+        self.assertIn("dernière réponse", model.index(2).data(Qt.ToolTipRole))
+        model.clear_presence()
+        self.assertEqual(model.index(2).data(PresenceRole), UNKNOWN)
+        conn.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import socket
+import time
+import unittest
+from unittest import mock
+from devices import DeviceStore, connect
+from relay import MAX_SKEW, RelayError, RelayRoutes, RelayServer, build_request, parse_request
+from wol import MagicPacketSender, build_magic_packet
+
+MAC = bytes.fromhex("001122334455")
+SECUREON = bytes.fromhex("010203040506")
+
+
+class TestRelayProtocol(unittest.TestCase):
+
+    def test_round_trip(self):
+        """Test la lecture d'une demande signée."""
+        request = build_request("secret", [(MAC, b""), (MAC, SECUREON)], nonce=b"12345678")
+        nonce, entries = parse_request("secret", request)
+        self.assertEqual(nonce, b"12345678")
+        self.assertEqual(entries, [(MAC, b""), (MAC, SECUREON)])
+
+    def test_rejects_bad_requests(self):
+        """Test le refus d'une demande mal signée, modifiée, périmée ou tronquée."""
+        request = build_request("secret", [(MAC, b"")])
+        with self.assertRaises(RelayError):
+            parse_request("autre", request)
+        with self.assertRaises(RelayError):
+            parse_request("secret", request[:-33] + b"\x01" + request[-32:])
+        with self.assertRaises(RelayError):
+            parse_request("secret", build_request("secret", [(MAC, b"")], now=time.time() - 2 * MAX_SKEW))
+        with self.assertRaises(RelayError):
+            parse_request("secret", request[:10])
+
+
+class TestRelayServer(unittest.TestCase):
+
+    def setUp(self):
+        """Ouvre un récepteur UDP local qui remplace le segment du relais."""
+        self.sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sink.bind(("127.0.0.1", 0))
+        self.sink.settimeout(1)
+        self.relay_sender = MagicPacketSender("127.0.0.1", self.sink.getsockname()[1])
+        self.server = RelayServer("secret", self.relay_sender, host="127.0.0.1", port=0)
+
+    def tearDown(self):
+        self.server.stop()
+        self.relay_sender.close()
+        self.sink.close()
+
+    def test_handle_rejects_replay(self):
+        """Test la réémission d'une demande puis le refus de la même demande rejouée."""
+        request = build_request("secret", [(MAC, SECUREON)])
+        results = self.server.handle(request)
+        self.assertTrue(results["00:11:22:33:44:55"].ok)
+        self.assertEqual(self.sink.recv(1024), build_magic_packet(MAC, SECUREON))
+        with self.assertRaises(RelayError):
+            self.server.handle(request)
+        self.assertEqual((self.server.relayed, self.server.rejected), (1, 1))
+
+    def test_sender_goes_through_relay(self):
+        """Test le réveil d'un périphérique d'un sous-réseau distant par son relais."""
+        port = self.server.start_in_thread()
+        conn = connect(":memory:")
+        try:
+            store = DeviceStore(conn)
+            store.add("Distant", "00:11:22:33:44:55", "10.20.5.7", secureon="01:02:03:04:05:06")
+            store.add("Sans IP", "66:77:88:99:AA:BB")
+            RelayRoutes(conn).add("10.20.0.0/16", "127.0.0.1", port, "secret")
+            macs = ["00:11:22:33:44:55", "66:77:88:99:AA:BB"]
+            targets = store.targets(macs)
+            self.assertEqual(list(targets), ["00:11:22:33:44:55"])
+            self.assertEqual(targets["00:11:22:33:44:55"].relay, ("127.0.0.1", port, "secret"))
+            with MagicPacketSender("127.0.0.1", self.sink.getsockname()[1]) as sender:
+                results = sender.send(macs, packets=store.packets(macs), targets=targets)
+            self.assertTrue(all(result.ok for result in results.values()))
+            received = {self.sink.recv(1024), self.sink.recv(1024)}
+            self.assertEqual(received, {build_magic_packet(MAC, SECUREON), build_magic_packet("66:77:88:99:AA:BB")})
+        finally:
+            conn.close()
+
+    def test_start_error_reaches_caller(self):
+        """Test qu'une erreur au démarrage du relais est levée tout de suite dans le thread appelant."""
+        server = RelayServer("secret", port=0)
+        with mock.patch.object(server, 'start', side_effect=RuntimeError("échec")):
+            started = time.perf_counter()
+            with self.assertRaisesRegex(RuntimeError, "échec"):
+                server.start_in_thread(timeout=5)
+        self.assertLess(time.perf_counter() - started, 1)
+
+    def test_routes(self):
+        """Test l'enregistrement, le remplacement et la suppression des relais."""
+        conn = connect(":memory:")
+        try:
+            DeviceStore(conn)
+            routes = RelayRoutes(conn)
+            self.assertEqual(routes.add("10.20.1.0/16", "relais-b", 9009, "secret"), "10.20.0.0/16")
+            routes.add("10.20.0.0/16", "relais-c", 9010, "secret")
+            routes.add("10.20.30.0/24", "relais-d", 9009, "secret")
+            self.assertEqual(routes.all(), [("10.20.0.0/16", "relais-c", 9010), ("10.20.30.0/24", "relais-d", 9009)])
+            self.assertEqual(routes.table()[0][2][0], "relais-d")  # Préfixe le plus long d'abord
+            self.assertTrue(routes.remove("10.20.0.0/16"))
+            self.assertFalse(routes.remove("10.20.0.0/16"))
+            with self.assertRaises(ValueError):
+                routes.add("pas un réseau", "relais-b", 9009, "secret")
+        finally:
+            conn.close()
+
+    def test_device_store_caches_relay_table(self):
+        """Test les routes gardées en mémoire, relues après une modification ou un rechargement."""
+        conn = connect(":memory:")
+        try:
+            store = DeviceStore(conn)
+            routes = RelayRoutes(conn)
+            routes.add("10.20.0.0/16", "relais-b", 9009, "secret")
+            table = store.relay_table()
+            self.assertIs(store.relay_table(), table)
+            with conn:
+                conn.execute("UPDATE relays SET host = 'relais-c'")  # Autre processus
+            self.assertEqual(store.relay_table()[0][2][0], "relais-b")
+            store.reload()
+            self.assertEqual(store.relay_table()[0][2][0], "relais-c")
+            routes.remove("10.20.0.0/16")
+            self.assertEqual(store.relay_table(), [])
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
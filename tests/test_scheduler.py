@@ -0,0 +1,110 @@
+import sqlite3
+import threading
+import unittest
+from datetime import datetime
+from scheduler import CronExpression, Scheduler
+
+class FakeClock:
+    """Horloge manipulée par les tests."""
+    def __init__(self, moment):
+        self.now = moment.timestamp()
+
+    def __call__(self):
+        return self.now
+
+    def set(self, moment):
+        self.now = moment.timestamp()
+
+
+class TestCronExpression(unittest.TestCase):
+
+    def test_weekday_mornings(self):
+        """Test le prochain réveil d'une expression « chaque jour ouvré à 6 h 30 »."""
+        cron = CronExpression("30 6 * * 1-5")
+        friday_evening = datetime(2026, 10, 16, 18, 0)
+        self.assertEqual(cron.next_after(friday_evening), datetime(2026, 10, 19, 6, 30))
+        self.assertEqual(cron.next_after(datetime(2026, 10, 19, 6, 30)), datetime(2026, 10, 20, 6, 30))
+
+    def test_steps_lists_and_months(self):
+        """Test les pas, les listes et le passage au mois suivant."""
+        self.assertEqual(CronExpression("*/15 * * * *").next_after(datetime(2026, 1, 1, 10, 7)),
+                         datetime(2026, 1, 1, 10, 15))
+        self.assertEqual(CronExpression("0 0 1 3,9 *").next_after(datetime(2026, 3, 1, 0, 0)),
+                         datetime(2026, 9, 1, 0, 0))
+        with self.assertRaises(ValueError):
+            CronExpression("61 * * * *")
+
+
+class TestScheduler(unittest.TestCase):
+
+    def setUp(self):
+        """Crée un planificateur sur une base en mémoire avec une horloge simulée."""
+        self.conn = sqlite3.connect(':memory:')
+        self.clock = FakeClock(datetime(2026, 10, 16, 18, 0))  # Vendredi
+        self.woken = []
+        self.scheduler = Scheduler(self.conn, self.woken.append, clock=self.clock)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_sleeps_until_next_due_entry(self):
+        """Test que la file donne la prochaine échéance et ne réveille qu'à cette date."""
+        cron = self.scheduler.add('cron', "30 6 * * 1-5", target="rack-b-*")
+        once = self.scheduler.add('once', "2026-10-17T09:00", device_id=1)
+        self.assertEqual(self.scheduler.seconds_until_next(), 15 * 3600)
+        self.assertEqual(self.scheduler.run_pending(), [])
+        self.clock.set(datetime(2026, 10, 17, 9, 0))
+        self.assertEqual(self.scheduler.run_pending(), [once])
+        self.assertNotIn(once.id, self.scheduler.schedules)  # Réveil unique terminé
+        self.assertEqual(self.scheduler.next_due(), cron)
+        self.assertEqual(cron.next_run, datetime(2026, 10, 19, 6, 30).timestamp())
+
+    def test_missed_runs_are_caught_up_once(self):
+        """Test le rattrapage unique des réveils manqués après un arrêt."""
+        caught_up = self.scheduler.add('interval', "3600", device_id=1)
+        skipped = self.scheduler.add('interval', "3600", device_id=2, catch_up=False)
+        self.clock.now += 5 * 3600 + 600  # Cinq échéances manquées
+        restarted = Scheduler(self.conn, self.woken.append, clock=self.clock)
+        self.assertEqual([schedule.id for schedule in restarted.run_pending()], [caught_up.id])
+        self.assertEqual([schedule.id for schedule in self.woken], [caught_up.id])
+        # La prochaine échéance garde la même phase, après l'heure courante
+        self.assertEqual(restarted.schedules[skipped.id].next_run, skipped.next_run + 5 * 3600)
+        # L'état est enregistré : un nouveau démarrage ne réveille pas une seconde fois
+        self.assertEqual(Scheduler(self.conn, self.woken.append, clock=self.clock).run_pending(), [])
+
+    def test_wake_error_does_not_stop_other_schedules(self):
+        """Test qu'une erreur lors d'un réveil est notée sans empêcher les suivants ni arrêter la boucle."""
+        def wake(schedule):
+            if schedule.device_id == 1:
+                raise sqlite3.OperationalError("database is locked")
+            self.woken.append(schedule)
+
+        scheduler = Scheduler(self.conn, wake, clock=self.clock)
+        failing = scheduler.add('interval', "60", device_id=1)
+        other = scheduler.add('interval', "60", device_id=2)
+        self.clock.now += 60
+        with self.assertLogs('scheduler', 'ERROR'):
+            self.assertEqual(scheduler.run_pending(), [failing, other])
+        self.assertEqual(self.woken, [other])
+        self.assertEqual(scheduler.schedules[failing.id].next_run, self.clock.now + 60)
+
+    def test_remove_and_invalid_schedules(self):
+        """Test la suppression et le refus des planifications invalides."""
+        schedule = self.scheduler.add('interval', "60", device_id=1)
+        self.assertTrue(self.scheduler.remove(schedule.id))
+        self.assertIsNone(self.scheduler.seconds_until_next())
+        with self.assertRaises(ValueError):
+            self.scheduler.add('cron', "30 6 * *", device_id=1)
+        with self.assertRaises(ValueError):
+            self.scheduler.add('interval', "60")
+
+    def test_run_forever_stops(self):
+        """Test l'arrêt de la boucle sans interface depuis un autre thread."""
+        thread = threading.Thread(target=self.scheduler.run_forever)
+        thread.start()
+        self.scheduler.stop()
+        thread.join(2)
+        self.assertFalse(thread.is_alive())
+
+if __name__ == '__main__':
+    unittest.main()
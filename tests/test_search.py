@@ -0,0 +1,128 @@
+import sqlite3
+import time
+import unittest
+from PyQt5.QtWidgets import QApplication
+from devices import Device, DeviceStore
+from groups import GroupStore
+from models import DeviceFilterProxyModel, DeviceIdRole, DeviceListModel
+from search import SearchIndex
+
+class TestSearchIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = SearchIndex([
+            Device(1, "Serveur NAS", "00:11:22:33:44:01", "10.0.0.1"),
+            Device(2, "rack-b-01", "00:11:22:33:44:02", "10.0.1.2"),
+            Device(3, "rack-b-02", "AA-BB-CC-DD-EE-03", None),
+        ])
+
+    def test_search_fields(self):
+        """Test la recherche par nom, adresse MAC (avec ou sans séparateurs) et adresse IP."""
+        self.assertIsNone(self.index.search("  "))
+        self.assertEqual(self.index.search("RACK"), {2, 3})
+        self.assertEqual(self.index.search("ccdd"), {3})
+        self.assertEqual(self.index.search("44:01"), {1})
+        self.assertEqual(self.index.search("10.0.1."), {2})
+
+    def test_incremental_updates(self):
+        """Test le maintien des résultats mémorisés après ajout et suppression."""
+        self.assertEqual(self.index.search("rack"), {2, 3})
+        self.index.add(Device(4, "rack-c-01", "00:11:22:33:44:04"))
+        self.index.remove(2)
+        self.assertEqual(self.index.search("rack"), {3, 4})
+        self.assertEqual(self.index.search("rack-"), {3, 4})
+
+    def test_tags(self):
+        """Test la recherche par étiquette et la mise à jour des résultats quand les étiquettes changent."""
+        index = SearchIndex([Device(1, "pc-1", "00:11:22:33:44:01")], tags={1: ["Salle-Serveurs"], 2: ["bureau"]})
+        self.assertEqual(index.search("salle"), {1})
+        index.add(Device(2, "pc-2", "00:11:22:33:44:02"))  # Étiquettes lues avant l'ajout du périphérique
+        self.assertEqual(index.search("bureau"), {2})
+        index.set_tags({1: ["bureau"]})
+        self.assertEqual(index.search("bureau"), {1})
+        self.assertEqual(index.search("salle"), set())
+
+
+class TestDeviceFilterProxyModel(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Initialise l'application pour les tests."""
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        """Crée un modèle filtré sur une base de données en mémoire."""
+        self.conn = sqlite3.connect(':memory:')
+        self.store = DeviceStore(self.conn)
+        for i in range(5):
+            self.store.add(f"pc-{i}", f"00:11:22:33:44:{i:02x}")
+        self.model = DeviceListModel(self.store)
+        self.proxy = DeviceFilterProxyModel()
+        self.proxy.setSourceModel(self.model)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def names(self):
+        return [self.proxy.index(row).data() for row in range(self.proxy.rowCount())]
+
+    def test_filter_and_source_changes(self):
+        """Test le filtrage puis le suivi des ajouts et suppressions du modèle source."""
+        self.proxy.set_filter_text("pc-3")
+        self.assertEqual(self.names(), ["pc-3 (00:11:22:33:44:03)"])
+        self.model.add_device(self.store.add("pc-33", "00:11:22:33:44:33"))
+        self.model.add_device(self.store.add("other", "00:11:22:33:44:99"))
+        self.assertEqual(self.proxy.rowCount(), 2)
+        self.model.removeRows(0, 1)  # pc-0, non affiché
+        self.assertEqual(self.proxy.mapToSource(self.proxy.index(0)).row(), 2)
+        self.model.removeRows(2, 1)  # pc-3
+        self.assertEqual([self.proxy.index(0).data(DeviceIdRole)], [self.store.by_name("pc-33").id])
+        self.proxy.set_filter_text("")
+        self.assertEqual(self.proxy.rowCount(), self.model.rowCount())
+
+    def test_filter_by_tag(self):
+        """Test le filtre par étiquette, relues au début de chaque recherche."""
+        groups = GroupStore(self.conn)
+        groups.tag([self.store.by_name("pc-1").id], "salle-serveurs")
+        proxy = DeviceFilterProxyModel(tags=groups.tags_by_device)
+        proxy.setSourceModel(self.model)
+        proxy.set_filter_text("serveurs")
+        self.assertEqual(proxy.index(0).data(DeviceIdRole), self.store.by_name("pc-1").id)
+        self.assertEqual(proxy.rowCount(), 1)
+        proxy.set_filter_text("")
+        groups.tag([self.store.by_name("pc-2").id], "salle-serveurs")
+        proxy.set_filter_text("serveurs")
+        self.assertEqual(proxy.rowCount(), 2)
+
+    def test_batch_insert_is_one_signal(self):
+        """Test l'ajout d'un lot de lignes en une seule insertion, filtrée ou non."""
+        inserted = []
+        self.proxy.rowsInserted.connect(lambda parent, first, last: inserted.append((first, last)))
+        self.model.add_devices([self.store.add(f"pc-{i}", f"00:11:22:33:44:{i:02x}") for i in range(5, 8)])
+        self.assertEqual(inserted, [(5, 7)])
+        self.proxy.set_filter_text("rack")
+        self.model.add_devices([self.store.add("rack-1", "00:11:22:33:55:01"),
+                                self.store.add("pc-8", "00:11:22:33:44:08"),
+                                self.store.add("rack-2", "00:11:22:33:55:02")])
+        self.assertEqual(inserted[1:], [(0, 1)])
+        self.assertEqual(self.names(), ["rack-1 (00:11:22:33:55:01)", "rack-2 (00:11:22:33:55:02)"])
+        self.assertEqual(self.proxy.mapToSource(self.proxy.index(1)).row(), 10)
+
+    def test_keystroke_is_fast_with_50k_devices(self):
+        """Test qu'une frappe reste sous la durée d'une image avec 50 000 périphériques."""
+        with self.conn:
+            self.conn.executemany('INSERT INTO devices (name, mac) VALUES (?, ?)',
+                                  [(f"host-{i}", f"02:00:{i >> 16 & 255:02x}:{i >> 8 & 255:02x}:{i & 255:02x}:00")
+                                   for i in range(50000)])
+        self.store.reload()
+        self.model.reset()
+        slowest = 0.0
+        for text in ("h", "ho", "hos", "host", "host-", "host-4", "host-42", "host-4", "host-"):
+            start = time.perf_counter()
+            self.proxy.set_filter_text(text)
+            slowest = max(slowest, time.perf_counter() - start)
+        self.assertEqual(self.proxy.rowCount(), 50000)
+        self.assertLess(slowest, 0.1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from PyQt5.QtTest import QTest
+from PyQt5.QtWidgets import QApplication
+from settings import DEFAULT_SETTINGS, SettingsManager
+
+class TestSettingsManager(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Initialise l'application pour les tests."""
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        """Crée une base de données en mémoire pour chaque test."""
+        self.conn = sqlite3.connect(':memory:')
+        self.settings = SettingsManager(self.conn, delay_ms=20)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def stored(self):
+        return self.conn.execute('SELECT device_text_size, accent_color, text_color FROM settings').fetchall()
+
+    def test_defaults_are_inserted(self):
+        """Test l'insertion des paramètres par défaut dans une base vide."""
+        self.assertEqual(self.stored(), [tuple(DEFAULT_SETTINGS.values())[:3]])
+
+    def test_migrations_create_every_setting(self):
+        """Test que les migrations créent une colonne par paramètre, avec sa valeur par défaut."""
+        columns = [row[1] for row in self.conn.execute('PRAGMA table_info(settings)')]
+        self.assertLessEqual(set(DEFAULT_SETTINGS), set(columns))
+        self.assertEqual(SettingsManager(self.conn)._values, DEFAULT_SETTINGS)
+        self.assertEqual(self.conn.execute('SELECT COUNT(*) FROM settings').fetchone()[0], 1)
+
+    def test_burst_is_written_once(self):
+        """Test le regroupement d'une rafale de changements en une seule transaction."""
+        for size in range(8, 33):
+            self.settings.set('device_text_size', size)
+        self.settings.set('accent_color', "#FF5733")
+        self.assertEqual(self.settings.flush_count, 0)
+        self.assertEqual(self.settings['device_text_size'], 32)
+        QTest.qWait(100)
+        self.assertEqual(self.settings.flush_count, 1)
+        self.assertFalse(self.settings.pending)
+        self.assertEqual(self.stored(), [(32, "#FF5733", "#ffffff")])
+
+    def test_flush_writes_immediately(self):
+        """Test l'écriture immédiate au relâchement du curseur ou à la fermeture."""
+        self.settings.set('text_color', "#000000")
+        self.settings.flush()
+        self.assertEqual(self.stored()[0][2], "#000000")
+        self.settings.flush()  # Rien à écrire
+        self.assertEqual(self.settings.flush_count, 1)
+        self.assertEqual(SettingsManager(self.conn)['text_color'], "#000000")
+
+    def test_failed_write_is_retried(self):
+        """Test qu'une base verrouillée ne perd pas les modifications : elles sont réécrites au délai suivant."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'settings.db')
+            conn = sqlite3.connect(path, timeout=0)
+            settings = SettingsManager(conn, delay_ms=20)
+            settings.set('accent_color', "#FF5733")
+            writer = sqlite3.connect(path, isolation_level=None)
+            writer.execute('BEGIN IMMEDIATE')  # Verrou d'écriture tenu par un autre processus
+            with self.assertLogs('settings', 'WARNING'):
+                settings.flush()
+            self.assertTrue(settings.pending)
+            writer.execute('ROLLBACK')
+            writer.close()
+            QTest.qWait(100)
+            self.assertFalse(settings.pending)
+            self.assertEqual(conn.execute('SELECT accent_color FROM settings').fetchone()[0], "#FF5733")
+            conn.close()
+
+if __name__ == '__main__':
+    unittest.main()
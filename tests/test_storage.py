@@ -0,0 +1,146 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from devices import DeviceStore
+from storage import SCHEMA_VERSION, Database, connect, default_db_path, migrate, open_connection
+
+
+class TestStorage(unittest.TestCase):
+
+    def setUp(self):
+        """Crée un dossier temporaire pour les bases de données."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmp.name, 'test.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_new_database_is_migrated_in_wal_mode(self):
+        """Test la création du schéma complet et le journal WAL."""
+        conn = connect(self.db_file)
+        try:
+            self.assertEqual(conn.execute('PRAGMA user_version').fetchone()[0], SCHEMA_VERSION)
+            self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            self.assertLessEqual({'devices', 'groups', 'tags', 'relays', 'settings', 'schedules'}, tables)
+            self.assertEqual(migrate(conn), SCHEMA_VERSION)  # Rien à refaire
+        finally:
+            conn.close()
+
+    @unittest.skipUnless(os.name == 'posix', "droits POSIX")
+    def test_new_database_is_private(self):
+        """Test les droits de la base créée (clés des relais en clair) : propriétaire seulement."""
+        conn = connect(self.db_file)
+        conn.close()
+        self.assertEqual(os.stat(self.db_file).st_mode & 0o777, 0o600)
+        os.chmod(self.db_file, 0o644)
+        open_connection(self.db_file).close()  # Une base existante garde ses droits
+        self.assertEqual(os.stat(self.db_file).st_mode & 0o777, 0o644)
+
+    def test_older_schema_gets_missing_tables(self):
+        """Test la migration d'une base créée avant les relais et sans table des planifications."""
+        conn = sqlite3.connect(self.db_file)
+        conn.execute('CREATE TABLE devices (id INTEGER PRIMARY KEY, name TEXT NOT NULL, mac TEXT NOT NULL, '
+                     'ip TEXT, icon TEXT, mac_bytes BLOB, secureon BLOB, packet BLOB)')
+        conn.execute("INSERT INTO devices (name, mac) VALUES ('PC', '00:11:22:33:44:55')")
+        conn.execute('PRAGMA user_version = 3')
+        conn.commit()
+        self.assertEqual(migrate(conn), SCHEMA_VERSION)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM schedules').fetchone()[0], 0)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM relays').fetchone()[0], 0)
+        self.assertEqual(conn.execute('SELECT wol_port, history_max_rows FROM settings').fetchall(), [(9, 1000000)])
+        self.assertEqual(DeviceStore(conn).by_name("PC").mac, "00:11:22:33:44:55")
+        conn.close()
+
+    def test_same_mac_in_two_forms_is_normalized_once(self):
+        """Test la migration des paquets précalculés quand une adresse existe sous deux formes."""
+        conn = sqlite3.connect(self.db_file)
+        conn.execute('CREATE TABLE devices (id INTEGER PRIMARY KEY, name TEXT NOT NULL, mac TEXT NOT NULL, '
+                     'ip TEXT, icon TEXT)')
+        conn.executemany('INSERT INTO devices (name, mac) VALUES (?, ?)',
+                         [('PC', '00:11:22:33:44:55'), ('PC bis', '00-11-22-33-44-55'), ('NAS', 'aa-bb-cc-dd-ee-ff')])
+        conn.execute('PRAGMA user_version = 2')
+        conn.commit()
+        self.assertEqual(migrate(conn), SCHEMA_VERSION)
+        rows = conn.execute('SELECT name, mac, packet IS NOT NULL FROM devices ORDER BY id').fetchall()
+        self.assertEqual(rows, [('PC', '00:11:22:33:44:55', 1), ('PC bis', '00-11-22-33-44-55', 0),
+                                ('NAS', 'AA:BB:CC:DD:EE:FF', 1)])
+        conn.close()
+
+    def test_newer_schema_is_refused(self):
+        """Test le refus d'une base créée par une version plus récente."""
+        conn = sqlite3.connect(self.db_file)
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION + 1}')
+        with self.assertRaises(RuntimeError):
+            migrate(conn)
+        conn.close()
+
+    def test_connection_per_thread(self):
+        """Test une connexion distincte par thread, qui voit les écritures des autres."""
+        db = Database(self.db_file)
+        store = DeviceStore(db)
+        store.add("PC", "00:11:22:33:44:55")
+        seen = []
+
+        def read():
+            seen.append((db.connection(), db.execute('SELECT name FROM devices').fetchall()))
+
+        thread = threading.Thread(target=read)
+        thread.start()
+        thread.join()
+        self.assertIsNot(seen[0][0], db.connection())
+        self.assertEqual(seen[0][1], [("PC",)])
+        db.close()
+
+    def test_open_reader_does_not_block_writer(self):
+        """Test qu'une lecture en cours (l'interface) ne bloque pas l'écriture d'un autre processus."""
+        connect(self.db_file).close()
+        reader = open_connection(self.db_file)
+        writer = open_connection(self.db_file)
+        try:
+            reader.execute('BEGIN')
+            self.assertEqual(reader.execute('SELECT COUNT(*) FROM devices').fetchone()[0], 0)
+            started = time.perf_counter()
+            with writer:
+                writer.execute("INSERT INTO devices (name, mac) VALUES ('PC', '00:11:22:33:44:55')")
+            self.assertLess(time.perf_counter() - started, 1.0)
+            # La lecture garde son instantané jusqu'à la fin de sa transaction
+            self.assertEqual(reader.execute('SELECT COUNT(*) FROM devices').fetchone()[0], 0)
+            reader.rollback()
+            self.assertEqual(reader.execute('SELECT COUNT(*) FROM devices').fetchone()[0], 1)
+        finally:
+            reader.close()
+            writer.close()
+
+    @unittest.skipUnless(sys.platform.startswith('linux'), "Dossier de données XDG")
+    def test_default_path_adopts_legacy_database(self):
+        """Test le dossier de données par défaut et la reprise de l'ancienne base du dossier de lancement."""
+        legacy = sqlite3.connect(os.path.join(self.tmp.name, 'sc_pywol.db'))
+        legacy.execute('CREATE TABLE devices (name TEXT, mac TEXT, ip TEXT, icon TEXT)')
+        legacy.execute("INSERT INTO devices VALUES ('PC', '00:11:22:33:44:55', NULL, NULL)")
+        legacy.commit()
+        legacy.close()
+        data_home = os.path.join(self.tmp.name, 'data')
+        cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        try:
+            with mock.patch.dict(os.environ, {'XDG_DATA_HOME': data_home}):
+                os.environ.pop('SC_PYWOL_DB', None)
+                path = default_db_path()
+                self.assertEqual(path, os.path.join(data_home, 'sc-pywol', 'sc_pywol.db'))
+                conn = connect(path)
+                self.assertEqual([device.name for device in DeviceStore(conn)], ["PC"])
+                conn.close()
+            with mock.patch.dict(os.environ, {'SC_PYWOL_DB': self.db_file}):
+                self.assertEqual(default_db_path(), self.db_file)
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import os
+import unittest
+from PyQt5.QtWidgets import QApplication, QWidget
+from theme import ThemeEngine
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class TestThemeEngine(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Initialise l'application pour les tests."""
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.theme = ThemeEngine(os.path.join(ROOT_DIR, "style.qss"))
+
+    def test_template_variables_are_substituted(self):
+        """Test le remplacement de toutes les variables de couleur du modèle."""
+        stylesheet = self.theme.stylesheet("#FF5733", "#ffffff")
+        self.assertNotIn("${", stylesheet)
+        self.assertIn("#ff5733", stylesheet)
+        self.assertIs(self.theme.stylesheet("#FF5733", "#ffffff"), stylesheet)
+
+    def test_apply_only_when_theme_changes(self):
+        """Test qu'un thème identique n'est pas réappliqué."""
+        widget = QWidget()
+        self.theme.apply("#4CAF50", "#ffffff", widget)
+        self.theme.apply("#4CAF50", "#ffffff", widget)
+        self.assertEqual(self.theme.apply_count, 1)
+        self.theme.apply("#FF5733", "#ffffff", widget)
+        self.assertEqual(self.theme.apply_count, 2)
+        self.assertIn("#ff5733", widget.styleSheet())
+
+if __name__ == '__main__':
+    unittest.main()
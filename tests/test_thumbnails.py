@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+from PyQt5.QtCore import QThreadPool
+from PyQt5.QtGui import QColor, QImage
+from PyQt5.QtWidgets import QApplication
+from thumbnails import ThumbnailCache, prune_disk_cache
+
+class TestThumbnailCache(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Initialise l'application pour les tests."""
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        """Crée deux grandes images sources et un dossier de cache temporaires."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.temp_dir.name, "cache")
+        self.images = []
+        for name in ("a.png", "b.png"):
+            image = QImage(512, 256, QImage.Format_ARGB32)
+            image.fill(QColor("#4CAF50"))
+            path = os.path.join(self.temp_dir.name, name)
+            image.save(path)
+            self.images.append(path)
+        self.pool = QThreadPool()
+
+    def tearDown(self):
+        self.pool.waitForDone()
+        self.temp_dir.cleanup()
+
+    def load(self, cache, path):
+        """Demande une miniature puis attend son chargement en arrière-plan."""
+        if cache.pixmap(path) is None:
+            self.pool.waitForDone(5000)
+            self.app.processEvents()
+        return cache.pixmap(path)
+
+    def test_thumbnail_is_decoded_off_thread_and_scaled(self):
+        """Test le chargement asynchrone et la réduction de la miniature."""
+        cache = ThumbnailCache(self.cache_dir, thread_pool=self.pool)
+        loaded = []
+        cache.loaded.connect(loaded.append)
+        self.assertIsNone(cache.pixmap(self.images[0]))
+        pixmap = self.load(cache, self.images[0])
+        self.assertEqual(loaded, [self.images[0]])
+        self.assertEqual((pixmap.width(), pixmap.height()), (64, 32))
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+    def test_lru_eviction(self):
+        """Test l'éviction de la miniature la moins récemment utilisée."""
+        cache = ThumbnailCache(self.cache_dir, max_items=1, thread_pool=self.pool)
+        self.load(cache, self.images[0])
+        self.load(cache, self.images[1])
+        self.assertEqual(len(cache._pixmaps), 1)
+        self.assertIsNone(cache.pixmap(self.images[0]))
+
+    def test_modified_source_invalidates_entry(self):
+        """Test qu'une image modifiée donne une nouvelle miniature."""
+        cache = ThumbnailCache(self.cache_dir, thread_pool=self.pool)
+        self.load(cache, self.images[0])
+        stat = os.stat(self.images[0])
+        os.utime(self.images[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertIsNone(cache.pixmap(self.images[0]))
+        self.assertIsNotNone(self.load(cache, self.images[0]))
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+    def test_missing_file_has_no_thumbnail(self):
+        """Test qu'un chemin inexistant ne lance aucun chargement."""
+        cache = ThumbnailCache(self.cache_dir, thread_pool=self.pool)
+        self.assertIsNone(cache.pixmap(os.path.join(self.temp_dir.name, "missing.png")))
+        self.assertEqual(cache._pending, {})
+
+    def test_unwritable_cache_dir_still_loads(self):
+        """Test qu'un dossier de cache inutilisable n'empêche pas d'afficher la miniature."""
+        blocker = os.path.join(self.temp_dir.name, "fichier")
+        open(blocker, 'w').close()
+        cache = ThumbnailCache(os.path.join(blocker, "cache"), thread_pool=self.pool)
+        with self.assertLogs('thumbnails', 'WARNING'):
+            pixmap = self.load(cache, self.images[0])
+        self.assertEqual((pixmap.width(), pixmap.height()), (64, 32))
+        self.assertEqual(cache._pending, {})
+
+    def test_disk_cache_is_pruned_on_startup(self):
+        """Test la suppression des miniatures les plus anciennes au-delà de la limite du cache disque."""
+        os.makedirs(self.cache_dir)
+        for i in range(5):
+            path = os.path.join(self.cache_dir, f"{i}.png")
+            open(path, 'w').close()
+            os.utime(path, ns=(i * 10 ** 9, i * 10 ** 9))
+        ThumbnailCache(self.cache_dir, thread_pool=self.pool, max_disk_items=3)
+        self.pool.waitForDone(5000)
+        self.assertEqual(sorted(os.listdir(self.cache_dir)), ["2.png", "3.png", "4.png"])
+        self.assertEqual(prune_disk_cache(os.path.join(self.temp_dir.name, "absent")), 0)
+
+if __name__ == '__main__':
+    unittest.main()
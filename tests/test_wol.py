@@ -0,0 +1,197 @@
+import asyncio
+import socket
+import unittest
+from unittest import mock
+import wol
+from wol import (MagicPacketSender, WakeTarget, build_magic_packet, close_shared_senders, confirm_many,
+                 directed_broadcast, is_valid_mac_address, mac_key, mac_to_bytes, normalize_mac, probe_host,
+                 resolve_target, wake_and_confirm, wake_device, wake_many)
+
+class TestMacAddress(unittest.TestCase):
+
+    def test_helpers_accept_the_same_formats(self):
+        """Test que validation, forme canonique et clé de recherche acceptent et refusent les mêmes adresses."""
+        for mac in ("00:11:22:33:44:55", "00-11-22-33-44-55", "0011.2233.4455", "001122334455", " 00:11:22:33:44:55 "):
+            self.assertTrue(is_valid_mac_address(mac), mac)
+            self.assertEqual(mac_to_bytes(mac), bytes.fromhex("001122334455"))
+            self.assertEqual(normalize_mac(mac), "00:11:22:33:44:55")
+            self.assertEqual(mac_key(mac), "001122334455")
+        for mac in ("00:11-22:33-44:55", "00.11.22.33.44.55", "00:11:22:33:44", "00:11:22:33:44:5G", ""):
+            self.assertFalse(is_valid_mac_address(mac), mac)
+            with self.assertRaises(ValueError):
+                mac_to_bytes(mac)
+        self.assertEqual(mac_key("Invalide"), "invalide")  # Adresse invalide enregistrée : comparée telle quelle
+
+
+class TestWakeMany(unittest.TestCase):
+
+    def setUp(self):
+        """Ouvre un récepteur UDP local qui remplace le réseau."""
+        self.sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sink.bind(("127.0.0.1", 0))
+        self.sink.settimeout(1)
+        self.port = self.sink.getsockname()[1]
+
+    def tearDown(self):
+        self.sink.close()
+
+    def receive(self, count):
+        return [self.sink.recv(1024) for _ in range(count)]
+
+    def test_wake_many_sends_every_packet(self):
+        """Test l'envoi répété des paquets à plusieurs adresses MAC."""
+        macs = ["00:11:22:33:44:55", "66-77-88-99-AA-BB"]
+        results = wake_many(macs, repeat=3, ip_address="127.0.0.1", port=self.port)
+        self.assertEqual(list(results), macs)
+        self.assertTrue(all(result.ok and result.sent == 3 for result in results.values()))
+        packets = self.receive(6)
+        self.assertTrue(all(len(packet) == 102 for packet in packets))
+        self.assertEqual(packets[0][:6], b"\xff" * 6)
+        self.assertEqual(packets[0][6:12], bytes.fromhex("001122334455"))
+
+    def test_invalid_mac_is_reported(self):
+        """Test qu'une adresse MAC invalide n'empêche pas l'envoi des autres."""
+        results = wake_many(["invalid", "001122334455"], ip_address="127.0.0.1", port=self.port)
+        self.assertFalse(results["invalid"].ok)
+        self.assertIsNotNone(results["invalid"].error)
+        self.assertTrue(results["001122334455"].ok)
+        self.assertEqual(len(self.receive(1)[0]), 102)
+
+    def test_precomputed_packets_are_sent_as_is(self):
+        """Test l'envoi tel quel d'un paquet précalculé (avec mot de passe SecureOn)."""
+        packet = build_magic_packet("00:11:22:33:44:55", "01-02-03-04-05-06")
+        self.assertEqual(len(packet), 108)
+        results = wake_many(["00:11:22:33:44:55"], ip_address="127.0.0.1", port=self.port,
+                            packets={"00:11:22:33:44:55": packet})
+        self.assertTrue(results["00:11:22:33:44:55"].ok)
+        self.assertEqual(self.receive(1)[0], packet)
+        self.assertEqual(normalize_mac("0011.2233.4455"), "00:11:22:33:44:55")
+
+    def test_wake_device_reuses_sender(self):
+        """Test l'envoi d'un seul paquet par l'émetteur partagé, sans nouvelle socket à chaque appel."""
+        wake_device("00:11:22:33:44:55", ip_address="127.0.0.1", port=self.port)
+        sender = wol._shared_sender("127.0.0.1", self.port, None)
+        wake_device("00:11:22:33:44:55", ip_address="127.0.0.1", port=self.port)
+        self.assertIs(wol._shared_sender("127.0.0.1", self.port, None), sender)
+        self.assertEqual(self.receive(2), [build_magic_packet("00:11:22:33:44:55")] * 2)
+        with self.assertRaises(ValueError):
+            wake_device("invalid", ip_address="127.0.0.1", port=self.port)
+
+    def test_evicted_shared_sender_stays_open(self):
+        """Test qu'un émetteur partagé écarté reste utilisable par qui le tient encore, puis la fermeture finale."""
+        close_shared_senders()
+        sender = wol._shared_sender("127.0.0.1", self.port, None)
+        with mock.patch.object(wol, 'MAX_SHARED_SENDERS', 1):
+            wol._shared_sender("127.0.0.1", self.port + 1, None)
+        self.assertIsNot(wol._shared_sender("127.0.0.1", self.port, None), sender)
+        self.assertTrue(sender.send(["00:11:22:33:44:55"])["00:11:22:33:44:55"].ok)
+        self.assertEqual(len(self.receive(1)[0]), 102)
+        shared = wol._shared_sender("127.0.0.1", self.port, None)
+        shared.send(["00:11:22:33:44:55"])
+        close_shared_senders()
+        self.assertEqual(shared._sockets, {})
+        self.assertEqual(wol._shared_senders, {})
+        sender.close()
+
+    def test_packet_cache_is_bounded(self):
+        """Test que l'émetteur ne garde que les paquets les plus récemment utilisés."""
+        with mock.patch.object(wol, 'MAX_CACHED_PACKETS', 2):
+            sender = MagicPacketSender("127.0.0.1", self.port)
+            for mac in ("00:00:00:00:00:01", "00:00:00:00:00:02", "00:00:00:00:00:01", "00:00:00:00:00:03"):
+                sender.packet(mac)
+            self.assertEqual(list(sender._packets), ["00:00:00:00:00:01", "00:00:00:00:00:03"])
+
+    def test_sender_reuses_socket(self):
+        """Test la réutilisation de la socket entre deux envois."""
+        with MagicPacketSender("127.0.0.1", self.port) as sender:
+            sender.send(["00:11:22:33:44:55"])
+            sock = sender._socket()
+            sender.send(["00:11:22:33:44:55"])
+            self.assertIs(sender._socket(), sock)
+            self.assertEqual(len(sender._sockets), 1)
+        self.assertEqual(sender._sockets, {})
+        self.assertEqual(len(self.receive(2)), 2)
+
+    def test_targets_per_mac(self):
+        """Test l'envoi de chaque adresse MAC à sa propre destination."""
+        other = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        other.bind(("127.0.0.1", 0))
+        other.settimeout(1)
+        try:
+            targets = {"66:77:88:99:AA:BB": WakeTarget("127.0.0.1", other.getsockname()[1], interface="127.0.0.1")}
+            with MagicPacketSender("127.0.0.1", self.port) as sender:
+                results = sender.send(["00:11:22:33:44:55", "66:77:88:99:AA:BB"], targets=targets)
+                self.assertEqual(len(sender._sockets), 2)  # Socket par défaut et socket liée à 127.0.0.1
+            self.assertTrue(all(result.ok for result in results.values()))
+            self.assertEqual(self.receive(1)[0][6:12], bytes.fromhex("001122334455"))
+            self.assertEqual(other.recv(1024)[6:12], bytes.fromhex("66778899aabb"))
+        finally:
+            other.close()
+
+    def test_resolve_target(self):
+        """Test le choix de la destination : adresse imposée, relais, sous-réseau local ou diffusion dirigée."""
+        self.assertEqual(directed_broadcast("10.1.2.3"), "10.1.2.255")
+        self.assertEqual(directed_broadcast("10.1.2.3", 16), "10.1.255.255")
+        # 192.168.0.0/22 est directement joignable depuis la carte 192.168.1.10
+        networks = [(0xC0A80000, 0xFFFFFC00, "192.168.3.255", "192.168.1.10")]
+        relays = [(0x0A140000, 0xFFFF0000, ("relais-b", 9009, "clé"))]
+        self.assertEqual(resolve_target("192.168.2.7", networks=networks),
+                         WakeTarget("192.168.3.255", 9, "192.168.1.10"))
+        self.assertEqual(resolve_target("10.0.5.7", port=7, networks=networks), WakeTarget("10.0.5.255", 7))
+        self.assertEqual(resolve_target("10.20.5.7", networks=networks, relays=relays).relay,
+                         ("relais-b", 9009, "clé"))
+        self.assertEqual(resolve_target("10.20.5.7", broadcast="10.20.5.255", networks=networks, relays=relays),
+                         WakeTarget("10.20.5.255"))
+        self.assertIsNone(resolve_target(None, networks=networks))
+        self.assertIsNone(resolve_target("nas.lan", networks=networks))
+
+
+class TestWakeAndConfirm(unittest.TestCase):
+
+    def setUp(self):
+        """Ouvre un récepteur UDP et un port TCP local qui joue le rôle de l'hôte réveillé."""
+        self.sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sink.bind(("127.0.0.1", 0))
+        self.sink.settimeout(1)
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen()
+        self.tcp_port = self.listener.getsockname()[1]
+
+    def tearDown(self):
+        self.sink.close()
+        self.listener.close()
+
+    def test_probe_host(self):
+        """Test la détection d'un hôte qui accepte les connexions."""
+        self.assertTrue(asyncio.run(probe_host("127.0.0.1", ports=(self.tcp_port,))))
+
+    def test_wake_and_confirm_measures_time_to_up(self):
+        """Test le réveil puis la confirmation d'un hôte joignable."""
+        device = {'name': 'Local', 'mac': '00:11:22:33:44:55', 'ip': '127.0.0.1'}
+
+        async def run():
+            with MagicPacketSender("127.0.0.1", self.sink.getsockname()[1]) as sender:
+                return await confirm_many([device], timeout=5, sender=sender)
+
+        delays = asyncio.run(run())
+        self.assertIsNotNone(delays['00:11:22:33:44:55'])
+        self.assertLess(delays['00:11:22:33:44:55'], 5)
+        self.assertEqual(len(self.sink.recv(1024)), 102)
+
+    def test_wake_and_confirm_without_ip(self):
+        """Test qu'un périphérique sans adresse IP est réveillé sans confirmation."""
+        device = {'name': 'NoIP', 'mac': '00:11:22:33:44:55', 'ip': None}
+        with MagicPacketSender("127.0.0.1", self.sink.getsockname()[1]) as sender:
+            self.assertIsNone(asyncio.run(wake_and_confirm(device, timeout=1, sender=sender)))
+        self.assertEqual(len(self.sink.recv(1024)), 102)
+
+    def test_wake_and_confirm_keeps_secureon(self):
+        """Test l'envoi du paquet avec le mot de passe SecureOn du périphérique."""
+        device = {'name': 'NoIP', 'mac': '00:11:22:33:44:55', 'ip': None, 'secureon': '01:02:03:04:05:06'}
+        with MagicPacketSender("127.0.0.1", self.sink.getsockname()[1]) as sender:
+            asyncio.run(wake_and_confirm(device, timeout=1, sender=sender))
+        self.assertEqual(self.sink.recv(1024), build_magic_packet('00:11:22:33:44:55', '01:02:03:04:05:06'))
+
+if __name__ == '__main__':
+    unittest.main()
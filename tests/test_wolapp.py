@@ -1,17 +1,40 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
 import unittest
+from PyQt5.QtCore import QEvent
 from PyQt5.QtWidgets import QApplication
 from gui import WOLApp
+from history import HistoryStore
+from presence import ONLINE
+from wol import WakeResult
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 class TestWOLApp(unittest.TestCase):
 
     @classmethod
     def setUpClass(cls):
         """Initialise l'application pour les tests."""
-        cls.app = QApplication([])
+        cls.app = QApplication.instance() or QApplication([])
 
     def setUp(self):
-        """Initialise une instance de WOLApp pour chaque test."""
-        self.wol_app = WOLApp()
+        """Initialise une instance de WOLApp pour chaque test, avec une base de données temporaire."""
+        fd, self.db_file = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.wol_app = WOLApp(db_file=self.db_file)
+
+    def tearDown(self):
+        self.close_window()
+        os.remove(self.db_file)
+
+    def close_window(self):
+        """Fermer la fenêtre et la détruire tout de suite, dans le thread de l'interface."""
+        self.wol_app.close()
+        self.wol_app.deleteLater()
+        QApplication.sendPostedEvents(None, QEvent.DeferredDelete)
 
     def test_add_device(self):
         """Test l'ajout d'un périphérique."""
@@ -32,5 +55,66 @@ class TestWOLApp(unittest.TestCase):
         self.wol_app.update_accent_color("#FF5733")
         self.assertNotEqual(self.wol_app.accent_color, old_color)
 
+    def test_staged_startup(self):
+        """Test l'affichage de la fenêtre avant le chargement de la liste, remplie ensuite par lots."""
+        self.wol_app.save_device("PC 1", "00:11:22:33:44:01", None, None, None)
+        self.wol_app.save_device("PC 2", "00:11:22:33:44:02", None, None, None)
+        self.close_window()
+        self.wol_app = WOLApp(db_file=self.db_file)
+        self.assertTrue(self.wol_app.loading)
+        self.assertEqual(self.wol_app.device_model.rowCount(), 0)
+        self.assertIsNone(self.wol_app.settings_window)
+        while self.wol_app.loading:
+            self.app.processEvents()
+        self.assertEqual(self.wol_app.device_model.rowCount(), 2)
+
+    def test_settings_window_is_reused(self):
+        """Test la création de la fenêtre des paramètres à la première ouverture seulement."""
+        self.wol_app.open_settings()
+        window = self.wol_app.settings_window
+        window.close()
+        self.wol_app.open_settings()
+        self.assertIs(self.wol_app.settings_window, window)
+        window.close()
+
+    def test_wake_history(self):
+        """Test l'historique d'un réveil et de la réponse du périphérique, affiché dans sa fenêtre."""
+        self.wol_app.save_device("PC", "00:11:22:33:44:55", "127.0.0.1", None, None)
+        device = self.wol_app.devices.by_name("PC")
+        self.wol_app.record_history({device.mac: WakeResult(device.mac, sent=1)}, 'schedule')
+        self.wol_app.on_presence_changes({device.id: (ONLINE, time.time())})
+        self.assertEqual(self.wol_app.awaiting_up, {})
+        self.wol_app.open_history()
+        event = self.wol_app.history_window.model.event_at(0)
+        self.assertEqual((event.name, event.source), ("PC", 'schedule'))
+        self.assertIsNotNone(event.up_at)
+        self.wol_app.history_window.close()
+
+    def test_late_response_is_not_recorded(self):
+        """Test qu'une réponse arrivée après la fin de l'attente n'est pas notée dans l'historique."""
+        self.wol_app.save_device("PC", "00:11:22:33:44:55", "127.0.0.1", None, None)
+        device = self.wol_app.devices.by_name("PC")
+        self.wol_app.record_history({device.mac: WakeResult(device.mac, sent=1)}, 'gui')
+        self.wol_app.awaiting_up[device.id] = time.time() - 1
+        self.wol_app.on_presence_changes({device.id: (ONLINE, time.time())})
+        self.assertEqual(self.wol_app.awaiting_up, {})
+        self.wol_app.history.flush()
+        self.assertIsNone(HistoryStore(self.wol_app.conn).page()[0].up_at)
+
+    def test_retention_settings_reach_history_writer(self):
+        """Test la transmission des limites de rétention modifiées au thread de l'historique."""
+        self.wol_app.settings.set('history_retention_days', 30)
+        self.wol_app.settings.set('history_max_rows', 500)
+        self.wol_app.history.flush()
+        self.assertEqual((self.wol_app.history.retention_days, self.wol_app.history.max_rows), (30, 500))
+
+    def test_gui_import_defers_optional_modules(self):
+        """Test que l'interface ne charge ni la ligne de commande, ni l'API, ni l'import, ni les relais au démarrage."""
+        code = ("import sys, gui; print(' '.join(name for name in ('cli', 'api', 'asyncio', 'inventory', 'relay') "
+                "if name in sys.modules))")
+        output = subprocess.run([sys.executable, '-c', code], cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+                                env=dict(os.environ, QT_QPA_PLATFORM='offscreen')).stdout
+        self.assertEqual(output.split(), [])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,54 @@
+import socket
+import unittest
+from PyQt5.QtCore import QThreadPool
+from PyQt5.QtWidgets import QApplication
+from wol import MagicPacketSender
+from workers import WakeTask
+
+class TestWakeTask(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Initialise l'application pour les tests."""
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        """Ouvre un récepteur UDP local qui remplace le réseau."""
+        self.sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sink.bind(("127.0.0.1", 0))
+        self.port = self.sink.getsockname()[1]
+        self.pool = QThreadPool()
+
+    def tearDown(self):
+        self.sink.close()
+
+    def run_task(self, task):
+        finished = []
+        progress = []
+        task.signals.progress.connect(lambda done, total: progress.append((done, total)))
+        task.signals.finished.connect(lambda results, cancelled: finished.append((results, cancelled)))
+        self.pool.start(task)
+        self.pool.waitForDone(5000)
+        self.app.processEvents()  # Livrer les signaux mis en file d'attente
+        return finished, progress
+
+    def test_task_sends_in_background(self):
+        """Test l'envoi par lots dans le pool de threads avec progression."""
+        macs = [f"00:11:22:33:44:{i:02x}" for i in range(5)]
+        task = WakeTask(macs, chunk_size=2, sender_factory=lambda: MagicPacketSender("127.0.0.1", self.port))
+        finished, progress = self.run_task(task)
+        results, cancelled = finished[0]
+        self.assertFalse(cancelled)
+        self.assertTrue(all(result.ok for result in results.values()))
+        self.assertEqual(progress, [(2, 5), (4, 5), (5, 5)])
+
+    def test_cancelled_task_stops(self):
+        """Test l'annulation d'une tâche avant l'envoi."""
+        task = WakeTask(["00:11:22:33:44:55"], sender_factory=lambda: MagicPacketSender("127.0.0.1", self.port))
+        task.cancel()
+        finished, progress = self.run_task(task)
+        self.assertEqual(finished, [({}, True)])
+        self.assertEqual(progress, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+from string import Template
+from PyQt5.QtGui import QColor, QPalette
+from PyQt5.QtWidgets import QApplication
+
+
+class ThemeEngine:
+    """Thème de l'application : modèle QSS analysé une fois, variables de couleur nommées.
+
+    Chaque changement de thème produit une seule feuille de style appliquée à un seul
+    endroit (l'application), donc un seul recalcul des styles de tous les widgets.
+    """
+    def __init__(self, template_path):
+        text = ""
+        if os.path.exists(template_path):
+            with open(template_path, "r", encoding="utf-8") as f:
+                text = f.read()
+        self._template = Template(text)
+        self._stylesheets = {}  # (accent, texte) -> feuille de style générée
+        self._applied = None  # Thème actuellement appliqué
+        self.apply_count = 0  # Nombre de feuilles de style effectivement appliquées
+
+    @staticmethod
+    def variables(accent_color, text_color):
+        """Couleurs nommées utilisées dans le modèle."""
+        accent = QColor(accent_color)
+        return {
+            'accent': accent.name(),
+            'accent_hover': accent.darker(110).name(),
+            'accent_light': accent.lighter(130).name(),
+            'text': QColor(text_color).name(),
+        }
+
+    def stylesheet(self, accent_color, text_color):
+        """Feuille de style d'un thème, générée une seule fois par couple de couleurs."""
+        key = (accent_color, text_color)
+        stylesheet = self._stylesheets.get(key)
+        if stylesheet is None:
+            stylesheet = self._stylesheets[key] = self._template.substitute(self.variables(accent_color, text_color))
+        return stylesheet
+
+    def apply(self, accent_color, text_color, target=None):
+        """Appliquer le thème à l'application (ou à `target`) si il a changé."""
+        target = target or QApplication.instance()
+        key = (accent_color, text_color, id(target))
+        if target is None or key == self._applied:
+            return
+        colors = self.variables(accent_color, text_color)
+        palette = target.palette()
+        for role in (QPalette.WindowText, QPalette.Text, QPalette.ButtonText):
+            palette.setColor(role, QColor(colors['text']))
+        palette.setColor(QPalette.Highlight, QColor(colors['accent']))
+        target.setPalette(palette)
+        target.setStyleSheet(self.stylesheet(accent_color, text_color))
+        self._applied = key
+        self.apply_count += 1
@@ -0,0 +1,183 @@
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from PyQt5.QtCore import QObject, QRunnable, QStandardPaths, QThreadPool, Qt, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader, QPixmap
+from metrics import metrics
+
+log = logging.getLogger(__name__)
+
+# Taille unique des miniatures : la vue les réduit selon la taille du texte,
+# donc changer la taille du texte ne redécode jamais les images sources.
+THUMBNAIL_SIZE = 64
+MAX_DISK_ITEMS = 2048  # Miniatures gardées sur disque ; les plus anciennes sont supprimées au démarrage
+
+
+def default_cache_dir():
+    """Dossier de cache des miniatures de l'utilisateur."""
+    base = QStandardPaths.writableLocation(QStandardPaths.GenericCacheLocation) or os.path.expanduser("~/.cache")
+    return os.path.join(base, "sc_pywol", "thumbnails")
+
+
+class _LoaderSignals(QObject):
+    loaded = pyqtSignal(object, object)  # Clé de la miniature, QImage (nulle en cas d'échec)
+
+
+class _ThumbnailLoader(QRunnable):
+    """Décodage d'une miniature dans un thread du pool (cache disque puis image source)."""
+    def __init__(self, key, disk_path):
+        super().__init__()
+        self.key = key
+        self.disk_path = disk_path
+        self.signals = _LoaderSignals()
+
+    def run(self):
+        # Une exception dans un thread du pool arrête l'application : `loaded` est toujours émis
+        try:
+            with metrics.span('thumbnail_load_seconds'):
+                image = self._load()
+        except Exception:
+            log.exception("Échec du chargement de la miniature de %s", self.key[0])
+            image = QImage()
+        self.signals.loaded.emit(self.key, image)
+
+    def _load(self):
+        path, _, size = self.key
+        image = QImage(self.disk_path) if self.disk_path and os.path.exists(self.disk_path) else QImage()
+        if not image.isNull():
+            try:
+                os.utime(self.disk_path)  # Miniature récemment utilisée : gardée par `prune_disk_cache`
+            except OSError:
+                pass
+        else:
+            reader = QImageReader(path)
+            source_size = reader.size()
+            if source_size.isValid():
+                # Décoder directement à la taille réduite quand le format le permet
+                reader.setScaledSize(source_size.scaled(size, size, Qt.KeepAspectRatio))
+            image = reader.read()
+            if not image.isNull():
+                if image.width() > size or image.height() > size:
+                    image = image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+                if self.disk_path:
+                    self._save(image)
+        return image
+
+    def _save(self, image):
+        """Écrire la miniature dans le cache disque ; un dossier illisible, plein ou absent est ignoré."""
+        # Écrire dans un fichier temporaire pour ne jamais lire une miniature incomplète
+        temp_path = f"{self.disk_path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.disk_path), exist_ok=True)
+            if image.save(temp_path, "PNG"):
+                os.replace(temp_path, self.disk_path)
+                return
+        except OSError as e:
+            log.warning("Miniature non enregistrée dans le cache (%s)", e)
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+
+
+def prune_disk_cache(cache_dir, max_items=MAX_DISK_ITEMS):
+    """Supprimer les miniatures les moins récemment utilisées au-delà de `max_items` ; retourne leur nombre."""
+    try:
+        entries = [entry for entry in os.scandir(cache_dir) if entry.is_file()]
+    except OSError:
+        return 0
+    removed = 0
+    if len(entries) > max_items:
+        entries.sort(key=lambda entry: entry.stat().st_mtime_ns)
+        for entry in entries[:len(entries) - max_items]:
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+class _PruneTask(QRunnable):
+    """Nettoyage du cache disque dans un thread du pool, pour ne pas retarder le démarrage."""
+    def __init__(self, cache_dir, max_items):
+        super().__init__()
+        self.cache_dir = cache_dir
+        self.max_items = max_items
+
+    def run(self):
+        try:
+            prune_disk_cache(self.cache_dir, self.max_items)
+        except Exception:
+            log.exception("Échec du nettoyage du cache des miniatures")
+
+
+class ThumbnailCache(QObject):
+    """Cache des icônes de périphériques : LRU en mémoire et miniatures sur disque."""
+    loaded = pyqtSignal(str)  # Chemin de l'image dont la miniature vient d'être chargée
+
+    def __init__(self, cache_dir=None, max_items=512, size=THUMBNAIL_SIZE, thread_pool=None, parent=None,
+                 max_disk_items=MAX_DISK_ITEMS):
+        super().__init__(parent)
+        self.cache_dir = default_cache_dir() if cache_dir is None else cache_dir
+        self.max_items = max_items
+        self.size = size
+        self.thread_pool = thread_pool or QThreadPool.globalInstance()
+        if self.cache_dir:
+            self.thread_pool.start(_PruneTask(self.cache_dir, max_disk_items))
+        self._pixmaps = OrderedDict()  # Clé -> QPixmap, du plus ancien au plus récent
+        self._pending = {}  # Clé -> chargement en cours
+        self._failed = set()  # Images illisibles, pour ne pas les redécoder en boucle
+
+    def _key(self, path):
+        """Clé (chemin, date de modification, taille) ; None si le fichier n'existe pas."""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        return (path, mtime, self.size)
+
+    def _disk_path(self, key):
+        if not self.cache_dir:
+            return None
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.png")
+
+    def pixmap(self, path):
+        """Retourner la miniature d'une image, ou None si elle n'est pas encore chargée.
+
+        Le chargement est alors lancé en arrière-plan et `loaded` est émis à la fin.
+        """
+        if not path:
+            return None
+        key = self._key(path)
+        if key is None or key in self._failed:
+            return None
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(key)
+            return pixmap
+        if key not in self._pending:
+            loader = _ThumbnailLoader(key, self._disk_path(key))
+            loader.signals.loaded.connect(self._on_loaded)
+            # Le pool détruit la tâche après son exécution : seuls ses signaux sont gardés
+            self._pending[key] = loader.signals
+            self.thread_pool.start(loader)
+        return None
+
+    def _on_loaded(self, key, image):
+        """Convertir l'image décodée en QPixmap dans le thread de l'interface."""
+        self._pending.pop(key, None)
+        if image.isNull():
+            self._failed.add(key)
+            return
+        self._pixmaps[key] = QPixmap.fromImage(image)
+        while len(self._pixmaps) > self.max_items:
+            self._pixmaps.popitem(last=False)
+        self.loaded.emit(key[0])
+
+    def clear(self):
+        """Vider le cache en mémoire (les miniatures sur disque sont conservées)."""
+        self._pixmaps.clear()
+        self._failed.clear()
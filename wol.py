@@ -1,6 +1,541 @@
-from wakeonlan import send_magic_packet
+import atexit
+import logging
+import re
+import socket
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict
+from wakeonlan import BROADCAST_IP, DEFAULT_PORT
+from metrics import metrics
 
-def wake_device(mac_address):
-    """Envoie un paquet Wake On Lan pour réveiller un périphérique."""
-    send_magic_packet(mac_address)
-    print(f"Magic packet sent to {mac_address}")
+log = logging.getLogger(__name__)
+
+# Compilée une seule fois au chargement du module : AA:BB:CC:DD:EE:FF ou AA-BB-CC-DD-EE-FF
+# (un seul séparateur), AABB.CCDD.EEFF ou AABBCCDDEEFF
+MAC_REGEX = re.compile(r'^(?:[0-9A-Fa-f]{2}([:-])(?:[0-9A-Fa-f]{2}\1){4}[0-9A-Fa-f]{2}'
+                       r'|[0-9A-Fa-f]{4}\.[0-9A-Fa-f]{4}\.[0-9A-Fa-f]{4}|[0-9A-Fa-f]{12})$')
+
+def _mac_digits(mac):
+    """Les 12 chiffres hexadécimaux d'une adresse MAC (formats de `MAC_REGEX`), ou lever ValueError.
+
+    Seul analyseur des adresses MAC : la validation, la forme canonique et les
+    recherches (`mac_key`) en dépendent, et acceptent donc les mêmes formats.
+    """
+    mac = mac.strip()
+    if MAC_REGEX.match(mac) is None:
+        raise ValueError(f"Adresse MAC invalide : '{mac}'")
+    return mac.replace(':', '').replace('-', '').replace('.', '')
+
+def mac_to_bytes(mac):
+    """Retourner les 6 octets d'une adresse MAC, ou lever ValueError."""
+    return bytes.fromhex(_mac_digits(mac))
+
+def is_valid_mac_address(mac):
+    """Vérifie si l'adresse MAC a un format valide."""
+    try:
+        mac_to_bytes(mac)
+    except ValueError:
+        return False
+    return True
+
+def normalize_mac(mac):
+    """Retourner l'adresse MAC sous la forme AA:BB:CC:DD:EE:FF, ou lever ValueError."""
+    return mac_to_bytes(mac).hex(':').upper()
+
+def mac_key(mac):
+    """Forme comparable d'une adresse MAC (12 chiffres hexadécimaux en minuscules).
+
+    Une adresse invalide déjà enregistrée (voir storage._precompute_packets) est comparée telle quelle.
+    """
+    try:
+        return _mac_digits(mac).lower()
+    except ValueError:
+        return mac.strip().lower()
+
+def secureon_to_bytes(password):
+    """Mot de passe SecureOn (6 octets, écrit comme une adresse MAC), None s'il est vide."""
+    if not password:
+        return None
+    if isinstance(password, (bytes, bytearray)):
+        if len(password) != 6:
+            raise ValueError("Le mot de passe SecureOn doit faire 6 octets.")
+        return bytes(password)
+    try:
+        return mac_to_bytes(password)
+    except ValueError:
+        raise ValueError("Le mot de passe SecureOn doit faire 6 octets (ex. 01:02:03:04:05:06).") from None
+
+def build_magic_packet(mac, secureon=None):
+    """Construire le paquet magique : 6 × FF, 16 × l'adresse MAC, puis le mot de passe SecureOn éventuel."""
+    raw = mac if isinstance(mac, (bytes, bytearray)) else mac_to_bytes(mac)
+    return b'\xff' * 6 + bytes(raw) * 16 + (secureon_to_bytes(secureon) or b'')
+
+MAX_SHARED_SENDERS = 8  # Émetteurs gardés par wake_device (un par destination)
+_shared_senders = OrderedDict()  # (adresse IP, port, carte réseau) -> MagicPacketSender
+_shared_senders_lock = threading.Lock()
+
+
+def _shared_sender(ip_address, port, interface):
+    """Émetteur réutilisé d'un appel de `wake_device` à l'autre pour une même destination."""
+    key = (ip_address, port, interface)
+    with _shared_senders_lock:
+        sender = _shared_senders.get(key)
+        if sender is None:
+            sender = _shared_senders[key] = MagicPacketSender(ip_address, port, interface)
+            if len(_shared_senders) > MAX_SHARED_SENDERS:
+                # Pas de close() : un autre thread peut être en train d'envoyer par cet émetteur.
+                # Ses sockets sont fermées avec lui, quand plus personne ne l'utilise.
+                _shared_senders.popitem(last=False)
+        else:
+            _shared_senders.move_to_end(key)
+        return sender
+
+
+@atexit.register
+def close_shared_senders():
+    """Fermer les émetteurs gardés par `wake_device` (appelée aussi à la sortie du programme)."""
+    with _shared_senders_lock:
+        senders = list(_shared_senders.values())
+        _shared_senders.clear()
+    for sender in senders:
+        sender.close()
+
+
+def wake_device(mac_address, ip_address=BROADCAST_IP, port=DEFAULT_PORT, interface=None):
+    """Envoie un paquet Wake On Lan pour réveiller un périphérique.
+
+    Le paquet et la socket sont ceux de `MagicPacketSender`, gardés entre deux appels.
+    Lève ValueError pour une adresse MAC invalide et OSError si l'envoi échoue.
+    """
+    sender = _shared_sender(ip_address, port, interface)
+    result = sender.send([mac_address], packets={mac_address: sender.packet(mac_address)})[mac_address]
+    if result.error is not None:
+        raise OSError(result.error)
+    log.info("Magic packet sent to %s", mac_address)
+
+
+# Choix de la destination des paquets
+
+DEFAULT_PREFIX = 24  # Longueur de préfixe supposée pour un sous-réseau distant
+NETWORKS_TTL = 60.0  # Durée de validité de la liste des interfaces (secondes)
+SIOCGIFADDR = 0x8915
+SIOCGIFNETMASK = 0x891b
+_networks_cache = (0.0, None)
+
+
+def _ip_to_int(ip):
+    return struct.unpack('!I', socket.inet_aton(ip))[0]
+
+
+def _int_to_ip(value):
+    return socket.inet_ntoa(struct.pack('!I', value & 0xFFFFFFFF))
+
+
+def _mask(prefix):
+    return (0xFFFFFFFF << (32 - prefix)) & 0xFFFFFFFF
+
+
+def directed_broadcast(ip, prefix=DEFAULT_PREFIX):
+    """Adresse de diffusion dirigée du sous-réseau d'une adresse IP (ex. 10.1.2.3/24 -> 10.1.2.255)."""
+    return _int_to_ip(_ip_to_int(ip) | ~_mask(prefix))
+
+
+def _interface_networks():
+    """Réseaux IPv4 des cartes réseau sous Linux (ioctl), [] ailleurs."""
+    if not sys.platform.startswith('linux'):
+        return []
+    import fcntl
+
+    networks = []
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        for _, name in socket.if_nameindex():
+            request = struct.pack('256s', name[:15].encode())
+            try:
+                address = socket.inet_ntoa(fcntl.ioctl(sock.fileno(), SIOCGIFADDR, request)[20:24])
+                netmask = socket.inet_ntoa(fcntl.ioctl(sock.fileno(), SIOCGIFNETMASK, request)[20:24])
+            except OSError:
+                continue  # Carte sans adresse IPv4
+            networks.append((name, address, netmask))
+    finally:
+        sock.close()
+    return networks
+
+
+def _host_networks():
+    """Adresses IPv4 de la machine, avec un préfixe /24 supposé (Windows, macOS)."""
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(socket.gethostname(), None, socket.AF_INET)}
+    except OSError:
+        addresses = set()
+    return [(None, address, _int_to_ip(_mask(DEFAULT_PREFIX))) for address in sorted(addresses)]
+
+
+def local_networks(refresh=False):
+    """Sous-réseaux IPv4 directement joignables : [(réseau, masque, diffusion, adresse de la carte)] en entiers.
+
+    La liste est gardée `NETWORKS_TTL` secondes ; les boucles locales sont ignorées.
+    """
+    global _networks_cache
+    expiry, networks = _networks_cache
+    if networks is not None and not refresh and time.monotonic() < expiry:
+        return networks
+    networks = []
+    for _, address, netmask in _interface_networks() or _host_networks():
+        if address.startswith('127.'):
+            continue
+        ip, mask = _ip_to_int(address), _ip_to_int(netmask)
+        networks.append((ip & mask, mask, _int_to_ip(ip | ~mask), address))
+    networks.sort(key=lambda network: network[1], reverse=True)  # Préfixe le plus long d'abord
+    _networks_cache = (time.monotonic() + NETWORKS_TTL, networks)
+    return networks
+
+
+class WakeTarget:
+    """Destination des paquets d'un périphérique.
+
+    Adresse de diffusion (dirigée) et port UDP, carte réseau source (son adresse IP,
+    None : celle de l'émetteur), ou relais (hôte, port, clé) qui réémet les paquets
+    sur un sous-réseau distant.
+    """
+    __slots__ = ('address', 'port', 'interface', 'relay')
+
+    def __init__(self, address=BROADCAST_IP, port=DEFAULT_PORT, interface=None, relay=None):
+        self.address = address
+        self.port = port
+        self.interface = interface
+        self.relay = relay
+
+    def __eq__(self, other):
+        return isinstance(other, WakeTarget) and (self.address, self.port, self.interface, self.relay) == \
+            (other.address, other.port, other.interface, other.relay)
+
+    def __hash__(self):
+        return hash((self.address, self.port, self.interface, self.relay))
+
+    def __repr__(self):
+        if self.relay is not None:
+            return f"WakeTarget(relay={self.relay[0]}:{self.relay[1]})"
+        return f"WakeTarget({self.address!r}, {self.port}, interface={self.interface!r})"
+
+
+def resolve_target(ip=None, broadcast=None, port=None, interface=None, default_port=DEFAULT_PORT, networks=None,
+                   relays=()):
+    """Choisir la destination des paquets d'un périphérique d'après son adresse IP.
+
+    - `broadcast` (adresse enregistrée pour le périphérique) est utilisée telle quelle ;
+    - une adresse d'un sous-réseau servi par un relais passe par ce relais ;
+    - une adresse d'un sous-réseau local reçoit la diffusion de ce sous-réseau, envoyée
+      depuis la carte qui y est branchée ;
+    - une autre adresse reçoit la diffusion dirigée de son /24 (à travers le routeur) ;
+    - sans adresse IP, retourne None : l'émetteur utilise sa destination par défaut.
+
+    `relays` est une liste de (réseau, masque, (hôte, port, clé)) en entiers, préfixe le plus long d'abord.
+    """
+    port = port or default_port
+    if broadcast:
+        return WakeTarget(broadcast, port, interface)
+    if not ip:
+        return None
+    try:
+        value = _ip_to_int(ip)
+    except OSError:
+        return None  # Nom d'hôte ou adresse IPv6 : pas de diffusion dirigée
+    for network, mask, relay in relays:
+        if value & mask == network:
+            return WakeTarget(port=port, relay=relay)
+    for network, mask, address, local_address in local_networks() if networks is None else networks:
+        if value & mask == network:
+            return WakeTarget(address, port, interface or local_address)
+    return WakeTarget(directed_broadcast(ip), port, interface)
+
+
+class WakeResult:
+    """Résultat de l'envoi des paquets magiques pour une adresse MAC."""
+    __slots__ = ('mac', 'sent', 'error')
+
+    def __init__(self, mac, sent=0, error=None):
+        self.mac = mac
+        self.sent = sent  # Nombre de paquets effectivement envoyés
+        self.error = error  # Message d'erreur, None si tout s'est bien passé
+
+    @property
+    def ok(self):
+        """Vrai si au moins un paquet a été envoyé sans erreur."""
+        return self.error is None and self.sent > 0
+
+    def __repr__(self):
+        return f"WakeResult(mac={self.mac!r}, sent={self.sent}, error={self.error!r})"
+
+
+MAX_CACHED_PACKETS = 4096  # Paquets gardés par émetteur (les plus récemment utilisés)
+
+
+class MagicPacketSender:
+    """Sockets UDP réutilisables pour envoyer des paquets magiques en rafale.
+
+    Une socket est ouverte par carte réseau source ; `send` accepte une destination
+    par adresse MAC (voir `resolve_target`), y compris un relais pour un sous-réseau distant.
+    """
+    def __init__(self, ip_address=BROADCAST_IP, port=DEFAULT_PORT, interface=None):
+        self.address = (ip_address, port)
+        self.interface = interface  # Adresse IP de la carte réseau à utiliser
+        self._sockets = {}  # Adresse IP de la carte source (None : choisie par le système) -> socket
+        self._lock = threading.Lock()  # L'émetteur peut être partagé entre l'interface et l'API
+        self._packets = OrderedDict()  # Paquets construits récemment, par adresse MAC (au plus MAX_CACHED_PACKETS)
+
+    def _socket(self, interface=None):
+        """Ouvrir la socket d'une carte réseau à la première utilisation puis la réutiliser."""
+        interface = interface or self.interface
+        with self._lock:
+            sock = self._sockets.get(interface)
+            if sock is None:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                try:
+                    if interface is not None:
+                        sock.bind((interface, 0))
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+                except OSError:
+                    sock.close()
+                    raise
+                self._sockets[interface] = sock
+            return sock
+
+    def packet(self, mac_address):
+        """Retourner le paquet magique d'une adresse MAC (gardé pour les envois suivants)."""
+        with self._lock:
+            packet = self._packets.get(mac_address)
+            if packet is not None:
+                self._packets.move_to_end(mac_address)
+                return packet
+        packet = build_magic_packet(mac_address)
+        with self._lock:
+            self._packets[mac_address] = packet
+            if len(self._packets) > MAX_CACHED_PACKETS:
+                self._packets.popitem(last=False)
+        return packet
+
+    def send(self, macs, repeat=1, interval=0.0, packets=None, targets=None):
+        """Envoyer `repeat` paquets à chaque adresse MAC, espacés de `interval` secondes.
+
+        `packets` donne les paquets déjà construits ({adresse MAC: octets}, par exemple
+        ceux enregistrés en base avec leur mot de passe SecureOn) : ils sont envoyés tels quels.
+        `targets` donne la destination de chaque adresse MAC ({adresse MAC: WakeTarget}) ;
+        les autres reçoivent les paquets à l'adresse de l'émetteur.
+        """
+        results = {}
+        to_send = []  # (résultat, paquet, socket, adresse)
+        relayed = {}  # Relais -> [(résultat, paquet)]
+        packets = packets or {}
+        targets = targets or {}
+        for mac in macs:
+            if mac in results:
+                continue
+            result = results[mac] = WakeResult(mac)
+            try:
+                packet = packets.get(mac) or self.packet(mac)
+                target = targets.get(mac)
+                if target is None:
+                    to_send.append((result, packet, self._socket(), self.address))
+                elif target.relay is not None:
+                    relayed.setdefault(target.relay, []).append((result, packet))
+                else:
+                    to_send.append((result, packet, self._socket(target.interface), (target.address, target.port)))
+            except (ValueError, OSError) as e:
+                result.error = str(e)
+
+        if to_send or relayed:
+            with metrics.span('wol_send_seconds'):
+                for round_index in range(repeat):
+                    if round_index and interval > 0:
+                        time.sleep(interval)
+                    for result, packet, sock, address in to_send:
+                        if result.error is not None:
+                            continue
+                        try:
+                            sock.sendto(packet, address)
+                            result.sent += 1
+                        except OSError as e:
+                            result.error = str(e)
+                    for relay, entries in relayed.items():
+                        self._send_relayed(relay, entries)
+        if metrics.enabled:
+            metrics.inc('wol_packets_sent_total', sum(result.sent for result in results.values()))
+            metrics.inc('wol_send_errors_total', sum(result.error is not None for result in results.values()))
+        return results
+
+    def _send_relayed(self, relay, entries):
+        """Demander à un relais (hôte, port, clé) de réémettre des paquets sur son sous-réseau."""
+        from relay import MAX_ENTRIES, build_request
+
+        host, port, key = relay
+        entries = [(result, packet) for result, packet in entries if result.error is None]
+        for start in range(0, len(entries), MAX_ENTRIES):
+            chunk = entries[start:start + MAX_ENTRIES]
+            # Le paquet contient l'adresse MAC (octets 6 à 12) puis le mot de passe SecureOn éventuel
+            request = build_request(key, [(packet[6:12], packet[102:]) for _, packet in chunk])
+            try:
+                self._socket().sendto(request, (host, port))
+            except OSError as e:
+                for result, _ in chunk:
+                    result.error = str(e)
+                continue
+            for result, _ in chunk:
+                result.sent += 1
+
+    def close(self):
+        """Fermer les sockets."""
+        with self._lock:
+            for sock in self._sockets.values():
+                sock.close()
+            self._sockets.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def wake_many(macs, repeat=1, interval=0.0, ip_address=BROADCAST_IP, port=DEFAULT_PORT,
+              interface=None, sender=None, packets=None, targets=None):
+    """Réveiller plusieurs périphériques en réutilisant les mêmes sockets.
+
+    Retourne un dictionnaire {adresse MAC: WakeResult}.
+    """
+    if sender is not None:
+        return sender.send(macs, repeat=repeat, interval=interval, packets=packets, targets=targets)
+    with MagicPacketSender(ip_address, port, interface) as sender:
+        return sender.send(macs, repeat=repeat, interval=interval, packets=packets, targets=targets)
+
+
+def wake_in_waves(macs, wave_size, wave_delay=1.0, repeat=1, interval=0.0, ip_address=BROADCAST_IP,
+                  port=DEFAULT_PORT, interface=None, sender=None, on_result=None, packets=None, targets=None):
+    """Réveiller par vagues d'au plus `wave_size` périphériques, espacées de `wave_delay` secondes.
+
+    Évite l'appel de courant et la rafale de diffusion d'un groupe entier réveillé
+    d'un coup. `on_result` est appelé avec chaque WakeResult dès son envoi.
+    """
+    macs = list(dict.fromkeys(macs))
+    results = {}
+    own_sender = sender is None
+    sender = sender or MagicPacketSender(ip_address, port, interface)
+    try:
+        for start in range(0, len(macs), max(1, wave_size)):
+            if start:
+                time.sleep(wave_delay)
+            wave = sender.send(macs[start:start + max(1, wave_size)], repeat=repeat, interval=interval,
+                               packets=packets, targets=targets)
+            results.update(wave)
+            if on_result is not None:
+                for result in wave.values():
+                    on_result(result)
+    finally:
+        if own_sender:
+            sender.close()
+    return results
+
+
+# Ports TCP sondés pour savoir si un hôte répond. Un refus de connexion (RST)
+# prouve aussi que l'hôte est allumé.
+PROBE_PORTS = (445, 22, 3389, 80, 135, 139)
+
+
+async def probe_host(ip_address, ports=PROBE_PORTS, timeout=1.0):
+    """Vérifier sans bloquer si un hôte répond sur l'un des ports TCP donnés."""
+    # asyncio n'est importé qu'ici pour garder l'import de wol.py rapide
+    import asyncio
+
+    async def connect(port):
+        try:
+            _, writer = await asyncio.open_connection(ip_address, port)
+        except ConnectionRefusedError:
+            return True
+        except OSError:
+            return False
+        writer.close()
+        return True
+
+    tasks = [asyncio.ensure_future(connect(port)) for port in ports]
+    try:
+        for next_done in asyncio.as_completed(tasks, timeout=timeout):
+            if await next_done:
+                return True
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return False
+
+
+async def wake_and_confirm(device, timeout=120.0, probe_interval=1.0, resend_delay=2.0,
+                           max_resend_delay=30.0, sender=None, targets=None):
+    """Réveiller un périphérique puis attendre qu'il réponde sur son adresse IP.
+
+    Le paquet est renvoyé avec un délai qui double à chaque fois. Retourne le
+    temps (en secondes) avant que l'hôte réponde, ou None s'il n'a pas répondu
+    avant `timeout` ou s'il n'a pas d'adresse IP. `targets` : voir `MagicPacketSender.send`.
+    Le paquet précalculé du périphérique (ou son mot de passe SecureOn) est réutilisé à chaque envoi.
+    """
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    mac_address = device['mac']
+    ip_address = device.get('ip')
+    packet = device.get('packet')
+    if packet is None and device.get('secureon'):
+        packet = build_magic_packet(mac_address, device.get('secureon'))
+    packets = {mac_address: packet} if packet else None
+    start = loop.time()
+    deadline = start + timeout
+    next_send = start
+
+    while True:
+        now = loop.time()
+        if now >= next_send:
+            result = wake_many([mac_address], sender=sender, packets=packets, targets=targets)[mac_address]
+            if not result.ok:
+                # Nouvel essai au prochain renvoi : l'échec est signalé sans interrompre l'attente
+                log.warning("Échec de l'envoi vers %s : %s", mac_address, result.error)
+                metrics.inc('wake_confirm_send_errors_total')
+            next_send = now + resend_delay
+            resend_delay = min(resend_delay * 2, max_resend_delay)
+        if not ip_address:
+            return None
+        remaining = deadline - now
+        if remaining <= 0:
+            return None
+        if await probe_host(ip_address, timeout=min(probe_interval, remaining)):
+            metrics.observe('wake_confirm_seconds', loop.time() - start)
+            return loop.time() - start
+        # Attendre la fin de l'intervalle si la sonde a échoué rapidement
+        pause = min(probe_interval - (loop.time() - now), deadline - loop.time())
+        if pause > 0:
+            await asyncio.sleep(pause)
+
+
+async def confirm_many(devices, timeout=120.0, max_concurrency=256, **kwargs):
+    """Réveiller et confirmer plusieurs périphériques en parallèle.
+
+    Retourne un dictionnaire {adresse MAC: temps de réveil ou None}.
+    """
+    import asyncio
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    own_sender = kwargs.get('sender') is None
+    sender = kwargs.pop('sender', None) or MagicPacketSender()
+
+    async def confirm(device):
+        async with semaphore:
+            return await wake_and_confirm(device, timeout=timeout, sender=sender, **kwargs)
+
+    try:
+        delays = await asyncio.gather(*(confirm(device) for device in devices))
+    finally:
+        if own_sender:
+            sender.close()
+    return {device['mac']: delay for device, delay in zip(devices, delays)}
@@ -0,0 +1,94 @@
+import threading
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+from wol import MagicPacketSender, WakeResult
+
+class WakeSignals(QObject):
+    """Signaux émis par une tâche de réveil (reçus dans le thread de l'interface)."""
+    result = pyqtSignal(object)           # WakeResult d'une adresse MAC
+    progress = pyqtSignal(int, int)       # Adresses traitées, total
+    finished = pyqtSignal(object, bool)   # {adresse MAC: WakeResult}, annulée ou non
+
+
+class WakeTask(QRunnable):
+    """Envoi des paquets magiques dans un thread du pool, par lots (ou vagues espacées) annulables."""
+    def __init__(self, macs, repeat=1, interval=0.0, chunk_size=64, sender_factory=MagicPacketSender, sender=None,
+                 wave_delay=0.0, packets=None, targets=None):
+        super().__init__()
+        self.macs = list(dict.fromkeys(macs))  # Supprimer les doublons en gardant l'ordre
+        self.repeat = repeat
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self.sender_factory = sender_factory
+        self.sender = sender  # Émetteur partagé (non fermé à la fin de la tâche)
+        self.wave_delay = wave_delay  # Pause entre deux lots (réveil d'un groupe par vagues)
+        self.packets = packets  # Paquets précalculés {adresse MAC: octets}
+        self.targets = targets  # Destinations {adresse MAC: WakeTarget}, par défaut celle de l'émetteur
+        self.signals = WakeSignals()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Demander l'arrêt de la tâche avant le prochain lot."""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def run(self):
+        """Envoyer les paquets lot par lot en signalant la progression."""
+        results = {}
+        total = len(self.macs)
+        sender = self.sender or self.sender_factory()
+        try:
+            for start in range(0, total, self.chunk_size):
+                # Attendre entre deux vagues ; une annulation interrompt l'attente
+                if start and self.wave_delay > 0:
+                    self._cancelled.wait(self.wave_delay)
+                if self.cancelled:
+                    break
+                chunk = self.macs[start:start + self.chunk_size]
+                try:
+                    chunk_results = sender.send(chunk, repeat=self.repeat, interval=self.interval,
+                                                packets=self.packets, targets=self.targets)
+                except OSError as e:
+                    # Socket inutilisable : toutes les adresses du lot échouent
+                    chunk_results = {mac: WakeResult(mac, error=str(e)) for mac in chunk}
+                for result in chunk_results.values():
+                    self.signals.result.emit(result)
+                results.update(chunk_results)
+                self.signals.progress.emit(len(results), total)
+        finally:
+            if self.sender is None:
+                sender.close()
+        self.signals.finished.emit(results, self.cancelled)
+
+
+class PresenceSignals(QObject):
+    """Relais des lots de changements de présence du thread de surveillance vers l'interface."""
+    changed = pyqtSignal(object)  # {identifiant: (présence, dernière réponse)}
+
+
+class DiscoverySignals(QObject):
+    """Signaux émis par une découverte du réseau."""
+    finished = pyqtSignal(object)  # Liste de DiscoveredHost
+    failed = pyqtSignal(str)
+
+
+class DiscoveryTask(QRunnable):
+    """Découverte du réseau (table ARP, balayage d'un sous-réseau) dans un thread du pool."""
+    def __init__(self, network=None, resolve=True):
+        super().__init__()
+        self.network = network
+        self.resolve = resolve
+        self.signals = DiscoverySignals()
+
+    def run(self):
+        import asyncio
+        from discovery import discover
+
+        try:
+            hosts = asyncio.run(discover(self.network, resolve=self.resolve))
+        except (OSError, ValueError) as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(hosts)